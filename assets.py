@@ -0,0 +1,132 @@
+"""
+Archivos estáticos con huella de contenido y precomprimidos.
+
+Al iniciar se calcula el hash de cada archivo de static/ y se publica con
+la huella en el nombre (styles.css -> styles.3f2a9c1b7d4e.css). Como la URL
+cambia cuando cambia el contenido, esas respuestas se marcan immutable y el
+navegador no vuelve a pedirlas. Los tipos de texto se comprimen una sola vez
+a gzip (y brotli si está instalado) en un directorio de cache.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+
+from flask import request, send_file
+
+try:
+    import brotli
+except Exception:  # brotli es opcional
+    brotli = None
+
+COMPRIMIBLES = (".css", ".js", ".svg", ".json", ".txt", ".html", ".map", ".ico")
+INMUTABLE = "public, max-age=31536000, immutable"
+# archivos pedidos por su nombre original (rutas escritas a mano en JS/CSS)
+SIN_HUELLA = "public, max-age=300, must-revalidate"
+
+_HUELLA = re.compile(r"^(?P<base>.+)\.(?P<hash>[0-9a-f]{12})(?P<ext>\.[^./]+)$")
+
+
+class StaticAssets:
+
+    def __init__(self, app, cache_dir, excluir=("fotos",), min_size=512):
+        self.app = app
+        self.static_folder = app.static_folder
+        self.cache_dir = cache_dir
+        self.excluir = tuple(e.strip("/") + "/" for e in excluir)
+        self.min_size = min_size
+        self.manifest = {}      # "styles.css" -> "styles.<hash>.css"
+        self.hashes = {}        # "styles.css" -> hash
+        self.variantes = {}     # hash -> {"br": ruta, "gzip": ruta}
+        os.makedirs(cache_dir, exist_ok=True)
+        self.escanear()
+        app.url_defaults(self._url_defaults)
+        app.view_functions["static"] = self.servir
+
+    # ---------------- manifiesto ----------------
+    def escanear(self):
+        manifest, hashes, variantes = {}, {}, {}
+        for raiz, dirs, archivos in os.walk(self.static_folder):
+            for nombre in archivos:
+                ruta = os.path.join(raiz, nombre)
+                rel = os.path.relpath(ruta, self.static_folder).replace(os.sep, "/")
+                if rel.startswith(self.excluir):
+                    continue
+                with open(ruta, "rb") as f:
+                    data = f.read()
+                digest = hashlib.sha256(data).hexdigest()[:12]
+                base, ext = os.path.splitext(rel)
+                manifest[rel] = f"{base}.{digest}{ext}"
+                hashes[rel] = digest
+                if ext.lower() in COMPRIMIBLES and len(data) >= self.min_size:
+                    variantes[digest] = self._precomprimir(digest, ext, data)
+        self.manifest, self.hashes, self.variantes = manifest, hashes, variantes
+
+    def _precomprimir(self, digest, ext, data):
+        out = {}
+        codecs = [("gzip", ".gz", lambda d: gzip.compress(d, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            codecs.insert(0, ("br", ".br", lambda d: brotli.compress(d, quality=11)))
+        for encoding, sufijo, comprimir in codecs:
+            ruta = os.path.join(self.cache_dir, f"{digest}{ext}{sufijo}")
+            if not os.path.exists(ruta):
+                comprimido = comprimir(data)
+                if len(comprimido) >= len(data):
+                    continue
+                tmp = f"{ruta}.{os.getpid()}.tmp"
+                with open(tmp, "wb") as f:
+                    f.write(comprimido)
+                os.replace(tmp, ruta)
+            out[encoding] = ruta
+        return out
+
+    def _url_defaults(self, endpoint, values):
+        if endpoint == "static":
+            filename = values.get("filename")
+            if filename in self.manifest:
+                values["filename"] = self.manifest[filename]
+
+    # ---------------- servidor ----------------
+    def _resolver(self, filename):
+        """Devuelve (nombre original, hash o None si se pidió sin huella)."""
+        m = _HUELLA.match(filename)
+        if m:
+            original = m.group("base") + m.group("ext")
+            if original in self.hashes:
+                # una huella vieja (página cacheada de antes del deploy) recibe
+                # el contenido actual, pero sin immutable
+                return original, m.group("hash") if self.hashes[original] == m.group("hash") else None
+        return filename, None
+
+    def servir(self, filename):
+        original, digest = self._resolver(filename)
+        if original.startswith(self.excluir) or original not in self.hashes:
+            # fotos subidas u otros archivos fuera del manifiesto
+            return self.app.send_static_file(filename)
+
+        ruta = os.path.join(self.static_folder, original)
+        mimetype = mimetypes.guess_type(original)[0] or "application/octet-stream"
+        digest_actual = self.hashes[original]
+        encoding, servido = None, ruta
+        aceptadas = request.accept_encodings
+        for enc, variante in self.variantes.get(digest_actual, {}).items():
+            if aceptadas[enc]:
+                encoding, servido = enc, variante
+                break
+
+        resp = send_file(servido, mimetype=mimetype, conditional=True,
+                         etag=f"{digest_actual}-{encoding}" if encoding else digest_actual)
+        if encoding:
+            resp.headers["Content-Encoding"] = encoding
+        if digest_actual in self.variantes:
+            resp.vary.add("Accept-Encoding")
+        resp.headers["Cache-Control"] = INMUTABLE if digest else SIN_HUELLA
+        return resp
+
+    def stats(self):
+        return {
+            "archivos": len(self.manifest),
+            "precomprimidos": sum(len(v) for v in self.variantes.values()),
+            "brotli": brotli is not None,
+        }
@@ -0,0 +1,141 @@
+"""
+Índice en memoria para buscar empleados por nombre, apellidos o DPI.
+
+Los textos se pliegan (minúsculas, sin acentos: "Chávez Román" -> "chavez
+roman") y cada palabra se parte en trigramas con un marcador de inicio
+("^ch", "cha", "hav", ...). La consulta interseca las listas de sus
+trigramas, así que solo se verifican unos pocos candidatos y la búsqueda
+no recorre toda la tabla.
+"""
+import heapq
+import re
+import unicodedata
+from itertools import groupby
+
+_PALABRA = re.compile(r"[0-9a-z]+")
+
+# puntaje por palabra de la consulta según cómo coincide
+_EXACTA, _PREFIJO, _CONTIENE = 3, 2, 1
+
+# consultas de una sola palabra corta: se precalculan sus mejores resultados
+_PREFIJO_CORTO = 2
+_TOP_PRECALCULADO = 50
+
+
+def plegar(texto):
+    """Minúsculas y sin diacríticos: "Peña Chávez" -> "pena chavez"."""
+    texto = unicodedata.normalize("NFKD", str(texto or "").lower())
+    return "".join(c for c in texto if not unicodedata.combining(c))
+
+
+def palabras(texto):
+    return _PALABRA.findall(plegar(texto))
+
+
+def _unir_digitos(consulta):
+    """Grupos de dígitos seguidos son un solo DPI: "2622 105" -> "2622105" (así se indexa)."""
+    out = []
+    for es_numero, grupo in groupby(consulta, key=str.isdigit):
+        out.extend(["".join(grupo)] if es_numero else grupo)
+    return out
+
+
+def _gramas(palabra):
+    marcada = "^" + palabra
+    if len(marcada) < 3:
+        return {marcada}
+    return {marcada[i:i + 3] for i in range(len(marcada) - 2)}
+
+
+class IndiceNombres:
+
+    def __init__(self, rows=()):
+        self.docs = []          # (dpi, nombre, apellidos)
+        self.textos = []        # " palabra1 palabra2 ... " plegado, para verificar
+        self.orden = []         # desempate: nombre más corto y luego alfabético
+        self.postings = {}      # grama -> set(índices de documento)
+        for row in rows:
+            self._agregar(row)
+        self._cortos = self._precalcular_cortos()
+
+    def _agregar(self, row):
+        dpi = str(row.get("Numero de DPI") or "").strip()
+        nombre = row.get("Nombre") or ""
+        apellidos = row.get("Apellidos") or ""
+        doc_id = len(self.docs)
+        toks = palabras(f"{nombre} {apellidos}")
+        if dpi:
+            toks.append("".join(palabras(dpi)))
+        self.docs.append((dpi, nombre, apellidos))
+        self.textos.append(" " + " ".join(toks) + " ")
+        self.orden.append((len(nombre) + len(apellidos), plegar(f"{apellidos} {nombre}")))
+        for tok in toks:
+            for g in _gramas(tok):
+                self.postings.setdefault(g, set()).add(doc_id)
+            # la primera letra sola sirve para consultas de un carácter
+            self.postings.setdefault("^" + tok[:1], set()).add(doc_id)
+
+    def _precalcular_cortos(self):
+        """Top de cada prefijo de 1-2 caracteres: son las consultas con más candidatos."""
+        por_prefijo = {}
+        for doc_id, texto in enumerate(self.textos):
+            vistos = set()
+            for tok in texto.split():
+                for n in range(1, _PREFIJO_CORTO + 1):
+                    if len(tok) >= n and tok[:n] not in vistos:
+                        vistos.add(tok[:n])
+                        por_prefijo.setdefault(tok[:n], []).append(doc_id)
+        cortos = {}
+        for prefijo, ids in por_prefijo.items():
+            puntuados = [(-self._puntaje((prefijo,), d), self.orden[d], d) for d in ids]
+            cortos[prefijo] = [(-p, d) for p, _, d in heapq.nsmallest(_TOP_PRECALCULADO, puntuados)]
+        return cortos
+
+    def __len__(self):
+        return len(self.docs)
+
+    def _candidatos(self, consulta):
+        conjuntos = []
+        for q in consulta:
+            gramas = _gramas(q) if len(q) > 1 else {"^" + q}
+            docs = set.intersection(*[self.postings.get(g, set()) for g in gramas])
+            # sin el marcador de inicio también se aceptan subcadenas
+            interiores = [g for g in gramas if not g.startswith("^")]
+            if interiores and len(q) >= 3:
+                docs |= set.intersection(*[self.postings.get(g, set()) for g in interiores])
+            conjuntos.append(docs)
+        conjuntos.sort(key=len)
+        resultado = set(conjuntos[0])
+        for c in conjuntos[1:]:
+            resultado &= c
+            if not resultado:
+                break
+        return resultado
+
+    def _puntaje(self, consulta, doc_id):
+        texto = self.textos[doc_id]
+        total = 0
+        for q in consulta:
+            if f" {q} " in texto:
+                total += _EXACTA
+            elif f" {q}" in texto:
+                total += _PREFIJO
+            elif len(q) >= 3 and q in texto:
+                total += _CONTIENE
+            else:
+                return 0
+        return total
+
+    def buscar(self, texto, limite=10):
+        """Devuelve hasta `limite` (puntaje, dpi, nombre, apellidos), mejores primero."""
+        consulta = _unir_digitos(palabras(texto))
+        if not consulta or not self.docs:
+            return []
+        if len(consulta) == 1 and consulta[0] in self._cortos and limite <= _TOP_PRECALCULADO:
+            return [(p, *self.docs[d]) for p, d in self._cortos[consulta[0]][:limite]]
+        puntuados = []
+        for doc_id in self._candidatos(consulta):
+            puntaje = self._puntaje(consulta, doc_id)
+            if puntaje:
+                puntuados.append((-puntaje, self.orden[doc_id], doc_id))
+        return [(-p, *self.docs[d]) for p, _, d in heapq.nsmallest(limite, puntuados)]
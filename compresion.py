@@ -0,0 +1,159 @@
+"""
+Compresión gzip/brotli de las respuestas dinámicas (capa WSGI).
+
+Se envuelve app.wsgi_app, así que actúa después de todos los hooks de
+Flask (no_cache, CORS) y sobre cualquier respuesta: JSON, HTML renderizado
+y también las que se envían por partes (exportaciones), que se comprimen
+trozo a trozo sin juntarlas en memoria.
+
+No se toca:
+  - lo que ya trae Content-Encoding (estáticos precomprimidos),
+  - tipos fuera de la lista (imágenes, xlsx, que ya vienen comprimidos),
+  - cuerpos con Content-Length menor que el mínimo,
+  - HEAD, 204, 304 y respuestas con Cache-Control: no-transform.
+
+El ETag de un cuerpo comprimido se marca débil (W/"..."): los bytes ya
+no son los mismos, pero la versión sí, y conditional_get compara en débil.
+"""
+import zlib
+
+from werkzeug.http import parse_accept_header
+from werkzeug.wsgi import ClosingIterator
+
+try:
+    import brotli
+except Exception:  # brotli es opcional
+    brotli = None
+
+TIPOS_DEFAULT = (
+    "text/html", "text/plain", "text/css", "text/csv", "text/javascript",
+    "application/json", "application/x-ndjson", "application/javascript",
+    "application/xml", "image/svg+xml",
+)
+
+
+class _Gzip:
+    def __init__(self, nivel):
+        # wbits 16+: encabezado y CRC de gzip
+        self._z = zlib.compressobj(nivel, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def comprimir(self, data):
+        return self._z.compress(data)
+
+    def terminar(self):
+        return self._z.flush()
+
+
+class _Brotli:
+    def __init__(self, nivel):
+        self._c = brotli.Compressor(quality=nivel)
+
+    def comprimir(self, data):
+        return self._c.process(data)
+
+    def terminar(self):
+        return self._c.finish()
+
+
+class CompresionMiddleware:
+
+    def __init__(self, wsgi_app, min_size=1024, tipos=TIPOS_DEFAULT,
+                 nivel_gzip=6, nivel_brotli=4):
+        self.wsgi_app = wsgi_app
+        self.min_size = min_size
+        self.tipos = frozenset(tipos)
+        self.nivel_gzip = nivel_gzip
+        # calidad baja: el cuerpo se comprime en cada petición, no una sola vez
+        self.nivel_brotli = nivel_brotli
+        self.stats = {"comprimidas": 0, "bytes_entrada": 0, "bytes_salida": 0}
+
+    # ---------------- negociación ----------------
+    def _codificacion(self, environ):
+        aceptadas = parse_accept_header(environ.get("HTTP_ACCEPT_ENCODING"))
+        q_br = aceptadas["br"] if brotli is not None else 0
+        q_gzip = aceptadas["gzip"]
+        if q_br and q_br >= q_gzip:
+            return "br"
+        if q_gzip:
+            return "gzip"
+        return None
+
+    def _compresor(self, encoding):
+        if encoding == "br":
+            return _Brotli(self.nivel_brotli)
+        return _Gzip(self.nivel_gzip)
+
+    def _elegible(self, status, headers):
+        codigo = int(status.split(" ", 1)[0])
+        if codigo < 200 or codigo in (204, 206, 304):
+            return False
+        h = {k.lower(): v for k, v in headers}
+        tipo = h.get("content-type", "").split(";", 1)[0].strip().lower()
+        if tipo not in self.tipos:
+            return False
+        if "content-encoding" in h or "no-transform" in h.get("cache-control", "").lower():
+            return False
+        largo = h.get("content-length")
+        if largo is not None and largo.isdigit() and int(largo) < self.min_size:
+            return False
+        return True
+
+    @staticmethod
+    def _headers_comprimidos(headers, encoding):
+        out = []
+        vary = None
+        for k, v in headers:
+            lk = k.lower()
+            if lk == "content-length":
+                continue
+            if lk == "etag" and not v.startswith("W/"):
+                v = "W/" + v
+            if lk == "vary":
+                vary = v
+                continue
+            out.append((k, v))
+        if vary and "accept-encoding" not in vary.lower():
+            vary = f"{vary}, Accept-Encoding"
+        out.append(("Vary", vary or "Accept-Encoding"))
+        out.append(("Content-Encoding", encoding))
+        return out
+
+    # ---------------- WSGI ----------------
+    def __call__(self, environ, start_response):
+        encoding = None
+        if environ.get("REQUEST_METHOD") != "HEAD":
+            encoding = self._codificacion(environ)
+        if encoding is None:
+            return self.wsgi_app(environ, start_response)
+
+        estado = {"comprimir": False}
+
+        def _start_response(status, headers, exc_info=None):
+            if self._elegible(status, headers):
+                estado["comprimir"] = True
+                headers = self._headers_comprimidos(headers, encoding)
+            return start_response(status, headers, exc_info)
+
+        app_iter = self.wsgi_app(environ, _start_response)
+        if not estado["comprimir"]:
+            return app_iter
+        cierres = [app_iter.close] if hasattr(app_iter, "close") else []
+        return ClosingIterator(self._comprimir(app_iter, encoding), cierres)
+
+    def _comprimir(self, app_iter, encoding):
+        compresor = self._compresor(encoding)
+        entrada = salida = 0
+        for trozo in app_iter:
+            if not trozo:
+                continue
+            entrada += len(trozo)
+            out = compresor.comprimir(trozo)
+            if out:
+                salida += len(out)
+                yield out
+        out = compresor.terminar()
+        salida += len(out)
+        yield out
+        self.stats["comprimidas"] += 1
+        self.stats["bytes_entrada"] += entrada
+        self.stats["bytes_salida"] += salida
@@ -0,0 +1,111 @@
+"""
+Ejecución concurrente que funciona igual con workers de hilos (gthread) y
+con workers cooperativos (gevent).
+
+Con gevent, gunicorn parchea socket, threading y time antes de importar la
+app: pymysql y el cliente HTTP de Supabase ceden el loop mientras esperan la
+red, y los hilos de ThreadPoolExecutor pasan a ser greenlets. Lo que no
+cede (PIL, que trabaja en C) se manda a un hilo real con en_hilo_real()
+para no congelar a las demás peticiones del worker.
+"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+try:
+    import gevent
+    from gevent import monkey
+except Exception:  # gevent es opcional (solo para el modo cooperativo)
+    gevent = None
+    monkey = None
+
+
+def cooperativo():
+    """¿El proceso corre con threading parcheado por gevent?"""
+    return monkey is not None and monkey.is_module_patched("threading")
+
+
+# ---------------- primitivas del sistema ----------------
+# En modo cooperativo threading, _thread y time.sleep están parcheados. Lo
+# que debe correr en un hilo del sistema aunque el loop esté ocupado (el
+# muestreador del perfilador) usa las versiones originales.
+def _original(modulo, nombre):
+    if cooperativo():
+        return monkey.get_original(modulo, nombre)
+    return getattr(__import__(modulo), nombre)
+
+
+def lock_del_sistema():
+    return _original("_thread", "allocate_lock")()
+
+
+def ident_del_sistema():
+    return _original("_thread", "get_ident")()
+
+
+def dormir_del_sistema(segundos):
+    _original("time", "sleep")(segundos)
+
+
+def iniciar_hilo_del_sistema(fn):
+    _original("_thread", "start_new_thread")(fn, ())
+
+
+def greenlet_actual():
+    """El greenlet que atiende la petición en modo cooperativo; None con hilos."""
+    return gevent.getcurrent() if cooperativo() else None
+
+
+def en_hilo_real(fn, *args, **kwargs):
+    """
+    Ejecuta fn en un hilo del sistema y espera el resultado. En modo
+    cooperativo el greenlet actual cede mientras tanto; con hilos normales
+    es una llamada directa.
+    """
+    if cooperativo():
+        return gevent.get_hub().threadpool.apply(fn, args, kwargs)
+    return fn(*args, **kwargs)
+
+
+def en_segundo_plano(fn):
+    """
+    Arranca fn() en otro hilo (un greenlet en modo cooperativo) y devuelve un
+    Future: quien llama sigue con su propio trabajo y después espera con
+    .result().
+    """
+    pool = ThreadPoolExecutor(max_workers=1)
+    try:
+        return pool.submit(fn)
+    finally:
+        pool.shutdown(wait=False)
+
+
+def en_paralelo(tareas, max_workers=4, al_terminar=None):
+    """
+    Ejecuta las funciones sin argumentos de `tareas` a la vez (I/O
+    independiente dentro de una petición) y devuelve sus resultados en el
+    mismo orden. al_terminar(i) se llama desde el hilo que llama, a medida
+    que termina cada una. Si alguna falla se cancelan las que no empezaron,
+    se espera a las que ya corren y se relanza esa excepción.
+    """
+    tareas = list(tareas)
+    if len(tareas) <= 1 or max_workers <= 1:
+        resultados = []
+        for i, tarea in enumerate(tareas):
+            resultados.append(tarea())
+            if al_terminar:
+                al_terminar(i)
+        return resultados
+
+    resultados = [None] * len(tareas)
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(tareas))) as pool:
+        futuros = {pool.submit(tarea): i for i, tarea in enumerate(tareas)}
+        try:
+            for futuro in as_completed(futuros):
+                i = futuros[futuro]
+                resultados[i] = futuro.result()
+                if al_terminar:
+                    al_terminar(i)
+        except BaseException:
+            for futuro in futuros:
+                futuro.cancel()
+            raise
+    return resultados
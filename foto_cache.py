@@ -0,0 +1,224 @@
+"""
+Cache local de fotos direccionado por contenido, con desalojo LRU.
+
+Los archivos se guardan como <dir>/<hash[:2]>/<hash>.<ext>; un índice
+SQLite relaciona cada llave del bucket (p. ej. empleados/123_..._thumb.webp)
+con su hash, tamaño y último acceso. Si el total supera max_bytes se
+eliminan las llaves menos usadas y, de los hashes que dejan, los archivos
+que ya nadie referencia. Un barrido completo del directorio (restos de
+procesos cortados) corre como mucho cada sweep_every segundos.
+
+Las llaves que fetch() no encontró se recuerdan miss_ttl segundos, para que
+pedir una y otra vez una foto inexistente no llegue cada vez al bucket.
+"""
+import hashlib
+import mimetypes
+import os
+import re
+import sqlite3
+import threading
+import time
+
+_LLAVE_VALIDA = re.compile(r"^[\w .()-]+(/[\w .()-]+)*$")
+
+
+class FotoCache:
+
+    def __init__(self, cache_dir, index_path, max_bytes, fetch=None, touch_every=60,
+                 miss_ttl=30, max_misses=10000, sweep_every=3600):
+        self.cache_dir = cache_dir
+        self.index_path = index_path
+        self.max_bytes = max_bytes
+        self.fetch = fetch
+        self.touch_every = touch_every
+        self.miss_ttl = miss_ttl
+        self.max_misses = max_misses
+        self.sweep_every = sweep_every
+        self._misses = {}       # llave -> hasta cuándo se responde "no existe" sin ir al bucket
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+        os.makedirs(cache_dir, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS foto_cache (
+                    key          TEXT PRIMARY KEY,
+                    hash         TEXT NOT NULL,
+                    size         INTEGER NOT NULL,
+                    content_type TEXT NOT NULL,
+                    last_access  REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS foto_cache_access ON foto_cache (last_access)")
+            conn.execute("CREATE INDEX IF NOT EXISTS foto_cache_hash ON foto_cache (hash)")
+        finally:
+            conn.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.index_path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @staticmethod
+    def llave_valida(key):
+        return bool(key) and ".." not in key and bool(_LLAVE_VALIDA.match(key))
+
+    def _path(self, digest, key):
+        ext = os.path.splitext(key)[1].lower()
+        return os.path.join(self.cache_dir, digest[:2], digest + ext)
+
+    def put(self, key, data, content_type=None):
+        """Guarda bytes bajo la llave; devuelve el hash de contenido."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest, key)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        content_type = content_type or mimetypes.guess_type(key)[0] or "application/octet-stream"
+        with self._lock:
+            self._misses.pop(key, None)
+        conn = self._connect()
+        try:
+            # si la llave apuntaba a otro contenido, ese archivo puede quedar sin uso
+            previos = self._hashes(conn, [key])
+            conn.execute("""
+                INSERT INTO foto_cache (key, hash, size, content_type, last_access)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET hash = excluded.hash, size = excluded.size,
+                    content_type = excluded.content_type, last_access = excluded.last_access
+            """, (key, digest, len(data), content_type, time.time()))
+            self._evict(conn, previos - {(digest, self._ext(key))})
+        finally:
+            conn.close()
+        return digest
+
+    def get(self, key):
+        """
+        Devuelve (ruta, hash, content_type) de la llave, descargándola con
+        fetch() si no está en cache. None si no existe en ningún lado.
+        """
+        if not self.llave_valida(key):
+            return None
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT hash, content_type, last_access FROM foto_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row:
+                digest, content_type, last_access = row
+                path = self._path(digest, key)
+                if os.path.exists(path):
+                    now = time.time()
+                    if now - last_access > self.touch_every:
+                        conn.execute("UPDATE foto_cache SET last_access = ? WHERE key = ?", (now, key))
+                    return path, digest, content_type
+                conn.execute("DELETE FROM foto_cache WHERE key = ?", (key,))
+        finally:
+            conn.close()
+
+        if self.fetch is None or self._missing(key):
+            return None
+        data = self.fetch(key)
+        if data is None:
+            self._remember_miss(key)
+            return None
+        digest = self.put(key, data)
+        return self._path(digest, key), digest, mimetypes.guess_type(key)[0] or "application/octet-stream"
+
+    def _missing(self, key):
+        with self._lock:
+            hasta = self._misses.get(key)
+            if hasta is None:
+                return False
+            if hasta > time.monotonic():
+                return True
+            del self._misses[key]
+            return False
+
+    def _remember_miss(self, key):
+        if not self.miss_ttl:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if len(self._misses) >= self.max_misses:
+                self._misses = {k: t for k, t in self._misses.items() if t > now}
+                if len(self._misses) >= self.max_misses:
+                    self._misses.clear()
+            self._misses[key] = now + self.miss_ttl
+
+    def discard(self, keys):
+        conn = self._connect()
+        try:
+            candidatos = self._hashes(conn, keys)
+            for key in keys:
+                conn.execute("DELETE FROM foto_cache WHERE key = ?", (key,))
+            self._remove_unreferenced(conn, candidatos)
+        finally:
+            conn.close()
+
+    def _evict(self, conn, candidatos=()):
+        candidatos = set(candidatos)
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM foto_cache").fetchone()[0]
+        if total > self.max_bytes:
+            for key, digest, size in conn.execute(
+                    "SELECT key, hash, size FROM foto_cache ORDER BY last_access").fetchall():
+                conn.execute("DELETE FROM foto_cache WHERE key = ?", (key,))
+                candidatos.add((digest, self._ext(key)))
+                total -= size
+                if total <= self.max_bytes:
+                    break
+        self._remove_unreferenced(conn, candidatos)
+        if time.monotonic() - self._last_sweep > self.sweep_every:
+            self._last_sweep = time.monotonic()
+            self._remove_orphans(conn)
+
+    @staticmethod
+    def _ext(key):
+        return os.path.splitext(key)[1].lower()
+
+    def _hashes(self, conn, keys):
+        """{(hash, extensión)} de las llaves que están en el índice."""
+        out = set()
+        for key in keys:
+            row = conn.execute("SELECT hash FROM foto_cache WHERE key = ?", (key,)).fetchone()
+            if row:
+                out.add((row[0], self._ext(key)))
+        return out
+
+    def _remove_unreferenced(self, conn, candidatos):
+        """Borra los archivos de esos hashes que ya ninguna llave usa."""
+        for digest, ext in candidatos:
+            if conn.execute("SELECT 1 FROM foto_cache WHERE hash = ? LIMIT 1", (digest,)).fetchone():
+                continue
+            try:
+                os.remove(os.path.join(self.cache_dir, digest[:2], digest + ext))
+            except OSError:
+                pass
+
+    def _remove_orphans(self, conn):
+        """Barrido completo: archivos sin llave que no pasaron por _remove_unreferenced."""
+        vivos = {h for (h,) in conn.execute("SELECT DISTINCT hash FROM foto_cache")}
+        for sub in os.listdir(self.cache_dir):
+            subdir = os.path.join(self.cache_dir, sub)
+            if not os.path.isdir(subdir):
+                continue
+            for name in os.listdir(subdir):
+                if name.endswith(".tmp"):
+                    continue
+                if os.path.splitext(name)[0] not in vivos:
+                    try:
+                        os.remove(os.path.join(subdir, name))
+                    except OSError:
+                        pass
+
+    def stats(self):
+        conn = self._connect()
+        try:
+            count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM foto_cache").fetchone()
+        finally:
+            conn.close()
+        return {"entries": count, "bytes": total, "max_bytes": self.max_bytes}
@@ -0,0 +1,113 @@
+"""
+Cola de trabajos en segundo plano para el procesamiento de fotos.
+
+El estado de cada trabajo vive en SQLite (compartido por todos los workers
+de gunicorn en la misma máquina) y la ejecución en un pool de hilos local
+de cada proceso, que se recrea si el proceso fue bifurcado.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+ESTADOS_FINALES = ("listo", "error")
+
+
+class JobStore:
+
+    def __init__(self, db_path, retention=86400, stale_after=600):
+        self.db_path = db_path
+        self.retention = retention
+        self.stale_after = stale_after
+        conn = self._connect()
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS foto_jobs (
+                    id         TEXT PRIMARY KEY,
+                    dpi        TEXT NOT NULL,
+                    status     TEXT NOT NULL,
+                    progress   INTEGER NOT NULL DEFAULT 0,
+                    message    TEXT,
+                    result     TEXT,
+                    attempts   INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+        finally:
+            conn.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def create(self, dpi):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("DELETE FROM foto_jobs WHERE updated_at < ?", (now - self.retention,))
+            conn.execute("""
+                INSERT INTO foto_jobs (id, dpi, status, progress, created_at, updated_at)
+                VALUES (?, ?, 'en_cola', 0, ?, ?)
+            """, (job_id, dpi, now, now))
+        finally:
+            conn.close()
+        return job_id
+
+    def update(self, job_id, status=None, progress=None, message=None, result=None, attempts=None):
+        sets, params = ["updated_at = ?"], [time.time()]
+        for col, val in (("status", status), ("progress", progress), ("message", message),
+                         ("attempts", attempts)):
+            if val is not None:
+                sets.append(f"{col} = ?")
+                params.append(val)
+        if result is not None:
+            sets.append("result = ?")
+            params.append(json.dumps(result, ensure_ascii=False))
+        params.append(job_id)
+        conn = self._connect()
+        try:
+            conn.execute(f"UPDATE foto_jobs SET {', '.join(sets)} WHERE id = ?", params)
+        finally:
+            conn.close()
+
+    def get(self, job_id):
+        conn = self._connect()
+        try:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("SELECT * FROM foto_jobs WHERE id = ?", (job_id,)).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        if job["status"] not in ESTADOS_FINALES and time.time() - job["updated_at"] > self.stale_after:
+            # el worker que lo tenía murió o se reinició
+            job["status"] = "error"
+            job["message"] = job["message"] or "Trabajo interrumpido"
+        return job
+
+
+class JobRunner:
+    """Pool de hilos por proceso; seguro frente a fork de gunicorn."""
+
+    def __init__(self, max_workers=2):
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._pid = None
+        self._executor = None
+
+    def submit(self, fn, *args):
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix="foto-job")
+                self._pid = os.getpid()
+            return self._executor.submit(fn, *args)
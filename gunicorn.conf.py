@@ -0,0 +1,72 @@
+"""
+Configuración de gunicorn (la lee solo al arrancar desde este directorio).
+
+Dos modos, elegidos con GUNICORN_WORKER_CLASS:
+
+  gevent   (por defecto si gevent está instalado) — workers cooperativos.
+           gunicorn parchea socket/threading antes de importar la app, así
+           que una subida lenta a Supabase o una consulta a MySQL solo
+           detiene su propia petición: el worker sigue atendiendo otras
+           mientras espera la red. PIL se procesa en un hilo real
+           (concurrencia.en_hilo_real) para no congelar el loop.
+           Concurrencia por worker: GUNICORN_CONEXIONES (default 100).
+
+  gthread  — hilos del sistema; el modo de respaldo sin gevent.
+           Concurrencia por worker: GUNICORN_THREADS (default 8).
+
+Valores pensados para una instancia chica (1-2 vCPU, 512 MB-1 GB):
+
+  WEB_CONCURRENCY      workers (procesos). Default 2 * CPUs, máximo 4: el
+                       trabajo es casi todo espera de red, más procesos
+                       solo suman memoria (cada uno carga el modelo de
+                       lectura de empleados).
+  GUNICORN_CONEXIONES  peticiones simultáneas por worker gevent. Con pocas
+                       decenas de usuarios 100 sobra; lo que limita es
+                       DB_POOL_MAX: las peticiones de más esperan una
+                       conexión libre, no CPU.
+  DB_POOL_MAX          conexiones MySQL prestadas a la vez por worker
+                       (default 20). Pasado ese número una petición espera
+                       hasta DB_POOL_TIMEOUT segundos (default 10) y luego
+                       falla con PoolAgotado. WEB_CONCURRENCY * DB_POOL_MAX
+                       (+ las de los trabajos de foto) debe caber en
+                       max_connections de MySQL (151 por defecto).
+  DB_POOL_SIZE         conexiones ociosas que se conservan por worker; en
+                       gevent conviene subirlo a 10-20 para no abrir y
+                       cerrar conexiones en cada ráfaga.
+  FOTO_WORKERS         trabajos de foto en segundo plano por worker.
+  FOTO_SUBIDAS_PARALELAS  derivados que se suben al bucket a la vez.
+  GUNICORN_TIMEOUT     segundos antes de reiniciar un worker colgado
+                       (default 60; una subida síncrona con reintentos
+                       puede tardar varios segundos).
+
+El perfilador por petición (X-Perfilar) funciona en los dos modos: con
+gevent muestrea la pila de cada greenlet desde un hilo del sistema.
+"""
+import multiprocessing
+import os
+
+try:
+    import gevent  # noqa: F401
+    _WORKER_DEFAULT = "gevent"
+except Exception:  # gevent es opcional; sin él se usan hilos
+    _WORKER_DEFAULT = "gthread"
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", _WORKER_DEFAULT)
+workers = int(os.environ.get("WEB_CONCURRENCY", min(2 * multiprocessing.cpu_count(), 4)))
+threads = int(os.environ.get("GUNICORN_THREADS", "8"))
+worker_connections = int(os.environ.get("GUNICORN_CONEXIONES", "100"))
+
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = 30
+keepalive = 5
+
+# reciclar workers de vez en cuando acota cualquier fuga de memoria (PIL)
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", "2000"))
+max_requests_jitter = 200
+
+# sin preload: cada worker importa la app después del parche de gevent y
+# abre sus propias conexiones (el pool ya se reinicia solo tras un fork)
+preload_app = False
+
+accesslog = os.environ.get("GUNICORN_ACCESSLOG")  # "-" para stdout
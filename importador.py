@@ -0,0 +1,265 @@
+"""
+Importación masiva de empleados desde CSV o XLSX.
+
+El archivo se lee fila por fila (sin cargarlo completo en memoria), cada
+fila se valida contra las columnas de empleados_info y se inserta en lotes
+con executemany; cada lote es una transacción. Si un lote falla se repite
+fila por fila para señalar exactamente cuáles no entraron.
+"""
+import codecs
+import csv
+import itertools
+import os
+import time
+import unicodedata
+from datetime import date, datetime
+
+try:
+    import openpyxl
+except Exception:  # openpyxl es opcional (solo para .xlsx)
+    openpyxl = None
+
+LOTE_DEFAULT = 500
+MAX_ERRORES_REPORTE = 1000
+
+# nombres cortos que ya aceptan los endpoints JSON (api_empleados_list, guardar_*)
+ALIAS = {
+    "dpi": "Numero de DPI",
+    "nombre": "Nombre",
+    "apellidos": "Apellidos",
+    "apellidos_casada": "Apellidos de casada",
+    "estado_civil": "Estado Civil",
+    "nacionalidad": "Nacionalidad",
+    "departamento": "Departamento",
+    "fecha_nacimiento": "Fecha de nacimiento",
+    "lugar_nacimiento": "Lugar de nacimiento",
+    "iggs": "Numero de Afiliación del IGGS",
+    "direccion": "Dirección del Domicilio",
+    "telefono": "Numero de Telefono",
+    "religion": "Religión",
+    "correo": "Correo Electronico",
+    "puesto": "Puesto de trabajo",
+    "contrato": "Tipo de contrato",
+    "jornada": "Jornada laboral",
+    "duracion": "Duración del trabajo",
+    "inicio": "Fecha de inicio laboral",
+    "dias": "Dias Laborales",
+}
+
+
+class ErrorImportacion(Exception):
+    """Archivo ilegible o sin las columnas mínimas (mensaje apto para el usuario)."""
+
+
+def _normalizar(texto):
+    texto = unicodedata.normalize("NFKD", str(texto or ""))
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return " ".join(texto.replace("_", " ").lower().split())
+
+
+def mapear_encabezados(encabezados, columnas):
+    """
+    Relaciona cada encabezado del archivo con una columna de empleados_info
+    (sin distinguir mayúsculas, acentos ni guiones bajos). Devuelve
+    (mapa índice -> columna, encabezados ignorados).
+    """
+    conocidas = {_normalizar(c): c for c in columnas}
+    for alias, col in ALIAS.items():
+        if col in columnas:
+            conocidas.setdefault(_normalizar(alias), col)
+    mapa, ignorados, usadas = {}, [], set()
+    for i, enc in enumerate(encabezados):
+        col = conocidas.get(_normalizar(enc))
+        if col and col not in usadas:
+            mapa[i] = col
+            usadas.add(col)
+        elif str(enc or "").strip():
+            ignorados.append(str(enc))
+    if "Numero de DPI" not in usadas:
+        raise ErrorImportacion("El archivo debe tener una columna 'Numero de DPI' (o 'dpi')")
+    return mapa, ignorados
+
+
+def _celda(valor):
+    if valor is None:
+        return None
+    if isinstance(valor, datetime):
+        return valor.date().isoformat() if valor.time() == datetime.min.time() else valor.isoformat(sep=" ")
+    if isinstance(valor, date):
+        return valor.isoformat()
+    if isinstance(valor, float) and valor.is_integer():
+        # Excel guarda DPI y teléfonos como números
+        valor = int(valor)
+    valor = str(valor).strip()
+    return valor or None
+
+
+def _filas_csv(stream):
+    # StreamReader en vez de TextIOWrapper: el archivo temporal de werkzeug
+    # no siempre implementa readable()
+    lineas = iter(codecs.getreader("utf-8-sig")(stream))
+    encabezado = next(lineas, "")
+    try:
+        dialecto = csv.Sniffer().sniff(encabezado, delimiters=",;\t|")
+    except csv.Error:
+        dialecto = csv.excel
+    yield from csv.reader(itertools.chain([encabezado], lineas), dialecto)
+
+
+def _filas_xlsx(stream):
+    if openpyxl is None:
+        raise ErrorImportacion("Para importar .xlsx instale openpyxl (o suba el archivo como CSV)")
+    try:
+        libro = openpyxl.load_workbook(stream, read_only=True, data_only=True)
+    except Exception as e:
+        raise ErrorImportacion(f"No se pudo leer el archivo XLSX: {e}")
+    try:
+        for fila in libro.active.iter_rows(values_only=True):
+            yield fila
+    finally:
+        libro.close()
+
+
+def leer_archivo(stream, filename, columnas):
+    """
+    Devuelve (mapa, ignorados, filas) donde filas es un generador de
+    (número de línea, dict columna -> valor) que va leyendo el archivo.
+    """
+    ext = os.path.splitext(filename or "")[1].lower()
+    if ext in (".xlsx", ".xlsm"):
+        crudas = _filas_xlsx(stream)
+    elif ext in (".csv", ".txt", ""):
+        crudas = _filas_csv(stream)
+    else:
+        raise ErrorImportacion("Formato no soportado: use .csv o .xlsx")
+
+    try:
+        encabezados = next(crudas)
+    except StopIteration:
+        raise ErrorImportacion("El archivo está vacío")
+    except UnicodeDecodeError:
+        raise ErrorImportacion("El CSV debe estar en UTF-8")
+    mapa, ignorados = mapear_encabezados(encabezados, columnas)
+
+    def filas():
+        for linea, cruda in enumerate(crudas, start=2):
+            valores = {col: _celda(cruda[i]) if i < len(cruda) else None for i, col in mapa.items()}
+            if any(v is not None for v in valores.values()):
+                yield linea, valores
+
+    return mapa, ignorados, filas()
+
+
+class Importador:
+    """
+    Inserta (o actualiza, con actualizar=True) las filas en empleados_info.
+    Las columnas son las del encabezado, así que todas las filas comparten
+    la misma sentencia y cada lote va en un solo executemany.
+    """
+
+    def __init__(self, conn, columnas, actualizar=False, lote=LOTE_DEFAULT):
+        self.conn = conn
+        self.columnas = list(columnas)
+        self.actualizar = actualizar
+        self.lote = max(1, int(lote))
+        self.errores = []
+        self.total_errores = 0
+        self.stats = {"leidas": 0, "insertadas": 0, "actualizadas": 0, "omitidas": 0, "lotes": 0}
+        self._vistos = set()
+
+        cols_sql = ", ".join(f"`{c}`" for c in self.columnas)
+        self._sql_insert = (f"INSERT INTO empleados_info ({cols_sql}) "
+                            f"VALUES ({', '.join(['%s'] * len(self.columnas))})")
+        otras = [c for c in self.columnas if c != "Numero de DPI"]
+        self._sql_update = None
+        if otras:
+            self._sql_update = (f"UPDATE empleados_info SET {', '.join(f'`{c}`=%s' for c in otras)} "
+                                f"WHERE `Numero de DPI`=%s")
+        self._otras = otras
+
+    def _error(self, linea, dpi, mensaje):
+        self.total_errores += 1
+        if len(self.errores) < MAX_ERRORES_REPORTE:
+            self.errores.append({"linea": linea, "dpi": dpi, "error": mensaje})
+
+    def _validar(self, linea, valores):
+        dpi = valores.get("Numero de DPI")
+        if not dpi:
+            self._error(linea, None, "El campo DPI es obligatorio")
+            return False
+        if dpi in self._vistos:
+            self._error(linea, dpi, "DPI repetido en el archivo")
+            return False
+        self._vistos.add(dpi)
+        return True
+
+    def _existentes(self, cursor, dpis):
+        cursor.execute(
+            f"SELECT `Numero de DPI` AS dpi FROM empleados_info WHERE `Numero de DPI` IN ({', '.join(['%s'] * len(dpis))})",
+            dpis)
+        return {str(r["dpi"]) for r in cursor.fetchall()}
+
+    def _procesar_lote(self, pendientes):
+        cursor = self.conn.cursor()
+        try:
+            existentes = self._existentes(cursor, [v["Numero de DPI"] for _, v in pendientes])
+            inserts, updates = [], []
+            for linea, v in pendientes:
+                dpi = v["Numero de DPI"]
+                if dpi in existentes:
+                    if not self.actualizar or self._sql_update is None:
+                        self.stats["omitidas"] += 1
+                        self._error(linea, dpi, "Empleado ya existe")
+                        continue
+                    updates.append((linea, dpi, [v[c] for c in self._otras] + [dpi]))
+                else:
+                    inserts.append((linea, dpi, [v[c] for c in self.columnas]))
+
+            try:
+                if inserts:
+                    cursor.executemany(self._sql_insert, [p for _, _, p in inserts])
+                if updates:
+                    cursor.executemany(self._sql_update, [p for _, _, p in updates])
+                self.conn.commit()
+                self.stats["insertadas"] += len(inserts)
+                self.stats["actualizadas"] += len(updates)
+            except Exception:
+                self.conn.rollback()
+                # el lote completo falló: se repite fila por fila para aislar las malas
+                for grupo, sql, clave in ((inserts, self._sql_insert, "insertadas"),
+                                          (updates, self._sql_update, "actualizadas")):
+                    for linea, dpi, params in grupo:
+                        try:
+                            cursor.execute(sql, params)
+                            self.conn.commit()
+                            self.stats[clave] += 1
+                        except Exception as e:
+                            self.conn.rollback()
+                            self._error(linea, dpi, str(e))
+            self.stats["lotes"] += 1
+        finally:
+            cursor.close()
+
+    def importar(self, filas):
+        inicio = time.perf_counter()
+        pendientes = []
+        for linea, valores in filas:
+            self.stats["leidas"] += 1
+            if not self._validar(linea, valores):
+                continue
+            pendientes.append((linea, valores))
+            if len(pendientes) >= self.lote:
+                self._procesar_lote(pendientes)
+                pendientes = []
+        if pendientes:
+            self._procesar_lote(pendientes)
+
+        segundos = time.perf_counter() - inicio
+        procesadas = self.stats["insertadas"] + self.stats["actualizadas"]
+        return {
+            **self.stats,
+            "errores": self.total_errores,
+            "segundos": round(segundos, 3),
+            "filas_por_segundo": round(self.stats["leidas"] / segundos, 1) if segundos > 0 else None,
+            "escritas_por_segundo": round(procesadas / segundos, 1) if segundos > 0 else None,
+        }
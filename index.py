@@ -1,4 +1,4 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, make_response, jsonify
+from flask import Flask, render_template, request, redirect, url_for, flash, session, make_response, jsonify, send_file, Response, stream_with_context
 import os
 import pymysql
 from urllib.parse import urlparse
@@ -8,13 +8,38 @@ from io import BytesIO
 from PIL import Image
 import sys
 import json
+import csv
+import click
+import io
+import tempfile
+import base64
+import bisect
+import hashlib
+import hmac
+import random
 from pathlib import Path
+import threading
+import time
+from collections import deque
 import os
 import json
 import os
 from PIL import Image, ExifTags
 from supabase import create_client
 
+from nomina import calcular_planilla
+from planilla_store import PlanillaStore
+from foto_jobs import JobStore, JobRunner
+from foto_cache import FotoCache
+from buscador import IndiceNombres, plegar
+import migraciones
+from assets import StaticAssets
+from compresion import CompresionMiddleware
+from metricas import Metricas
+from perfilador import Perfilador
+from concurrencia import cooperativo, en_hilo_real, en_paralelo, en_segundo_plano
+from importador import Importador, ErrorImportacion, leer_archivo, LOTE_DEFAULT, ALIAS, openpyxl
+
 SUPABASE_URL = os.environ.get("SUPABASE_URL")
 SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
 SUPABASE_BUCKET = os.environ.get("SUPABASE_BUCKET")
@@ -38,15 +63,16 @@ try:
         r"/planilla": {"origins": FRONTEND_ORIGINS},
         r"/guardar_planilla": {"origins": FRONTEND_ORIGINS},
         r"/api/planilla": {"origins": FRONTEND_ORIGINS}
-    })
+    }, expose_headers=["X-Total-Count", "X-Next-Cursor", "Link"])
 except Exception:
     @app.after_request
     def _simple_cors(response):
         origin = FRONTEND_ORIGINS
         response.headers["Access-Control-Allow-Origin"] = origin
-        response.headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, DELETE, OPTIONS"
+        response.headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, PATCH, DELETE, OPTIONS"
         response.headers["Access-Control-Allow-Headers"] = "Content-Type, Authorization, X-Requested-With"
         response.headers["Access-Control-Allow-Credentials"] = "true"
+        response.headers["Access-Control-Expose-Headers"] = "X-Total-Count, X-Next-Cursor, Link"
         return response
 
 # Tamaño máximo de subida (ej. 16 MB)
@@ -65,12 +91,96 @@ PLANILLA_STORE_PATH = os.environ.get("PLANILLA_STORE_PATH",
                                     os.path.join(app.root_path, "data", "planilla_store.json"))
 Path(os.path.dirname(PLANILLA_STORE_PATH)).mkdir(parents=True, exist_ok=True)
 
+# Base SQLite con la planilla por filas; el JSON anterior se importa la primera vez
+PLANILLA_DB_PATH = os.environ.get("PLANILLA_DB_PATH",
+                                  os.path.join(os.path.dirname(PLANILLA_STORE_PATH), "planilla_store.sqlite3"))
+planilla_store = PlanillaStore(PLANILLA_DB_PATH, legacy_json_path=PLANILLA_STORE_PATH)
+
+# Métricas para Prometheus en /metrics (METRICAS=0 las apaga). Se instalan
+# antes que los demás hooks para que la latencia incluya todo el ciclo.
+METRICAS_ENABLED = os.environ.get("METRICAS", "1") != "0"
+# /metrics y /db-pool aceptan "Authorization: Bearer <METRICAS_TOKEN>" o una sesión de admin
+METRICAS_TOKEN = os.environ.get("METRICAS_TOKEN")
+metricas = Metricas(os.environ.get("METRICAS_DIR", os.path.join(os.path.dirname(PLANILLA_STORE_PATH), "metricas")))
+if METRICAS_ENABLED:
+    metricas.instalar(app)
+
+# Perfilado por petición: un admin lo pide con el header "X-Perfilar: 1" o se
+# toma una fracción PERFILES_MUESTREO (0..1) de las peticiones, opcionalmente
+# solo de los endpoints en PERFILES_ENDPOINTS. Se listan en /api/perfiles.
+PERFILES_ENABLED = os.environ.get("PERFILES", "1") != "0"
+PERFILES_MUESTREO = float(os.environ.get("PERFILES_MUESTREO", "0"))
+PERFILES_ENDPOINTS = {e.strip() for e in os.environ.get("PERFILES_ENDPOINTS", "").split(",") if e.strip()}
+PERFILES_EXCLUIDOS = {"static", "metrics", "api_perfiles", "api_perfil_descargar"}
+perfilador = Perfilador(
+    os.environ.get("PERFILES_DIR", os.path.join(os.path.dirname(PLANILLA_STORE_PATH), "perfiles")),
+    intervalo=float(os.environ.get("PERFILES_INTERVALO_MS", "5")) / 1000,
+    max_bytes=int(os.environ.get("PERFILES_MAX_MB", "50")) * 1024 * 1024,
+    max_archivos=int(os.environ.get("PERFILES_MAX_ARCHIVOS", "500")),
+)
+
+
+def debe_perfilar():
+    endpoint = request.endpoint or ""
+    if endpoint in PERFILES_EXCLUIDOS:
+        return False
+    if request.headers.get("X-Perfilar") == "1" and es_admin():
+        return True
+    if PERFILES_MUESTREO > 0 and (not PERFILES_ENDPOINTS or endpoint in PERFILES_ENDPOINTS):
+        return random.random() < PERFILES_MUESTREO
+    return False
+
+
+if PERFILES_ENABLED:
+    perfilador.instalar(app, debe_perfilar)
+
+# Estáticos con huella en el nombre + gzip/brotli precalculados (0 = servir como antes)
+if os.environ.get("STATIC_FINGERPRINT", "1") != "0":
+    static_assets = StaticAssets(app, os.environ.get(
+        "STATIC_CACHE_DIR", os.path.join(os.path.dirname(PLANILLA_STORE_PATH), "static_cache")))
+
+# Compresión gzip/brotli de JSON y HTML (COMPRESION=0 la desactiva, p.ej. detrás de un proxy que ya comprime)
+if os.environ.get("COMPRESION", "1") != "0":
+    app.wsgi_app = CompresionMiddleware(
+        app.wsgi_app,
+        min_size=int(os.environ.get("COMPRESION_MIN_BYTES", "1024")),
+        nivel_gzip=int(os.environ.get("COMPRESION_NIVEL_GZIP", "6")),
+        nivel_brotli=int(os.environ.get("COMPRESION_NIVEL_BROTLI", "4")))
+
 
 def allowed_file(filename):
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXT
 
 
-def get_db_connection():
+# Pool de conexiones MySQL (por proceso / worker de gunicorn)
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "5"))
+DB_POOL_MAX_IDLE = int(os.environ.get("DB_POOL_MAX_IDLE", "300"))
+DB_POOL_PING = os.environ.get("DB_POOL_PING", "1") != "0"
+# conexiones prestadas a la vez por worker (0 = sin límite) y espera máxima por una
+DB_POOL_MAX = int(os.environ.get("DB_POOL_MAX", "20"))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "10"))
+
+
+class _ConsultaMedida:
+    """Mide cada execute del cursor (executemany de pymysql también pasa por execute)."""
+
+    def execute(self, query, args=None):
+        inicio = time.perf_counter()
+        try:
+            return super().execute(query, args)
+        finally:
+            metricas.consulta(time.perf_counter() - inicio)
+
+
+class CursorMedido(_ConsultaMedida, pymysql.cursors.DictCursor):
+    pass
+
+
+class SSCursorMedido(_ConsultaMedida, pymysql.cursors.SSCursor):
+    pass
+
+
+def _new_db_connection():
     url = os.environ.get("DATABASE_URL")
     if url:
         result = urlparse(url)
@@ -81,7 +191,7 @@ def get_db_connection():
             database=result.path[1:],
             port=result.port or 3306,
             charset="utf8mb4",
-            cursorclass=pymysql.cursors.DictCursor
+            cursorclass=CursorMedido
         )
     else:
         return pymysql.connect(
@@ -90,10 +200,195 @@ def get_db_connection():
             password="Minicrosty21",
             database="empleados",
             charset="utf8mb4",
-            cursorclass=pymysql.cursors.DictCursor
+            cursorclass=CursorMedido
         )
 
 
+class PooledConnection:
+    """
+    Envoltorio de una conexión pymysql. close() no cierra el socket:
+    devuelve la conexión al pool para que la siguiente petición la reutilice.
+    El resto de atributos (cursor, commit, rollback, ...) se delegan.
+    """
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+        self._released = False
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if not self._released:
+            self._released = True
+            self._pool.release(self._raw)
+
+    def __del__(self):
+        # conexiones olvidadas en un except también vuelven al pool
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class PoolAgotado(Exception):
+    """No se liberó ninguna conexión dentro de DB_POOL_TIMEOUT."""
+
+
+class ConnectionPool:
+    """
+    Pool sencillo de conexiones ociosas. Se reinicia solo si detecta que el
+    proceso cambió (fork de gunicorn), de modo que ningún worker comparte
+    sockets con su padre. Con max_open > 0 nunca hay más de max_open
+    conexiones prestadas a la vez: las peticiones de más esperan (hasta
+    `timeout` segundos) a que otra devuelva la suya.
+    """
+
+    def __init__(self, factory, size=5, max_idle=300, ping=True, max_open=0, timeout=10):
+        self.factory = factory
+        self.size = size
+        self.max_idle = max_idle
+        self.ping = ping
+        self.max_open = max_open
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._libre = threading.Condition(self._lock)
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._idle = deque()
+        self._in_use = 0
+        self._stats = {"created": 0, "reused": 0, "discarded": 0, "ping_failures": 0,
+                       "waits": 0, "timeouts": 0}
+
+    def _check_pid(self):
+        if self._pid != os.getpid():
+            # no cerramos las heredadas: el socket pertenece al proceso padre
+            self._reset()
+
+    def _discard(self, raw):
+        self._stats["discarded"] += 1
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def acquire(self):
+        with self._lock:
+            self._check_pid()
+            if self.max_open and self._in_use >= self.max_open:
+                self._stats["waits"] += 1
+                limite = time.monotonic() + self.timeout
+                while self._in_use >= self.max_open:
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolAgotado(f"Sin conexiones libres a la base de datos ({self.max_open} en uso)")
+                    self._libre.wait(restante)
+            # el cupo se reserva antes de abrir/validar fuera del lock
+            self._in_use += 1
+        try:
+            raw = self._tomar()
+        except BaseException:
+            with self._lock:
+                self._in_use = max(0, self._in_use - 1)
+                self._libre.notify()
+            raise
+        return PooledConnection(self, raw)
+
+    def _tomar(self):
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                raw, last_used = self._idle.pop()
+            if self.max_idle and time.monotonic() - last_used > self.max_idle:
+                with self._lock:
+                    self._discard(raw)
+                continue
+            if self.ping:
+                try:
+                    raw.ping(reconnect=False)
+                except Exception:
+                    with self._lock:
+                        self._stats["ping_failures"] += 1
+                        self._discard(raw)
+                    continue
+            with self._lock:
+                self._stats["reused"] += 1
+            return raw
+
+        raw = self.factory()
+        with self._lock:
+            self._stats["created"] += 1
+        return raw
+
+    def release(self, raw):
+        with self._lock:
+            if self._pid != os.getpid():
+                return
+            self._in_use = max(0, self._in_use - 1)
+            self._libre.notify()
+        try:
+            # cerrar cualquier transacción abierta para no leer snapshots viejos
+            raw.rollback()
+        except Exception:
+            with self._lock:
+                self._discard(raw)
+            return
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append((raw, time.monotonic()))
+            else:
+                self._discard(raw)
+
+    def stats(self):
+        with self._lock:
+            self._check_pid()
+            out = dict(self._stats)
+            out.update({
+                "pid": self._pid,
+                "size": self.size,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "max_idle": self.max_idle,
+                "ping": self.ping,
+                "max_open": self.max_open,
+                "timeout": self.timeout,
+            })
+            return out
+
+
+db_pool = ConnectionPool(_new_db_connection, size=DB_POOL_SIZE,
+                         max_idle=DB_POOL_MAX_IDLE, ping=DB_POOL_PING,
+                         max_open=DB_POOL_MAX, timeout=DB_POOL_TIMEOUT)
+
+
+@metricas.colector
+def _metricas_pool():
+    stats = db_pool.stats()
+    return [
+        ("app_db_pool_connections", "gauge", "Conexiones del pool MySQL por estado.",
+         {(("estado", k),): stats[k] for k in ("idle", "in_use")}),
+        ("app_db_pool_events_total", "counter", "Eventos del pool MySQL.",
+         {(("evento", k),): stats[k] for k in ("created", "reused", "discarded", "ping_failures", "waits", "timeouts")}),
+    ]
+
+
+def get_db_connection():
+    if DB_POOL_SIZE <= 0:
+        return _new_db_connection()
+    return db_pool.acquire()
+
+
 # Helper: replace None values with empty strings in rows returned by cursor.fetchall()
 def sanitize_rows(rows):
     out = []
@@ -105,14 +400,222 @@ def sanitize_rows(rows):
     return out
 
 
+# ---------------- Modelo de lectura en memoria de empleados_info ----------------
+# Columnas que muestra cada vista de sección (el orden es el de la tabla HTML;
+# `foto` no se muestra, alimenta el data-foto de cada fila)
+SECCION_COLUMNAS = {
+    "empleados": [
+        "Numero de DPI", "Nombre", "Apellidos", "Apellidos de casada", "Estado Civil",
+        "Nacionalidad", "Departamento", "Fecha de nacimiento",
+        "Lugar de nacimiento", "Numero de Afiliación del IGGS", "Dirección del Domicilio",
+        "Numero de Telefono", "Religión", "Correo Electronico", "Puesto de trabajo",
+        "Tipo de contrato", "Jornada laboral", "Duración del trabajo",
+        "Fecha de inicio laboral", "Dias Laborales", "foto",
+    ],
+    "about": [
+        "Numero de DPI", "Nombre", "Apellidos",
+        "Nivel de estudios", "Profesión u Oficio",
+        "Colegio o establecimiento", "Cursos o titulos adicionales",
+        "foto",
+    ],
+    "conyugue": [
+        "Numero de DPI", "Nombre", "Apellidos",
+        "Nombres del conyugue", "Apellidos del conyugue",
+        "Direccion del conyugue", "Numero de telefono del conyugue", "Correo electronico del conyugue",
+    ],
+    "emergencia": [
+        "Numero de DPI", "Nombre", "Apellidos",
+        "Nombre del contacto de emergencia", "Apellidos del contacto de emergencia",
+        "Numero de telefono de emergencia",
+        "foto",
+    ],
+    "laboral": [
+        "Numero de DPI", "Nombre", "Apellidos",
+        "Nombre de la Empresa (Ultimo Trabajo)", "Direccion de la empresa",
+        "Inicio laboral en la empresa", "Fin Laboral en la empresa", "Motivo del retiro",
+        "Nombre del Jefe Imediato", "Numero del Jefe inmediato",
+        "foto",
+    ],
+    "medica": [
+        "Numero de DPI", "Nombre", "Apellidos",
+        "Padece alguna enfermedad", "Tipo de enfermedad", "Recibe tratamiento medico",
+        "Nombre del tratamiento", "Es alergico a algun medicamento", "Nombre del medico Tratante",
+        "Numero del medico tratante", "Tipo de sangre",
+        "foto",
+    ],
+}
+
+# Archivo compartido entre workers: su contenido es la versión actual de empleados_info
+EMPLEADOS_VERSION_PATH = os.environ.get("EMPLEADOS_VERSION_PATH",
+                                        os.path.join(app.root_path, "data", "empleados_version"))
+# Recarga de seguridad por si alguien edita la tabla fuera de la app (0 = nunca)
+EMPLEADOS_CACHE_TTL = int(os.environ.get("EMPLEADOS_CACHE_TTL", "300"))
+
+
+class EmpleadosReadModel:
+    """
+    Copia en memoria (ya saneada) de las columnas que usan las vistas de
+    sección. Se recarga cuando cambia el archivo de versión, que escriben
+    los endpoints de guardado de cualquier worker.
+    """
+
+    def __init__(self, version_path, ttl=300):
+        self.version_path = version_path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._rows = None
+        self._version = None
+        self._loaded_at = 0.0
+        self._projections = {}
+        self.columns = []
+        for cols in SECCION_COLUMNAS.values():
+            for col in cols:
+                if col not in self.columns:
+                    self.columns.append(col)
+
+    def current_version(self):
+        try:
+            with open(self.version_path, "r", encoding="utf-8") as f:
+                return f.read().strip() or "0"
+        except OSError:
+            return "0"
+
+    def bump(self):
+        version = f"{time.time_ns():x}-{os.getpid():x}"
+        tmp = f"{self.version_path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(version)
+        os.replace(tmp, self.version_path)
+        with self._lock:
+            self._rows = None
+            self._projections = {}
+        return version
+
+    def _stale(self, version):
+        if self._rows is None or self._version != version:
+            return True
+        return bool(self.ttl) and (time.monotonic() - self._loaded_at) > self.ttl
+
+    def rows(self):
+        version = self.current_version()
+        with self._lock:
+            if not self._stale(version):
+                return self._rows
+            cols = ", ".join(f"`{c}`" for c in self.columns)
+            conn = get_db_connection()
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT {cols} FROM empleados_info")
+            rows = cursor.fetchall()
+            cursor.close()
+            conn.close()
+            self._rows = sanitize_rows(rows)
+            self._version = version
+            self._loaded_at = time.monotonic()
+            self._projections = {}
+            return self._rows
+
+    def project(self, columns):
+        rows = self.rows()
+        key = tuple(columns)
+        with self._lock:
+            cached = self._projections.get(key)
+            if cached is not None and cached[0] is rows:
+                return cached[1]
+        out = [{c: r.get(c, "") for c in columns} for r in rows]
+        with self._lock:
+            self._projections[key] = (rows, out)
+        return out
+
+    def seccion(self, nombre):
+        return self.project(SECCION_COLUMNAS[nombre])
+
+    def indice(self):
+        """Índice de búsqueda por nombre/DPI; se reconstruye junto con las filas."""
+        rows = self.rows()
+        with self._lock:
+            cached = self._projections.get("__indice__")
+            if cached is not None and cached[0] is rows:
+                return cached[1]
+        indice = IndiceNombres(rows)
+        with self._lock:
+            self._projections["__indice__"] = (rows, indice)
+        return indice
+
+    def ordenados(self, columnas_orden):
+        """
+        Filas ordenadas por columnas_orden y la llave de cada una (valores
+        plegados, como compara la colación de MySQL), para paginar con bisect.
+        """
+        rows = self.rows()
+        key = ("__orden__",) + tuple(columnas_orden)
+        with self._lock:
+            cached = self._projections.get(key)
+            if cached is not None and cached[0] is rows:
+                return cached[1]
+        llaves = [tuple(plegar(r.get(c)) for c in columnas_orden) for r in rows]
+        orden = sorted(range(len(rows)), key=llaves.__getitem__)
+        out = ([rows[i] for i in orden], [llaves[i] for i in orden])
+        with self._lock:
+            self._projections[key] = (rows, out)
+        return out
+
+
+empleados_cache = EmpleadosReadModel(EMPLEADOS_VERSION_PATH, ttl=EMPLEADOS_CACHE_TTL)
+
+
+def empleados_changed():
+    """Llamar después de cada commit que modifique empleados_info."""
+    try:
+        empleados_cache.bump()
+    except Exception:
+        app.logger.exception("No se pudo invalidar el cache de empleados")
+
+
+# ---------------- GET condicional (ETag / Last-Modified) ----------------
+def empleados_last_modified():
+    try:
+        return datetime.utcfromtimestamp(int(os.stat(EMPLEADOS_VERSION_PATH).st_mtime))
+    except OSError:
+        return None
+
+
+def conditional_get(version_parts, last_modified, build):
+    """
+    Responde 304 si el cliente ya tiene esta versión del recurso; si no,
+    llama a build() y le pone ETag fuerte y Last-Modified. Las versiones se
+    leen ANTES de construir el cuerpo, así una escritura concurrente a lo
+    sumo provoca una descarga de más, nunca una copia vieja con ETag nuevo.
+    """
+    raw = "|".join(str(p) for p in version_parts)
+    etag = hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    not_modified = False
+    if request.if_none_match:
+        # comparación débil: la capa de compresión entrega W/"..." en cuerpos comprimidos
+        not_modified = request.if_none_match.contains_weak(etag)
+    elif last_modified is not None and request.if_modified_since is not None:
+        not_modified = request.if_modified_since.replace(tzinfo=None) >= last_modified.replace(microsecond=0)
+
+    if not_modified:
+        resp = make_response("", 304)
+    else:
+        resp = make_response(build())
+        if resp.status_code != 200:
+            return resp
+    resp.set_etag(etag)
+    if last_modified is not None:
+        resp.last_modified = last_modified
+    return resp
+
+
 @app.before_request
 def requerir_login():
     rutas_publicas = {
-        "login", "static", "db_test", "db-test",
+        "login", "static", "db_test", "db-test", "db_pool_stats", "metrics",
         "guardar_empleado", "guardar_academico", "guardar_conyugue",
         "guardar_emergencia", "guardar_laboral", "guardar_medica",
-        "api_foto", "subir_foto", "eliminar_foto", "api_empleados_list", "api_empleado_get", "api_empleados",
-        "planilla", "api_planilla", "guardar_planilla", "whoami"
+        "api_foto", "api_fotos", "api_foto_job", "foto_archivo", "subir_foto", "eliminar_foto", "api_empleados_list", "api_empleados_buscar", "api_empleado_get", "api_empleados",
+        "planilla", "api_planilla", "guardar_planilla", "api_planilla_fila", "api_planilla_calcular", "whoami", "api_bootstrap"
     }
     endpoint = request.endpoint or ""
     base_endpoint = endpoint.split(".")[0] if "." in endpoint else endpoint
@@ -122,12 +625,67 @@ def requerir_login():
 
 @app.after_request
 def no_cache(response):
+    if request.endpoint == "static":
+        # los estáticos fijan su propia política (immutable si llevan huella)
+        return response
+    if "immutable" in (response.headers.get("Cache-Control") or ""):
+        # contenido direccionado por hash: nunca cambia bajo la misma URL
+        return response
+    if response.headers.get("ETag"):
+        # recursos versionados: el navegador puede guardar la copia pero debe revalidar
+        response.headers["Cache-Control"] = "private, no-cache"
+        return response
     response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, max-age=0"
     response.headers["Pragma"] = "no-cache"
     response.headers["Expires"] = "0"
     return response
 
 
+# ---------------- Sesión ----------------
+def sesion_actual():
+    """Usuario y rol tal como quedaron en la cookie firmada al iniciar sesión (sin BD)."""
+    usuario = session.get("usuario")
+    return {
+        "autenticado": usuario is not None,
+        "usuario": usuario,
+        "rol": (session.get("rol") or "").strip().lower() or None,
+    }
+
+
+ROLES_ADMIN = ("admin", "superadmin")
+
+
+def es_admin():
+    """¿La sesión tiene rol de administración? (los mismos que api_usuarios_rol)."""
+    return (session.get("rol") or "").strip().lower() in ROLES_ADMIN
+
+
+@app.route("/whoami")
+def whoami():
+    return jsonify(sesion_actual())
+
+
+@app.route("/api/bootstrap")
+def api_bootstrap():
+    """
+    Todo lo que una página necesita al arrancar en una sola respuesta:
+    sesión y las versiones actuales de empleados y planilla, para decidir
+    si hace falta volver a pedir esos recursos. Con ETag: si nada cambió
+    la revalidación es un 304 vacío.
+    """
+    sesion = sesion_actual()
+    versiones = {
+        "empleados": empleados_cache.current_version(),
+        "planilla": planilla_store.saved_at(),
+    }
+
+    def build():
+        return jsonify({**sesion, "versiones": versiones})
+
+    return conditional_get(("bootstrap", sesion["usuario"], sesion["rol"],
+                            versiones["empleados"], versiones["planilla"]), None, build)
+
+
 # ---------------- Páginas principales ----------------
 
 @app.route("/menu")
@@ -141,24 +699,7 @@ def menu():
 def empleados():
     if "usuario" not in session:
         return redirect(url_for("login"))
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT 
-            `Numero de DPI`, `Nombre`, `Apellidos`, `Apellidos de casada`, `Estado Civil`,
-            `Nacionalidad`, `Departamento`, `Fecha de nacimiento`,
-            `Lugar de nacimiento`, `Numero de Afiliación del IGGS`, `Dirección del Domicilio`,
-            `Numero de Telefono`, `Religión`, `Correo Electronico`, `Puesto de trabajo`,
-            `Tipo de contrato`, `Jornada laboral`, `Duración del trabajo`,
-            `Fecha de inicio laboral`, `Dias Laborales`, `foto`
-        FROM empleados_info
-    """)
-    empleados = cursor.fetchall()
-    cursor.close()
-    conn.close()
-
-    empleados = sanitize_rows(empleados)
-    return render_template("home.html", empleados=empleados, usuario=session.get("usuario"))
+    return render_seccion("home.html", "empleados")
 
 
 @app.route("/")
@@ -168,13 +709,272 @@ def home():
     return redirect(url_for("login"))
 
 
+# ---------------- Paginación keyset de empleados ----------------
+# Orden estable: Apellidos, Nombre y DPI como desempate (único).
+EMPLEADOS_ORDER_COLS = ("Apellidos", "Nombre", "Numero de DPI")
+EMPLEADOS_PAGE_DEFAULT = 100
+EMPLEADOS_PAGE_MAX = 1000
+
+# parámetro de query -> columna filtrable por prefijo
+EMPLEADOS_PREFIX_FILTERS = {
+    "nombre": "Nombre",
+    "apellidos": "Apellidos",
+    "dpi": "Numero de DPI",
+}
+
+
+def encode_cursor(values):
+    raw = json.dumps(list(values), ensure_ascii=False, default=str).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token):
+    padded = token + "=" * (-len(token) % 4)
+    values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+    if not isinstance(values, list):
+        raise ValueError("cursor inválido")
+    return values
+
+
+def _like_prefix(value):
+    escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped + "%"
+
+
+def keyset_after_clause(cols, values):
+    """
+    Construye el predicado "fila > cursor" para ORDER BY cols ASC.
+    MySQL ordena NULL primero, así que un NULL en el cursor significa
+    "cualquier valor no NULL es mayor". Se usa <=> para la igualdad.
+    """
+    ors = []
+    params = []
+    for i, col in enumerate(cols):
+        parts = []
+        for prev_col, prev_val in zip(cols[:i], values[:i]):
+            parts.append(f"`{prev_col}` <=> %s")
+            params.append(prev_val)
+        if values[i] is None:
+            parts.append(f"`{col}` IS NOT NULL")
+        else:
+            parts.append(f"`{col}` > %s")
+            params.append(values[i])
+        ors.append("(" + " AND ".join(parts) + ")")
+    return "(" + " OR ".join(ors) + ")", params
+
+
+def parse_page_args(args):
+    """Lee ?limit= (EMPLEADOS_PAGE_DEFAULT si falta) y ?after= ; lanza ValueError si vienen mal formados."""
+    after = args.get("after") or None
+    limit = args.get("limit")
+    if limit is not None and limit != "":
+        limit = int(limit)
+        if limit <= 0:
+            raise ValueError("limit debe ser mayor que 0")
+        limit = min(limit, EMPLEADOS_PAGE_MAX)
+    else:
+        limit = EMPLEADOS_PAGE_DEFAULT
+    after_values = decode_cursor(after) if after else None
+    return limit, after_values
+
+
+def empleados_list_response():
+    """
+    Respuesta compartida por /api/empleados (GET) y /api/categories.
+    Siempre pagina por keyset (sin ?limit, EMPLEADOS_PAGE_DEFAULT filas) y
+    deja en los headers X-Next-Cursor y Link para pedir la siguiente
+    página; quien necesita toda la lista las recorre. X-Total-Count solo va
+    en la primera página (sin ?after): las siguientes no repiten el COUNT(*).
+    """
+    try:
+        limit, after_values = parse_page_args(request.args)
+        if after_values is not None and len(after_values) != len(EMPLEADOS_ORDER_COLS):
+            raise ValueError("cursor inválido")
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": f"Parámetros de paginación inválidos: {e}"}), 400
+
+    where = ["(`Nombre` IS NOT NULL OR `Apellidos` IS NOT NULL)"]
+    params = []
+    for arg, col in EMPLEADOS_PREFIX_FILTERS.items():
+        value = (request.args.get(arg) or "").strip()
+        if value:
+            where.append(f"`{col}` LIKE %s")
+            params.append(_like_prefix(value))
+
+    # ?foto=thumb|medium|full incrusta la URL de la foto en cada elemento
+    foto_size = request.args.get("foto") or None
+    foto_fmt = request.args.get("foto_format", "jpeg")
+    if foto_size and (foto_size not in FOTO_TAMANOS or foto_fmt not in FOTO_FORMATOS):
+        return jsonify({"error": "Tamaño o formato de foto no válido"}), 400
+
+    filter_sql = " AND ".join(where)
+    page_where = list(where)
+    page_params = list(params)
+    if after_values is not None:
+        clause, clause_params = keyset_after_clause(EMPLEADOS_ORDER_COLS, after_values)
+        page_where.append(clause)
+        page_params.extend(clause_params)
+
+    sql = f"""
+        SELECT `Numero de DPI` as dpi,
+               COALESCE(CONCAT(`Nombre`, ' ', `Apellidos`), `Nombre`, `Apellidos`) as full_name,
+               `Apellidos` as _k_apellidos, `Nombre` as _k_nombre{", `foto` as _foto" if foto_size else ""}
+        FROM empleados_info
+        WHERE {" AND ".join(page_where)}
+        ORDER BY `Apellidos`, `Nombre`, `Numero de DPI`
+    """
+    sql += " LIMIT %s"
+    page_params.append(limit + 1)
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute(sql, page_params)
+    rows = cursor.fetchall()
+    total = None
+    if after_values is None:
+        if len(rows) <= limit:
+            total = len(rows)   # la página ya trae todo lo que hay
+        else:
+            cursor.execute(f"SELECT COUNT(*) AS total FROM empleados_info WHERE {filter_sql}", params)
+            total = (cursor.fetchone() or {}).get("total", 0)
+    cursor.close()
+    conn.close()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([last["_k_apellidos"], last["_k_nombre"], last["dpi"]])
+
+    out = []
+    for r in rows:
+        r.pop("_k_apellidos", None)
+        r.pop("_k_nombre", None)
+        if foto_size:
+            r["foto_url"] = resolver_foto(r.pop("_foto", None), foto_size, foto_fmt)
+        out.append(r)
+    resp = jsonify(sanitize_rows(out))
+    if total is not None:
+        resp.headers["X-Total-Count"] = str(total)
+    if next_cursor:
+        resp.headers["X-Next-Cursor"] = next_cursor
+        next_args = request.args.to_dict()
+        next_args["after"] = next_cursor
+        next_args["limit"] = str(limit)
+        resp.headers["Link"] = '<%s>; rel="next"' % url_for(request.endpoint, **next_args)
+    return resp
+
+
+# ---------------- Ventanas de filas para las tablas de sección ----------------
+# Las vistas de sección renderizan solo la primera ventana; el resto de filas
+# las pide la tabla a /api/secciones/<seccion>/filas a medida que se desplaza.
+VENTANA_INICIAL = int(os.environ.get("VENTANA_INICIAL", "100"))
+VENTANA_MAX = 500
+
+# Solo órdenes que cubre un índice de empleados_info (migraciones m002 y m003)
+ORDENES_SECCION = {
+    "apellidos": ("Apellidos", "Nombre", "Numero de DPI"),
+    "dpi": ("Numero de DPI",),
+}
+
+
+def ventana_seccion(seccion, args):
+    """
+    Una ventana de filas de la sección, desde el modelo de lectura.
+    args: limit, offset o after (cursor keyset), sort, dir y columns.
+    Lanza ValueError con un mensaje apto para el usuario.
+    """
+    visibles = [c for c in SECCION_COLUMNAS[seccion] if c != "foto"]
+    columnas = visibles
+    if args.get("columns"):
+        columnas = [c.strip() for c in args["columns"].split(",") if c.strip()]
+        desconocidas = [c for c in columnas if c not in visibles]
+        if desconocidas:
+            raise ValueError(f"Columnas no válidas: {', '.join(desconocidas)}")
+
+    orden = args.get("sort") or "apellidos"
+    if orden not in ORDENES_SECCION:
+        raise ValueError(f"sort debe ser uno de: {', '.join(ORDENES_SECCION)}")
+    direccion = (args.get("dir") or "asc").lower()
+    if direccion not in ("asc", "desc"):
+        raise ValueError("dir debe ser asc o desc")
+    limit = int(args.get("limit") or VENTANA_INICIAL)
+    if limit <= 0:
+        raise ValueError("limit debe ser mayor que 0")
+    limit = min(limit, VENTANA_MAX)
+
+    filas, llaves = empleados_cache.ordenados(ORDENES_SECCION[orden])
+    total = len(filas)
+    desc = direccion == "desc"
+    if args.get("after"):
+        llave = tuple(decode_cursor(args["after"]))
+        if len(llave) != len(ORDENES_SECCION[orden]):
+            raise ValueError("cursor inválido")
+        inicio = total - bisect.bisect_left(llaves, llave) if desc else bisect.bisect_right(llaves, llave)
+    else:
+        inicio = int(args.get("offset") or 0)
+        if inicio < 0:
+            raise ValueError("offset no puede ser negativo")
+
+    # posiciones en el orden pedido -> índices en la lista ascendente
+    fin = min(inicio + limit, total)
+    indices = range(total - 1 - inicio, total - 1 - fin, -1) if desc else range(inicio, fin)
+    return {
+        "seccion": seccion,
+        "columnas": columnas,
+        "orden": orden,
+        "dir": direccion,
+        "total": total,
+        "offset": inicio,
+        "filas": [filas[i] for i in indices],
+        "siguiente": encode_cursor(llaves[indices[-1]]) if fin < total and len(indices) else None,
+    }
+
+
+def render_seccion(template, seccion):
+    ventana = ventana_seccion(seccion, {})
+    return render_template(template, empleados=ventana["filas"], ventana=ventana,
+                           usuario=session.get("usuario"))
+
+
+@app.route("/api/secciones/<seccion>/filas")
+def api_seccion_filas(seccion):
+    """
+    Filas de una tabla de sección por ventanas: ?offset=N o ?after=<cursor>,
+    &limit=, &sort=apellidos|dpi, &dir=asc|desc, &columns=col1,col2.
+    Cada fila es una lista alineada con "columnas"; "fotos" trae la URL de
+    la foto de cada fila en las secciones que la muestran.
+    """
+    if seccion not in SECCION_COLUMNAS:
+        return jsonify({"error": "Sección no encontrada"}), 404
+
+    def build():
+        try:
+            ventana = ventana_seccion(seccion, request.args)
+        except (ValueError, TypeError) as e:
+            return jsonify({"error": f"Parámetros inválidos: {e}"}), 400
+        filas = ventana.pop("filas")
+        ventana["filas"] = [[str(r.get(c, "")) for c in ventana["columnas"]] for r in filas]
+        if "foto" in SECCION_COLUMNAS[seccion]:
+            ventana["fotos"] = [resolver_foto(r.get("foto"), "medium", "webp") or "" for r in filas]
+        return jsonify(ventana)
+
+    try:
+        return conditional_get(
+            ("seccion", seccion, empleados_cache.current_version(), request.query_string.decode("latin-1")),
+            empleados_last_modified(), build)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 # ---------------- API lista / creación ----------------
 @app.route("/planilla.json")
 def api_planilla():
     try:
-        with open(PLANILLA_STORE_PATH, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        return jsonify(data)
+        saved_at = planilla_store.saved_at()
+        return conditional_get(
+            ("planilla.json", saved_at), planilla_last_modified(saved_at),
+            lambda: jsonify(read_planilla_store() or {"rows": [], "meta": {}}))
     except Exception:
         return jsonify({"rows": [], "meta": {}})
 
@@ -183,20 +983,9 @@ def api_planilla():
 def api_empleados_list():
     if request.method == "GET":
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT `Numero de DPI` as dpi,
-                       COALESCE(CONCAT(`Nombre`, ' ', `Apellidos`), `Nombre`, `Apellidos`) as full_name
-                FROM empleados_info
-                WHERE `Nombre` IS NOT NULL OR `Apellidos` IS NOT NULL
-                ORDER BY `Apellidos`, `Nombre`
-            """)
-            rows = cursor.fetchall()
-            cursor.close()
-            conn.close()
-            rows = sanitize_rows(rows)
-            return jsonify(rows)
+            return conditional_get(
+                ("empleados", empleados_cache.current_version(), request.query_string.decode("latin-1")),
+                empleados_last_modified(), empleados_list_response)
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
@@ -256,6 +1045,7 @@ def api_empleados_list():
             inicio, dias
         ))
         conn.commit()
+        empleados_changed()
         cursor.close()
         conn.close()
         return jsonify({"mensaje": "Empleado agregado correctamente"})
@@ -263,24 +1053,50 @@ def api_empleados_list():
         return jsonify({"mensaje": f"Error: {e}"}), 500
 
 
+BUSCAR_LIMITE_DEFAULT = 10
+BUSCAR_LIMITE_MAX = 50
+
+
+@app.route("/api/empleados/buscar")
+def api_empleados_buscar():
+    """
+    Autocompletado: ?q=texto&limit=N. Coincide por prefijo o subcadena de
+    nombre, apellidos o DPI sin importar mayúsculas ni acentos.
+    """
+    q = (request.args.get("q") or "").strip()
+    try:
+        limite = min(max(int(request.args.get("limit", BUSCAR_LIMITE_DEFAULT)), 1), BUSCAR_LIMITE_MAX)
+    except ValueError:
+        return jsonify({"error": "limit debe ser un número"}), 400
+    if not q:
+        return jsonify({"q": q, "resultados": []})
+    try:
+        indice = empleados_cache.indice()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+    inicio = time.perf_counter()
+    encontrados = indice.buscar(q, limite)
+    ms = (time.perf_counter() - inicio) * 1000
+    resultados = [{
+        "dpi": dpi,
+        "Nombre": nombre,
+        "Apellidos": apellidos,
+        "full_name": f"{nombre} {apellidos}".strip(),
+        "score": score,
+    } for score, dpi, nombre, apellidos in encontrados]
+    resp = jsonify({"q": q, "resultados": resultados})
+    resp.headers["Server-Timing"] = f"buscar;dur={ms:.3f}"
+    return resp
+
+
 # Compatibilidad rápida para frontend que pide /api/categories
 @app.route("/api/categories", methods=["GET"])
 def api_categories_compat():
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT `Numero de DPI` as dpi,
-                   COALESCE(CONCAT(`Nombre`, ' ', `Apellidos`), `Nombre`, `Apellidos`) as full_name
-            FROM empleados_info
-            WHERE `Nombre` IS NOT NULL OR `Apellidos` IS NOT NULL
-            ORDER BY `Apellidos`, `Nombre`
-        """)
-        rows = cursor.fetchall()
-        cursor.close()
-        conn.close()
-        rows = sanitize_rows(rows)
-        return jsonify(rows)
+        return conditional_get(
+            ("empleados", empleados_cache.current_version(), request.query_string.decode("latin-1")),
+            empleados_last_modified(), empleados_list_response)
     except Exception as e:
         app.logger.exception("Error en /api/categories")
         return jsonify({"error": str(e)}), 500
@@ -331,8 +1147,7 @@ def api_usuarios_rol():
     Solo roles permitidos: admin y colaborador.
     Autorización: session['rol']=='admin' o 'superadmin'.
     """
-    current = (session.get('rol') or '').strip().lower()
-    if current not in ('admin', 'superadmin'):
+    if not es_admin():
         return jsonify({'mensaje': 'Permisos insuficientes'}), 403
 
     data = request.get_json(silent=True) or {}
@@ -380,7 +1195,7 @@ def api_empleado_get(dpi):
 
     # ---------------- GET: devolver datos del empleado ----------------
     if request.method == "GET":
-        try:
+        def build():
             conn = get_db_connection()
             cursor = conn.cursor()
             cursor.execute("""
@@ -401,6 +1216,9 @@ def api_empleado_get(dpi):
 
             return jsonify(row)
 
+        try:
+            return conditional_get(("empleado", empleados_cache.current_version(), dpi),
+                                   empleados_last_modified(), build)
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
@@ -409,60 +1227,23 @@ def api_empleado_get(dpi):
         data = request.get_json() or {}
 
         new_dpi = data.get("Numero de DPI") or data.get("dpi") or dpi
-        original_dpi = dpi
+        campos = campos_presentes(data, COLUMNAS_EDITABLES["empleados"])
 
         try:
             conn = get_db_connection()
             cursor = conn.cursor()
 
-            cursor.execute("""
-                UPDATE empleados_info
-                SET `Numero de DPI`=%s,
-                    `Nombre`=%s,
-                    `Apellidos`=%s,
-                    `Apellidos de casada`=%s,
-                    `Estado Civil`=%s,
-                    `Nacionalidad`=%s,
-                    `Departamento`=%s,
-                    `Fecha de nacimiento`=%s,
-                    `Lugar de nacimiento`=%s,
-                    `Numero de Afiliación del IGGS`=%s,
-                    `Dirección del Domicilio`=%s,
-                    `Numero de Telefono`=%s,
-                    `Religión`=%s,
-                    `Correo Electronico`=%s,
-                    `Puesto de trabajo`=%s,
-                    `Tipo de contrato`=%s,
-                    `Jornada laboral`=%s,
-                    `Duración del trabajo`=%s,
-                    `Fecha de inicio laboral`=%s,
-                    `Dias Laborales`=%s
-                WHERE `Numero de DPI`=%s
-            """, (
-                new_dpi,
-                data.get("Nombre"),
-                data.get("Apellidos"),
-                data.get("Apellidos de casada"),
-                data.get("Estado Civil"),
-                data.get("Nacionalidad"),
-                data.get("Departamento"),
-                data.get("Fecha de nacimiento"),
-                data.get("Lugar de nacimiento"),
-                data.get("Numero de Afiliación del IGGS"),
-                data.get("Dirección del Domicilio"),
-                data.get("Numero de Telefono"),
-                data.get("Religión"),
-                data.get("Correo Electronico"),
-                data.get("Puesto de trabajo"),
-                data.get("Tipo de contrato"),
-                data.get("Jornada laboral"),
-                data.get("Duración del trabajo"),
-                data.get("Fecha de inicio laboral"),
-                data.get("Dias Laborales"),
-                original_dpi
-            ))
-
-            conn.commit()
+            if actualizar_empleado(cursor, dpi, campos, nuevo_dpi=new_dpi):
+                conn.commit()
+                empleados_changed()
+            else:
+                # 0 filas afectadas: o no existe, o ya tenía esos valores
+                cursor.execute("SELECT 1 FROM empleados_info WHERE `Numero de DPI`=%s LIMIT 1", (dpi,))
+                existe = cursor.fetchone()
+                if not existe:
+                    cursor.close()
+                    conn.close()
+                    return jsonify({"mensaje": "Empleado no encontrado"}), 404
             cursor.close()
             conn.close()
 
@@ -473,98 +1254,27 @@ def api_empleado_get(dpi):
 
 @app.route("/about")
 def about():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT
-            `Numero de DPI`, `Nombre`, `Apellidos`,
-            `Nivel de estudios`, `Profesión u Oficio`,
-            `Colegio o establecimiento`, `Cursos o titulos adicionales`
-        FROM empleados_info
-    """)
-    empleados = cursor.fetchall()
-    cursor.close()
-    conn.close()
-
-    empleados = sanitize_rows(empleados)
-    return render_template("about.html", empleados=empleados, usuario=session.get("usuario"))
+    return render_seccion("about.html", "about")
 
 
 @app.route("/conyugue")
 def conyugue():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT 
-            `Numero de DPI`, `Nombre`, `Apellidos`,
-            `Nombres del conyugue`, `Apellidos del conyugue`,
-            `Direccion del conyugue`, `Numero de telefono del conyugue`, `Correo electronico del conyugue`
-        FROM empleados_info
-    """)
-    empleados = cursor.fetchall()
-    cursor.close()
-    conn.close()
-
-    empleados = sanitize_rows(empleados)
-    return render_template("conyugue.html", empleados=empleados, usuario=session.get("usuario"))
+    return render_seccion("conyugue.html", "conyugue")
 
 
 @app.route("/emergencia")
 def emergencia():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT 
-            `Numero de DPI`, `Nombre`, `Apellidos`,
-            `Nombre del contacto de emergencia`, `Apellidos del contacto de emergencia`,
-            `Numero de telefono de emergencia`
-        FROM empleados_info
-    """)
-    empleados = cursor.fetchall()
-    cursor.close()
-    conn.close()
-
-    empleados = sanitize_rows(empleados)
-    return render_template("emergencia.html", empleados=empleados, usuario=session.get("usuario"))
+    return render_seccion("emergencia.html", "emergencia")
 
 
 @app.route("/laboral")
 def laboral():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT 
-            `Numero de DPI`, `Nombre`, `Apellidos`,
-            `Nombre de la Empresa (Ultimo Trabajo)`, `Direccion de la empresa`,
-            `Inicio laboral en la empresa`, `Fin Laboral en la empresa`, `Motivo del retiro`,
-            `Nombre del Jefe Imediato`, `Numero del Jefe inmediato`
-        FROM empleados_info
-    """)
-    empleados = cursor.fetchall()
-    cursor.close()
-    conn.close()
-
-    empleados = sanitize_rows(empleados)
-    return render_template("laboral.html", empleados=empleados, usuario=session.get("usuario"))
+    return render_seccion("laboral.html", "laboral")
 
 
 @app.route("/medica")
 def medica():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT
-            `Numero de DPI`, `Nombre`, `Apellidos`,
-            `Padece alguna enfermedad`, `Tipo de enfermedad`, `Recibe tratamiento medico`,
-            `Nombre del tratamiento`, `Es alergico a algun medicamento`, `Nombre del medico Tratante`,`Numero del medico tratante`, `Tipo de sangre`
-        FROM empleados_info
-    """)
-    empleados = cursor.fetchall()
-    cursor.close()
-    conn.close()
-
-    empleados = sanitize_rows(empleados)
-    return render_template("medica.html", empleados=empleados, usuario=session.get("usuario"))
+    return render_seccion("medica.html", "medica")
 
 
 @app.route("/ficha")
@@ -703,89 +1413,224 @@ def db_test():
         return f"Error de conexión: {e}"
 
 
+def sin_acceso_operacion():
+    """
+    Endpoints de operación (sin redirección a /login para que Prometheus
+    pueda leerlos): pasan con el token Bearer METRICAS_TOKEN o con una sesión
+    de admin. Devuelve la respuesta de error, o None si hay acceso.
+    """
+    if METRICAS_TOKEN and hmac.compare_digest(
+            request.headers.get("Authorization", "").encode(), f"Bearer {METRICAS_TOKEN}".encode()):
+        return None
+    if es_admin():
+        return None
+    if "usuario" in session:
+        return jsonify({"mensaje": "Permisos insuficientes"}), 403
+    return jsonify({"error": "No autorizado"}), 401
+
+
+@app.route("/db-pool")
+def db_pool_stats():
+    denegado = sin_acceso_operacion()
+    if denegado:
+        return denegado
+    return jsonify(db_pool.stats())
+
+
+@app.route("/metrics")
+def metrics():
+    """Métricas de todos los workers en formato de texto de Prometheus."""
+    if not METRICAS_ENABLED:
+        return jsonify({"error": "Métricas desactivadas"}), 404
+    denegado = sin_acceso_operacion()
+    if denegado:
+        return denegado
+    return Response(metricas.exposicion(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.route("/api/perfiles")
+def api_perfiles():
+    """Perfiles recientes (collapsed stacks), del más nuevo al más viejo."""
+    if not es_admin():
+        return jsonify({"mensaje": "Permisos insuficientes"}), 403
+    perfiles = perfilador.listar()
+    for p in perfiles:
+        p["url"] = url_for("api_perfil_descargar", nombre=p["nombre"])
+    return jsonify({
+        "activo": PERFILES_ENABLED,
+        "modo": "greenlets" if cooperativo() else "hilos",
+        "muestreo": PERFILES_MUESTREO,
+        "endpoints": sorted(PERFILES_ENDPOINTS),
+        "intervalo_ms": perfilador.intervalo * 1000,
+        "max_bytes": perfilador.max_bytes,
+        "max_archivos": perfilador.max_archivos,
+        "perfiles": perfiles,
+    })
+
+
+@app.route("/api/perfiles/<nombre>")
+def api_perfil_descargar(nombre):
+    """Descarga un perfil; se abre con flamegraph.pl, speedscope o inferno."""
+    if not es_admin():
+        return jsonify({"mensaje": "Permisos insuficientes"}), 403
+    ruta = perfilador.ruta(nombre)
+    if not ruta:
+        return jsonify({"error": "Perfil no encontrado"}), 404
+    return send_file(ruta, mimetype="text/plain", as_attachment=True, download_name=nombre)
+
+
 # ---------------- Guardados (POST JSON) ----------------
-@app.route("/guardar_empleado", methods=["POST"])
-def guardar_empleado():
-    data = request.get_json() or {}
+# ---------------- Escritura parcial de empleados_info ----------------
+# Columnas propias de cada formulario de sección (sin DPI/nombre/foto)
+COLUMNAS_EDITABLES = {
+    seccion: [c for c in cols if c not in ("Numero de DPI", "Nombre", "Apellidos", "foto")]
+    for seccion, cols in SECCION_COLUMNAS.items() if seccion != "empleados"
+}
+COLUMNAS_EDITABLES["empleados"] = [c for c in SECCION_COLUMNAS["empleados"] if c not in ("Numero de DPI", "foto")]
 
-    # Accept new DPI and optional original_dpi (sent by frontend when editing)
-    dpi_val = data.get("Numero de DPI") or data.get("dpi") or data.get("Numero_de_DPI") or data.get("NumeroDeDPI") or data.get("NumeroDeDpi")
-    original_dpi = data.get("original_dpi") or data.get("dpi_original") or data.get("old_dpi") or data.get("dpiOld")
+_esquema = {}
+# el índice puede aparecer con una migración mientras los workers siguen
+# corriendo: se vuelve a consultar al cambiar la versión o pasado este plazo
+ESQUEMA_TTL = int(os.environ.get("ESQUEMA_TTL", "300"))
 
-    if not dpi_val:
-        return jsonify({"mensaje": "El campo DPI es obligatorio"}), 400
+
+def dpi_es_unico(cursor):
+    """
+    ¿Hay un índice UNIQUE/PRIMARY solo sobre el DPI? Uno compuesto (DPI, otra)
+    no garantiza un DPI por fila. Cacheado por versión de empleados y ESQUEMA_TTL.
+    """
+    version = empleados_cache.current_version()
+    cacheado = _esquema.get("dpi_unico")
+    if cacheado is None or cacheado[0] != version or time.monotonic() - cacheado[1] > ESQUEMA_TTL:
+        cursor.execute("SHOW INDEX FROM empleados_info WHERE Non_unique = 0")
+        indices = {}
+        for fila in cursor.fetchall():
+            indices.setdefault(fila["Key_name"], {})[int(fila["Seq_in_index"])] = fila["Column_name"]
+        unico = any(cols == {1: "Numero de DPI"} for cols in indices.values())
+        cacheado = _esquema["dpi_unico"] = (version, time.monotonic(), unico)
+    return cacheado[2]
+
+
+def campos_presentes(data, columnas, alias=None):
+    """Solo las columnas que vienen en el payload (por nombre exacto o alias)."""
+    campos = {c: data[c] for c in columnas if c in data}
+    for nombre, col in (alias or {}).items():
+        if col in columnas and col not in campos and nombre in data:
+            campos[col] = data[nombre]
+    return campos
+
+
+def upsert_empleado(cursor, dpi, campos, dpi_anterior=None):
+    """
+    Escribe solo `campos` en la fila del DPI y la crea si no existe.
+    Con índice único sobre el DPI es un solo INSERT ... ON DUPLICATE KEY
+    UPDATE; sin él, un UPDATE y solo si no afectó filas se verifica/inserta.
+    La llave se reescribe únicamente si dpi_anterior es distinto de dpi; en
+    ese caso no se inserta nada y si dpi_anterior no existe se devuelve
+    "no_encontrado". Si no, "insertado", "actualizado" o "sin_cambios".
+    """
+    campos = {c: v for c, v in campos.items() if c != "Numero de DPI"}
+    if dpi_anterior is not None and str(dpi_anterior) != str(dpi):
+        if actualizar_empleado(cursor, dpi_anterior, campos, nuevo_dpi=dpi):
+            return "actualizado"
+        cursor.execute("SELECT 1 FROM empleados_info WHERE `Numero de DPI`=%s LIMIT 1", (dpi_anterior,))
+        return "sin_cambios" if cursor.fetchone() else "no_encontrado"
+
+    if dpi_es_unico(cursor):
+        cols = ["Numero de DPI", *campos]
+        updates = ", ".join(f"`{c}`=VALUES(`{c}`)" for c in campos) or "`Numero de DPI`=`Numero de DPI`"
+        cursor.execute(
+            f"INSERT INTO empleados_info ({', '.join(f'`{c}`' for c in cols)}) "
+            f"VALUES ({', '.join(['%s'] * len(cols))}) ON DUPLICATE KEY UPDATE {updates}",
+            (dpi, *campos.values()))
+        # MySQL: 1 = insertada, 2 = actualizada, 0 = ya tenía esos valores
+        return {1: "insertado", 2: "actualizado"}.get(cursor.rowcount, "sin_cambios")
+
+    if actualizar_empleado(cursor, dpi, campos):
+        return "actualizado"
+    cursor.execute("SELECT 1 FROM empleados_info WHERE `Numero de DPI`=%s LIMIT 1", (dpi,))
+    if cursor.fetchone():
+        return "sin_cambios"
+    insertar_empleado(cursor, dpi, campos)
+    return "insertado"
+
+
+def actualizar_empleado(cursor, dpi, campos, nuevo_dpi=None):
+    """UPDATE de solo esas columnas; la llave se toca solo si nuevo_dpi cambia. Devuelve filas afectadas."""
+    sets = [f"`{c}`=%s" for c in campos if c != "Numero de DPI"]
+    params = [v for c, v in campos.items() if c != "Numero de DPI"]
+    if nuevo_dpi is not None and str(nuevo_dpi) != str(dpi):
+        sets.insert(0, "`Numero de DPI`=%s")
+        params.insert(0, nuevo_dpi)
+    if not sets:
+        return 0
+    cursor.execute(f"UPDATE empleados_info SET {', '.join(sets)} WHERE `Numero de DPI`=%s", (*params, dpi))
+    return cursor.rowcount
+
+
+def insertar_empleado(cursor, dpi, campos):
+    cols = ["Numero de DPI", *(c for c in campos if c != "Numero de DPI")]
+    cursor.execute(
+        f"INSERT INTO empleados_info ({', '.join(f'`{c}`' for c in cols)}) VALUES ({', '.join(['%s'] * len(cols))})",
+        (dpi, *(campos[c] for c in cols[1:])))
+
+
+def guardar_seccion(seccion, mensaje_agregado, mensaje_actualizado):
+    """Cuerpo común de los endpoints guardar_* de cada sección de la ficha."""
+    data = request.get_json() or {}
+    dpi = data.get("Numero de DPI") or data.get("dpi")
+    if not dpi:
+        return jsonify({"mensaje": "El campo Numero de DPI es obligatorio"}), 400
+
+    campos = campos_presentes(data, COLUMNAS_EDITABLES[seccion])
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        resultado = upsert_empleado(cursor, dpi, campos)
+        conn.commit()
+        if resultado != "sin_cambios":
+            empleados_changed()
+        cursor.close()
+        conn.close()
+        return jsonify({"mensaje": mensaje_agregado if resultado == "insertado" else mensaje_actualizado})
+    except Exception as e:
+        return jsonify({"mensaje": f"Error: {e}"}), 500
+
+
+@app.route("/guardar_empleado", methods=["POST"])
+def guardar_empleado():
+    data = request.get_json() or {}
+
+    # Accept new DPI and optional original_dpi (sent by frontend when editing)
+    dpi_val = data.get("Numero de DPI") or data.get("dpi") or data.get("Numero_de_DPI") or data.get("NumeroDeDPI") or data.get("NumeroDeDpi")
+    original_dpi = data.get("original_dpi") or data.get("dpi_original") or data.get("old_dpi") or data.get("dpiOld")
+
+    if not dpi_val:
+        return jsonify({"mensaje": "El campo DPI es obligatorio"}), 400
+
+    # Solo se escriben las columnas que llegaron (nombre exacto o alias corto)
+    campos = campos_presentes(data, COLUMNAS_EDITABLES["empleados"], ALIAS)
 
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
 
-        nombre = data.get("Nombre") or data.get("nombre")
-        apellidos = data.get("Apellidos") or data.get("apellidos")
-        apellidos_casada = data.get("Apellidos de casada") or data.get("apellidos_casada")
-        estado_civil = data.get("Estado Civil") or data.get("estado_civil")
-        nacionalidad = data.get("Nacionalidad") or data.get("nacionalidad")
-        departamento = data.get("Departamento") or data.get("departamento")
-        fecha_nacimiento = data.get("Fecha de nacimiento") or data.get("fecha_nacimiento")
-        lugar_nacimiento = data.get("Lugar de nacimiento") or data.get("lugar_nacimiento")
-        iggs = data.get("Numero de Afiliación del IGGS") or data.get("iggs")
-        direccion = data.get("Dirección del Domicilio") or data.get("direccion")
-        telefono = data.get("Numero de Telefono") or data.get("telefono")
-        religion = data.get("Religión") or data.get("religion")
-        correo = data.get("Correo Electronico") or data.get("correo")
-        puesto = data.get("Puesto de trabajo") or data.get("puesto")
-        contrato = data.get("Tipo de contrato") or data.get("contrato")
-        jornada = data.get("Jornada laboral") or data.get("jornada")
-        duracion = data.get("Duración del trabajo") or data.get("duracion")
-        inicio = data.get("Fecha de inicio laboral") or data.get("inicio")
-        dias = data.get("Dias Laborales") or data.get("dias")
-
         if data.get("nuevo"):
-            cursor.execute("""
-                INSERT INTO empleados_info (
-                    `Numero de DPI`, `Nombre`, `Apellidos`, `Apellidos de casada`, `Estado Civil`,
-                    `Nacionalidad`, `Departamento`, `Fecha de nacimiento`,
-                    `Lugar de nacimiento`, `Numero de Afiliación del IGGS`, `Dirección del Domicilio`,
-                    `Numero de Telefono`, `Religión`, `Correo Electronico`, `Puesto de trabajo`,
-                    `Tipo de contrato`, `Jornada laboral`, `Duración del trabajo`,
-                    `Fecha de inicio laboral`, `Dias Laborales`
-                ) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-            """, (
-                dpi_val, nombre, apellidos, apellidos_casada, estado_civil,
-                nacionalidad, departamento, fecha_nacimiento,
-                lugar_nacimiento, iggs, direccion,
-                telefono, religion, correo, puesto,
-                contrato, jornada, duracion,
-                inicio, dias
-            ))
+            insertar_empleado(cursor, dpi_val, campos)
             mensaje = "Empleado agregado correctamente"
+            resultado = "insertado"
         else:
-            # Use original_dpi as key to find the row; fallback to dpi_val if not provided
-            key_dpi = original_dpi if original_dpi else dpi_val
-
-            # Update including Numero de DPI so changes to DPI are saved
-            cursor.execute("""
-                UPDATE empleados_info
-                SET `Numero de DPI`=%s,
-                    `Nombre`=%s, `Apellidos`=%s, `Apellidos de casada`=%s, `Estado Civil`=%s,
-                    `Nacionalidad`=%s, `Departamento`=%s, `Fecha de nacimiento`=%s,
-                    `Lugar de nacimiento`=%s, `Numero de Afiliación del IGGS`=%s,
-                    `Dirección del Domicilio`=%s, `Numero de Telefono`=%s, `Religión`=%s,
-                    `Correo Electronico`=%s, `Puesto de trabajo`=%s, `Tipo de contrato`=%s,
-                    `Jornada laboral`=%s, `Duración del trabajo`=%s, `Fecha de inicio laboral`=%s,
-                    `Dias Laborales`=%s
-                WHERE `Numero de DPI`=%s
-            """, (
-                dpi_val, nombre, apellidos, apellidos_casada, estado_civil,
-                nacionalidad, departamento, fecha_nacimiento,
-                lugar_nacimiento, iggs,
-                direccion, telefono, religion,
-                correo, puesto, contrato,
-                jornada, duracion, inicio,
-                dias, key_dpi
-            ))
-            mensaje = "Empleado actualizado correctamente"
+            # Use original_dpi as key to find the row; the key is rewritten only if it changed
+            resultado = upsert_empleado(cursor, dpi_val, campos, dpi_anterior=original_dpi)
+            if resultado == "no_encontrado":
+                cursor.close()
+                conn.close()
+                return jsonify({"mensaje": "Empleado no encontrado"}), 404
+            mensaje = "Empleado agregado correctamente" if resultado == "insertado" else "Empleado actualizado correctamente"
 
         conn.commit()
+        if resultado != "sin_cambios":
+            empleados_changed()
         cursor.close()
         conn.close()
         return jsonify({"mensaje": mensaje})
@@ -796,7 +1641,7 @@ def guardar_empleado():
 @app.route("/eliminar_empleado", methods=["POST"])
 def eliminar_empleado():
     # deletion remains admin-only on server-side
-    if (session.get("rol") or "").strip().lower() != "admin":
+    if not es_admin():
         return jsonify({"mensaje": "Permisos insuficientes"}), 403
 
     data = request.get_json() or {}
@@ -809,6 +1654,7 @@ def eliminar_empleado():
         cursor = conn.cursor()
         cursor.execute("DELETE FROM empleados_info WHERE `Numero de DPI` = %s", (dpi,))
         conn.commit()
+        empleados_changed()
         cursor.close()
         conn.close()
         return jsonify({"mensaje": f"Empleado con DPI {dpi} eliminado correctamente"})
@@ -817,311 +1663,809 @@ def eliminar_empleado():
 
 
 
-@app.route("/guardar_academico", methods=["POST"])
-def guardar_academico():
-    data = request.get_json() or {}
-    dpi = data.get("Numero de DPI") or data.get("dpi")
-    if not dpi:
-        return jsonify({"mensaje": "El campo Numero de DPI es obligatorio"}), 400
+# ---------------- Importación masiva (CSV / XLSX) ----------------
+# La ficha completa: todas las columnas de todas las secciones
+COLUMNAS_FICHA = list(dict.fromkeys(c for cols in SECCION_COLUMNAS.values() for c in cols))
+# Las editables por importación (la foto se sube aparte)
+COLUMNAS_IMPORTABLES = [c for c in COLUMNAS_FICHA if c != "foto"]
+
 
-    nivel = data.get("Nivel de estudios")
-    profesion = data.get("Profesión u Oficio")
-    colegio = data.get("Colegio o establecimiento")
-    cursos = data.get("Cursos o titulos adicionales")
-    nuevo = data.get("nuevo", False)
+@app.route("/api/empleados/importar", methods=["POST"])
+def api_empleados_importar():
+    """
+    Recibe un archivo (campo 'archivo') CSV o XLSX con encabezados iguales
+    a las columnas de empleados_info (o sus nombres cortos: dpi, nombre...).
+    ?actualizar=1 actualiza los DPI que ya existen en vez de reportarlos;
+    ?lote=N cambia el tamaño de cada transacción.
+    """
+    if not es_admin():
+        return jsonify({"mensaje": "Permisos insuficientes"}), 403
+
+    archivo = request.files.get("archivo") or request.files.get("file")
+    if not archivo or not archivo.filename:
+        return jsonify({"mensaje": "Adjunte un archivo CSV o XLSX en el campo 'archivo'"}), 400
+
+    actualizar = request.args.get("actualizar", "0").lower() in ("1", "true", "si", "sí")
+    try:
+        lote = min(max(int(request.args.get("lote", LOTE_DEFAULT)), 1), 5000)
+    except ValueError:
+        return jsonify({"mensaje": "lote debe ser un número"}), 400
+
+    try:
+        mapa, ignorados, filas = leer_archivo(archivo.stream, archivo.filename, COLUMNAS_IMPORTABLES)
+    except ErrorImportacion as e:
+        return jsonify({"mensaje": str(e)}), 400
 
+    conn = importador = None
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT `Numero de DPI` FROM empleados_info WHERE `Numero de DPI` = %s", (dpi,))
-        existe = cursor.fetchone()
+        importador = Importador(conn, list(mapa.values()), actualizar=actualizar, lote=lote)
+        stats = importador.importar(filas)
+    except ErrorImportacion as e:
+        return jsonify({"mensaje": str(e)}), 400
+    except Exception as e:
+        return jsonify({"mensaje": f"Error al importar: {e}"}), 500
+    finally:
+        if conn is not None:
+            conn.close()
+        # los lotes ya confirmados cuentan aunque la importación se corte a medias
+        if importador is not None and (importador.stats["insertadas"] or importador.stats["actualizadas"]):
+            empleados_changed()
+
+    return jsonify({
+        "mensaje": f"Importación terminada: {stats['insertadas']} agregados, "
+                   f"{stats['actualizadas']} actualizados, {stats['errores']} con error",
+        "columnas": list(mapa.values()),
+        "columnas_ignoradas": ignorados,
+        "stats": stats,
+        "errores": importador.errores,
+        "errores_truncados": importador.total_errores > len(importador.errores),
+    })
 
-        if nuevo and not existe:
-            cursor.execute("""
-                INSERT INTO empleados_info (
-                    `Numero de DPI`, `Nivel de estudios`, `Profesión u Oficio`,
-                    `Colegio o establecimiento`, `Cursos o titulos adicionales`
-                ) VALUES (%s, %s, %s, %s, %s)
-            """, (dpi, nivel, profesion, colegio, cursos))
-            mensaje = "Registro académico agregado correctamente"
-        else:
-            if existe:
-                cursor.execute("""
-                    UPDATE empleados_info
-                    SET `Nivel de estudios`=%s,
-                        `Profesión u Oficio`=%s,
-                        `Colegio o establecimiento`=%s,
-                        `Cursos o titulos adicionales`=%s
-                    WHERE `Numero de DPI`=%s
-                """, (nivel, profesion, colegio, cursos, dpi))
-                mensaje = "Registro académico actualizado correctamente"
-            else:
-                cursor.execute("""
-                    INSERT INTO empleados_info (
-                        `Numero de DPI`, `Nivel de estudios`, `Profesión u Oficio`,
-                        `Colegio o establecimiento`, `Cursos o titulos adicionales`
-                    ) VALUES (%s, %s, %s, %s, %s)
-                """, (dpi, nivel, profesion, colegio, cursos))
-                mensaje = "Registro académico agregado correctamente"
 
-        conn.commit()
-        cursor.close()
+# ---------------- Migraciones de esquema ----------------
+@app.cli.command("migrar")
+@click.option("--estado", "solo_estado", is_flag=True, help="Solo muestra qué migraciones están aplicadas.")
+@click.option("--opcionales", is_flag=True, help="Incluye las migraciones opcionales.")
+@click.option("--hasta", type=int, default=None, help="Aplica hasta esta versión.")
+def cli_migrar(solo_estado, opcionales, hasta):
+    """Aplica las migraciones pendientes de empleados_info."""
+    conn = _new_db_connection()
+    try:
+        if not solo_estado:
+            aplicadas = migraciones.migrar(conn, opcionales=opcionales, hasta=hasta, log=click.echo)
+            click.echo(f"{len(aplicadas)} migraciones aplicadas")
+        for m in migraciones.estado(conn):
+            marca = m["aplicada_en"] or ("pendiente (opcional)" if m["opcional"] else "pendiente")
+            click.echo(f"{m['version']:03d}  {m['nombre']:<50} {marca}")
+    except migraciones.ErrorMigracion as e:
+        raise click.ClickException(str(e))
+    finally:
         conn.close()
-        return jsonify({"mensaje": mensaje})
+    # el índice único del DPI pudo aparecer: la nueva versión hace que los
+    # workers en marcha lo vuelvan a consultar
+    _esquema.clear()
+    if not solo_estado:
+        empleados_changed()
+
+
+@app.route("/api/migraciones")
+def api_migraciones():
+    if not es_admin():
+        return jsonify({"mensaje": "Permisos insuficientes"}), 403
+    try:
+        conn = get_db_connection()
+        try:
+            return jsonify(migraciones.estado(conn))
+        finally:
+            conn.close()
     except Exception as e:
-        return jsonify({"mensaje": f"Error: {e}"}), 500
+        return jsonify({"error": str(e)}), 500
 
 
-@app.route("/guardar_conyugue", methods=["POST"])
-def guardar_conyugue():
-    data = request.get_json() or {}
-    dpi = data.get("Numero de DPI") or data.get("dpi")
+# ---------------- Cambios por lote ----------------
+CAMBIOS_LOTE_MAX = int(os.environ.get("CAMBIOS_LOTE_MAX", "1000"))
+
+
+def _validar_cambio(item):
+    """Devuelve (dpi, campos) o un mensaje de error."""
+    if not isinstance(item, dict):
+        return "Cada cambio debe ser un objeto {dpi, fields}"
+    dpi = str(item.get("dpi") or item.get("Numero de DPI") or "").strip()
     if not dpi:
-        return jsonify({"mensaje": "El campo Numero de DPI es obligatorio"}), 400
+        return "El campo dpi es obligatorio"
+    fields = item.get("fields")
+    if not isinstance(fields, dict) or not fields:
+        return "fields debe ser un objeto con al menos una columna"
+    campos = {}
+    for nombre, valor in fields.items():
+        col = nombre if nombre in COLUMNAS_IMPORTABLES else ALIAS.get(nombre)
+        if col == "Numero de DPI":
+            return "El DPI no se puede cambiar por lote"
+        if col not in COLUMNAS_IMPORTABLES:
+            return f"Columna desconocida: {nombre}"
+        campos[col] = valor
+    return dpi, campos
+
+
+def _dpis_existentes(cursor, dpis):
+    existentes = set()
+    dpis = list(dpis)
+    for i in range(0, len(dpis), 500):
+        parte = dpis[i:i + 500]
+        cursor.execute(
+            f"SELECT `Numero de DPI` AS dpi FROM empleados_info WHERE `Numero de DPI` IN ({', '.join(['%s'] * len(parte))})",
+            parte)
+        existentes.update(str(r["dpi"]) for r in cursor.fetchall())
+    return existentes
 
-    nombres = data.get("Nombres del conyugue")
-    apellidos = data.get("Apellidos del conyugue")
-    direccion = data.get("Direccion del conyugue")
-    telefono = data.get("Numero de telefono del conyugue")
-    correo = data.get("Correo electronico del conyugue")
-    nuevo = data.get("nuevo", False)
+
+@app.route("/api/empleados/lote", methods=["POST"])
+def api_empleados_lote():
+    """
+    Aplica muchos cambios en una sola transacción:
+    { "cambios": [{"dpi": "...", "fields": {"Jornada laboral": "..."}}, ...],
+      "todo_o_nada": false }
+    Los cambios con las mismas columnas van juntos en un executemany. Con
+    todo_o_nada=true cualquier error (DPI inexistente, columna desconocida,
+    fallo de la BD) deshace todo; si no, cada grupo corre en un SAVEPOINT y
+    solo se descartan los cambios que fallan.
+    """
+    data = request.get_json(silent=True) or {}
+    cambios = data.get("cambios") if isinstance(data, dict) else None
+    if not isinstance(cambios, list) or not cambios:
+        return jsonify({"mensaje": "Envíe una lista 'cambios' con {dpi, fields}"}), 400
+    if len(cambios) > CAMBIOS_LOTE_MAX:
+        return jsonify({"mensaje": f"Máximo {CAMBIOS_LOTE_MAX} cambios por lote"}), 400
+    todo_o_nada = bool(data.get("todo_o_nada"))
+
+    resultados = [None] * len(cambios)
+    validos = {}
+    for i, item in enumerate(cambios):
+        v = _validar_cambio(item)
+        if isinstance(v, str):
+            resultados[i] = {"indice": i, "dpi": (item or {}).get("dpi") if isinstance(item, dict) else None,
+                             "estado": "error", "error": v}
+        elif v[0] in validos:
+            resultados[i] = {"indice": i, "dpi": v[0], "estado": "error", "error": "DPI repetido en el lote"}
+        else:
+            validos[v[0]] = (i, v[1])
+
+    def respuesta(codigo=200):
+        errores = sum(1 for r in resultados if r and r["estado"] == "error")
+        aplicados = sum(1 for r in resultados if r and r["estado"] == "actualizado")
+        return jsonify({
+            "mensaje": f"{aplicados} cambios aplicados, {errores} con error",
+            "aplicados": aplicados,
+            "errores": errores,
+            "todo_o_nada": todo_o_nada,
+            "resultados": resultados,
+        }), codigo
 
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
-        cursor.execute("SELECT `Numero de DPI` FROM empleados_info WHERE `Numero de DPI` = %s", (dpi,))
-        existe = cursor.fetchone()
-        if nuevo and not existe:
-            cursor.execute("""
-                INSERT INTO empleados_info (
-                    `Numero de DPI`, `Nombres del conyugue`, `Apellidos del conyugue`,
-                    `Direccion del conyugue`, `Numero de telefono del conyugue`, `Correo electronico del conyugue`
-                ) VALUES (%s,%s,%s,%s,%s,%s)
-            """, (dpi, nombres, apellidos, direccion, telefono, correo))
-            mensaje = "Registro de cónyuge agregado correctamente"
-        else:
-            if existe:
-                cursor.execute("""
-                    UPDATE empleados_info
-                    SET `Nombres del conyugue`=%s, `Apellidos del conyugue`=%s,
-                        `Direccion del conyugue`=%s, `Numero de telefono del conyugue`=%s,
-                        `Correo electronico del conyugue`=%s
-                    WHERE `Numero de DPI`=%s
-                """, (nombres, apellidos, direccion, telefono, correo, dpi))
-                mensaje = "Registro de cónyuge actualizado correctamente"
-            else:
-                cursor.execute("""
-                    INSERT INTO empleados_info (
-                        `Numero de DPI`, `Nombres del conyugue`, `Apellidos del conyugue`,
-                        `Direccion del conyugue`, `Numero de telefono del conyugue`, `Correo electronico del conyugue`
-                    ) VALUES (%s,%s,%s,%s,%s,%s)
-                """, (dpi, nombres, apellidos, direccion, telefono, correo))
-                mensaje = "Registro de cónyuge agregado correctamente"
-
-        conn.commit()
-        cursor.close()
-        conn.close()
-        return jsonify({"mensaje": mensaje})
+        try:
+            existentes = _dpis_existentes(cursor, validos)
+            grupos = {}
+            for dpi, (i, campos) in validos.items():
+                if dpi not in existentes:
+                    resultados[i] = {"indice": i, "dpi": dpi, "estado": "error", "error": "Empleado no encontrado"}
+                    continue
+                grupos.setdefault(tuple(sorted(campos)), []).append((i, dpi, campos))
+
+            if todo_o_nada and any(r is not None for r in resultados):
+                conn.rollback()
+                for i, r in enumerate(resultados):
+                    if r is None:
+                        resultados[i] = {"indice": i, "dpi": cambios[i].get("dpi"), "estado": "omitido"}
+                return respuesta(409)
+
+            for columnas, items in grupos.items():
+                sql = (f"UPDATE empleados_info SET {', '.join(f'`{c}`=%s' for c in columnas)} "
+                       f"WHERE `Numero de DPI`=%s")
+                params = [[campos[c] for c in columnas] + [dpi] for _, dpi, campos in items]
+                if todo_o_nada:
+                    cursor.executemany(sql, params)
+                else:
+                    cursor.execute("SAVEPOINT lote")
+                    try:
+                        cursor.executemany(sql, params)
+                    except Exception:
+                        # el grupo falló: se repite uno por uno para aislar el cambio malo
+                        cursor.execute("ROLLBACK TO SAVEPOINT lote")
+                        for (i, dpi, _), p in zip(items, params):
+                            cursor.execute("SAVEPOINT item")
+                            try:
+                                cursor.execute(sql, p)
+                            except Exception as e:
+                                cursor.execute("ROLLBACK TO SAVEPOINT item")
+                                resultados[i] = {"indice": i, "dpi": dpi, "estado": "error", "error": str(e)}
+                for i, dpi, _ in items:
+                    if resultados[i] is None:
+                        resultados[i] = {"indice": i, "dpi": dpi, "estado": "actualizado"}
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
     except Exception as e:
+        if todo_o_nada:
+            return jsonify({"mensaje": f"Error: {e}. No se aplicó ningún cambio", "todo_o_nada": True}), 500
         return jsonify({"mensaje": f"Error: {e}"}), 500
 
+    if any(r["estado"] == "actualizado" for r in resultados):
+        empleados_changed()
+    return respuesta()
 
-@app.route("/guardar_emergencia", methods=["POST"])
-def guardar_emergencia():
-    data = request.get_json() or {}
-    dpi = data.get("Numero de DPI") or data.get("dpi")
-    if not dpi:
-        return jsonify({"mensaje": "El campo Numero de DPI es obligatorio"}), 400
 
-    nombre = data.get("Nombre del contacto de emergencia")
-    apellidos = data.get("Apellidos del contacto de emergencia")
-    telefono = data.get("Numero de telefono de emergencia")
-    nuevo = data.get("nuevo", False)
+# ---------------- Exportación (streaming) ----------------
+EXPORT_FETCH = 500
+EXPORT_FORMATOS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "jsonl": ("application/x-ndjson; charset=utf-8", "jsonl"),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+}
 
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT `Numero de DPI` FROM empleados_info WHERE `Numero de DPI` = %s", (dpi,))
-        existe = cursor.fetchone()
-        if nuevo and not existe:
-            cursor.execute("""
-                INSERT INTO empleados_info (
-                    `Numero de DPI`, `Nombre del contacto de emergencia`, `Apellidos del contacto de emergencia`, `Numero de telefono de emergencia`
-                ) VALUES (%s,%s,%s,%s)
-            """, (dpi, nombre, apellidos, telefono))
-            mensaje = "Contacto de emergencia agregado correctamente"
-        else:
-            if existe:
-                cursor.execute("""
-                    UPDATE empleados_info
-                    SET `Nombre del contacto de emergencia`=%s, `Apellidos del contacto de emergencia`=%s,
-                        `Numero de telefono de emergencia`=%s
-                    WHERE `Numero de DPI`=%s
-                """, (nombre, apellidos, telefono, dpi))
-                mensaje = "Contacto de emergencia actualizado correctamente"
-            else:
-                cursor.execute("""
-                    INSERT INTO empleados_info (
-                        `Numero de DPI`, `Nombre del contacto de emergencia`, `Apellidos del contacto de emergencia`, `Numero de telefono de emergencia`
-                    ) VALUES (%s,%s,%s,%s)
-                """, (dpi, nombre, apellidos, telefono))
-                mensaje = "Contacto de emergencia agregado correctamente"
 
-        conn.commit()
-        cursor.close()
+def _valor_export(v):
+    if v is None or isinstance(v, (str, int, float)):
+        return v
+    if hasattr(v, "isoformat"):
+        return v.isoformat()
+    return str(v)
+
+
+def abrir_stream_empleados(columnas):
+    """
+    Ejecuta el SELECT con un SSCursor (sin buffer): el servidor envía las
+    filas a medida que se leen, así la memoria no depende del tamaño de la
+    tabla. Usa una conexión propia y no una del pool: una descarga larga no
+    debe ocupar un lugar del pool, y si el cliente corta a mitad basta con
+    cerrar el socket en vez de drenar el resto del resultado.
+    Devuelve (conexión, generador de filas).
+    """
+    conn = _new_db_connection()
+    try:
+        cursor = conn.cursor(SSCursorMedido)
+        cols_sql = ", ".join(f"`{c}`" for c in columnas)
+        cursor.execute(f"SELECT {cols_sql} FROM empleados_info ORDER BY `Numero de DPI`")
+    except Exception:
         conn.close()
-        return jsonify({"mensaje": mensaje})
+        raise
+
+    def filas():
+        while True:
+            lote = cursor.fetchmany(EXPORT_FETCH)
+            if not lote:
+                break
+            for fila in lote:
+                yield [_valor_export(v) for v in fila]
+
+    return conn, filas()
+
+
+def _export_csv(columnas, filas):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    # BOM para que Excel detecte UTF-8 (acentos en nombres y encabezados)
+    buf.write("\ufeff")
+    writer.writerow(columnas)
+    for i, fila in enumerate(filas, start=1):
+        writer.writerow(["" if v is None else v for v in fila])
+        if i % EXPORT_FETCH == 0:
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue().encode("utf-8")
+
+
+def _export_jsonl(columnas, filas):
+    for fila in filas:
+        yield (json.dumps(dict(zip(columnas, fila)), ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def _export_xlsx(columnas, filas):
+    # write_only va escribiendo las filas a un temporal; el zip final se
+    # envía por bloques sin cargarlo en memoria
+    libro = openpyxl.Workbook(write_only=True)
+    hoja = libro.create_sheet("Empleados")
+    hoja.append(columnas)
+    for fila in filas:
+        hoja.append(fila)
+    with tempfile.TemporaryFile() as tmp:
+        libro.save(tmp)
+        tmp.seek(0)
+        while True:
+            bloque = tmp.read(64 * 1024)
+            if not bloque:
+                break
+            yield bloque
+
+
+@app.route("/api/empleados/export")
+def api_empleados_export():
+    """
+    Descarga de empleados_info completa. ?format=csv|jsonl|xlsx (csv por
+    defecto) y ?columns=col1,col2 (nombres de columna o sus alias cortos;
+    por defecto toda la ficha).
+    """
+    formato = (request.args.get("format") or "csv").lower()
+    if formato not in EXPORT_FORMATOS:
+        return jsonify({"error": "format debe ser csv, jsonl o xlsx"}), 400
+    if formato == "xlsx" and openpyxl is None:
+        return jsonify({"error": "Exportar a XLSX requiere openpyxl; use format=csv"}), 400
+
+    columnas = COLUMNAS_FICHA
+    if request.args.get("columns"):
+        columnas = []
+        for nombre in request.args["columns"].split(","):
+            nombre = nombre.strip()
+            col = nombre if nombre in COLUMNAS_FICHA else ALIAS.get(nombre.lower())
+            if col not in COLUMNAS_FICHA:
+                return jsonify({"error": f"Columna desconocida: {nombre}"}), 400
+            if col not in columnas:
+                columnas.append(col)
+
+    try:
+        conn, filas = abrir_stream_empleados(columnas)
     except Exception as e:
-        return jsonify({"mensaje": f"Error: {e}"}), 500
+        return jsonify({"error": str(e)}), 500
+
+    generador = {"csv": _export_csv, "jsonl": _export_jsonl, "xlsx": _export_xlsx}[formato]
+    mimetype, ext = EXPORT_FORMATOS[formato]
+    resp = Response(stream_with_context(generador(columnas, filas)), content_type=mimetype)
+    resp.call_on_close(conn.close)
+    nombre = f"empleados_{datetime.now().strftime('%Y%m%d_%H%M')}.{ext}"
+    resp.headers["Content-Disposition"] = f'attachment; filename="{nombre}"'
+    return resp
+
+
+@app.route("/guardar_academico", methods=["POST"])
+def guardar_academico():
+    return guardar_seccion("about", "Registro académico agregado correctamente",
+                           "Registro académico actualizado correctamente")
+
+
+@app.route("/guardar_conyugue", methods=["POST"])
+def guardar_conyugue():
+    return guardar_seccion("conyugue", "Registro de cónyuge agregado correctamente",
+                           "Registro de cónyuge actualizado correctamente")
+
+
+@app.route("/guardar_emergencia", methods=["POST"])
+def guardar_emergencia():
+    return guardar_seccion("emergencia", "Contacto de emergencia agregado correctamente",
+                           "Contacto de emergencia actualizado correctamente")
 
 
 @app.route("/guardar_laboral", methods=["POST"])
 def guardar_laboral():
-    data = request.get_json() or {}
-    dpi = data.get("Numero de DPI") or data.get("dpi")
-    if not dpi:
-        return jsonify({"mensaje": "El campo Numero de DPI es obligatorio"}), 400
+    return guardar_seccion("laboral", "Registro laboral agregado correctamente",
+                           "Registro laboral actualizado correctamente")
 
-    empresa = data.get("Nombre de la Empresa (Ultimo Trabajo)")
-    direccion = data.get("Direccion de la empresa")
-    inicio = data.get("Inicio laboral en la empresa")
-    fin = data.get("Fin Laboral en la empresa")
-    motivo = data.get("Motivo del retiro")
-    jefe = data.get("Nombre del Jefe Imediato")
-    jefnum = data.get("Numero del Jefe inmediato")
-    nuevo = data.get("nuevo", False)
 
+@app.route("/guardar_medica", methods=["POST"])
+def guardar_medica():
+    return guardar_seccion("medica", "Registro médico agregado correctamente",
+                           "Registro médico actualizado correctamente")
+
+
+# ---------------- Fotos: API, subida y eliminación (solo archivos en disco) ----------------
+@app.route("/api/foto/<dpi>")
+def api_foto(dpi):
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
-        cursor.execute("SELECT `Numero de DPI` FROM empleados_info WHERE `Numero de DPI` = %s", (dpi,))
-        existe = cursor.fetchone()
-        if nuevo and not existe:
-            cursor.execute("""
-                INSERT INTO empleados_info (
-                    `Numero de DPI`, `Nombre de la Empresa (Ultimo Trabajo)`, `Direccion de la empresa`,
-                    `Inicio laboral en la empresa`, `Fin Laboral en la empresa`, `Motivo del retiro`, `Nombre del Jefe Imediato`, `Numero del Jefe inmediato`
-                ) VALUES (%s,%s,%s,%s,%s,%s,%s,%s)
-            """, (dpi, empresa, direccion, inicio, fin, motivo, jefe, jefnum))
-            mensaje = "Registro laboral agregado correctamente"
-        else:
-            if existe:
-                cursor.execute("""
-                    UPDATE empleados_info
-                    SET `Nombre de la Empresa (Ultimo Trabajo)`=%s, `Direccion de la empresa`=%s,
-                        `Inicio laboral en la empresa`=%s, `Fin Laboral en la empresa`=%s,
-                        `Motivo del retiro`=%s, `Nombre del Jefe Imediato`=%s, `Numero del Jefe inmediato`=%s
-                    WHERE `Numero de DPI`=%s
-                """, (empresa, direccion, inicio, fin, motivo, jefe, jefnum, dpi))
-                mensaje = "Registro laboral actualizado correctamente"
-            else:
-                cursor.execute("""
-                    INSERT INTO empleados_info (
-                        `Numero de DPI`, `Nombre de la Empresa (Ultimo Trabajo)`, `Direccion de la empresa`,
-                        `Inicio laboral en la empresa`, `Fin Laboral en la empresa`, `Motivo del retiro`, `Nombre del Jefe Imediato`, `Numero del Jefe inmediato `
-                    ) VALUES (%s,%s,%s,%s,%s,%s,%s,%s)
-                """, (dpi, empresa, direccion, inicio, fin, motivo, jefe, jefnum))
-                mensaje = "Registro laboral agregado correctamente"
-
-        conn.commit()
+        cursor.execute("SELECT `foto` FROM empleados_info WHERE `Numero de DPI` = %s", (dpi,))
+        row = cursor.fetchone()
         cursor.close()
         conn.close()
-        return jsonify({"mensaje": mensaje})
+
+        if not row or not row.get("foto"):
+            return jsonify({"foto": None, "url": None})
+
+        filename = row["foto"]
+        if filename.startswith(("http://", "https://")):
+            # foto en Supabase: devolver el derivado pedido (?size=thumb|medium|full, ?format=jpeg|webp)
+            size = request.args.get("size", "full")
+            fmt = request.args.get("format", "jpeg")
+            if size not in FOTO_TAMANOS or fmt not in FOTO_FORMATOS:
+                return jsonify({"foto": None, "url": None, "error": "Tamaño o formato no válido"}), 400
+            variantes = {s: {f: url_local_foto(u) for f, u in formatos.items()}
+                         for s, formatos in foto_variantes(filename).items()}
+            return jsonify({"foto": filename, "url": variantes[size][fmt], "sizes": variantes})
+
+        # nombre de archivo antiguo en disco; si falta no se borra de BD (puede
+        # ser un worker/servidor sin la copia local)
+        return jsonify({"foto": filename, "url": resolver_foto(filename)})
     except Exception as e:
-        return jsonify({"mensaje": f"Error: {e}"}), 500
+        return jsonify({"foto": None, "url": None, "error": str(e)}), 500
 
 
-@app.route("/guardar_medica", methods=["POST"])
-def guardar_medica():
-    data = request.get_json() or {}
-    dpi = data.get("Numero de DPI") or data.get("dpi")
-    if not dpi:
-        return jsonify({"mensaje": "El campo Numero de DPI es obligatorio"}), 400
+FOTOS_LOTE_MAX = 1000
+
 
-    padece = data.get("Padece alguna enfermedad")
-    tipo = data.get("Tipo de enfermedad")
-    recibe = data.get("Recibe tratamiento medico")
-    tratamiento = data.get("Nombre del tratamiento")
-    alergico = data.get("Es alergico a algun medicamento")
-    medico = data.get("Nombre del medico Tratante")
-    numero = data.get("Numero del medico tratante")
-    sangre = data.get("Tipo de sangre")
-    nuevo = data.get("nuevo", False)
+@app.route("/api/fotos", methods=["GET", "POST"])
+def api_fotos():
+    """
+    URLs de foto de muchos empleados en una sola consulta.
+    GET ?dpis=a,b,c (o ?dpi=a&dpi=b) ; POST { "dpis": [...] }.
+    Acepta los mismos ?size= y ?format= que /api/foto/<dpi>.
+    Responde { "fotos": { dpi: url | null } }.
+    """
+    if request.method == "POST":
+        dpis = (request.get_json(silent=True) or {}).get("dpis") or []
+        if not isinstance(dpis, list):
+            return jsonify({"error": "dpis debe ser una lista"}), 400
+    else:
+        dpis = request.args.getlist("dpi") + (request.args.get("dpis") or "").split(",")
+    dpis = list(dict.fromkeys(str(d).strip() for d in dpis if d is not None and str(d).strip()))
+    if len(dpis) > FOTOS_LOTE_MAX:
+        return jsonify({"error": f"Máximo {FOTOS_LOTE_MAX} DPIs por petición"}), 400
+
+    size = request.args.get("size", "full")
+    fmt = request.args.get("format", "jpeg")
+    if size not in FOTO_TAMANOS or fmt not in FOTO_FORMATOS:
+        return jsonify({"error": "Tamaño o formato no válido"}), 400
+    if not dpis:
+        return jsonify({"fotos": {}})
 
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
-        cursor.execute("SELECT `Numero de DPI` FROM empleados_info WHERE `Numero de DPI` = %s", (dpi,))
-        existe = cursor.fetchone()
-        if nuevo and not existe:
-            cursor.execute("""
-                INSERT INTO empleados_info (
-                    `Numero de DPI`, `Padece alguna enfermedad`, `Tipo de enfermedad`, `Recibe tratamiento medico`,
-                    `Nombre del tratamiento`, `Es alergico a algun medicamento`, `Nombre del medico Tratante`,`Numero del medico tratante`, `Tipo de sangre`
-                ) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s)
-            """, (dpi, padece, tipo, recibe, tratamiento, alergico, medico, numero, sangre))
-            mensaje = "Registro médico agregado correctamente"
-        else:
-            if existe:
-                cursor.execute("""
-                    UPDATE empleados_info
-                    SET `Padece alguna enfermedad`=%s, `Tipo de enfermedad`=%s, `Recibe tratamiento medico`=%s,
-                        `Nombre del tratamiento`=%s, `Es alergico a algun medicamento`=%s, `Nombre del medico Tratante`=%s, `Numero del medico tratante`=%s,
-                        `Tipo de sangre`=%s
-                    WHERE `Numero de DPI`=%s
-                """, (padece, tipo, recibe, tratamiento, alergico, medico, numero, sangre, dpi))
-                mensaje = "Registro médico actualizado correctamente"
-            else:
-                cursor.execute("""
-                    INSERT INTO empleados_info (
-                        `Numero de DPI`, `Padece alguna enfermedad`, `Tipo de enfermedad`, `Recibe tratamiento medico`,
-                        `Nombre del tratamiento`, `Es alergico a algun medicamento`, `Nombre del medico Tratante`,`Numero del medico tratante`,`Tipo de sangre`
-                    ) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s)
-                """, (dpi, padece, tipo, recibe, tratamiento, alergico, medico, numero, sangre))
-                mensaje = "Registro médico agregado correctamente"
-
-        conn.commit()
+        marcas = ",".join(["%s"] * len(dpis))
+        cursor.execute(
+            f"SELECT `Numero de DPI` AS dpi, `foto` FROM empleados_info WHERE `Numero de DPI` IN ({marcas})",
+            dpis)
+        rows = cursor.fetchall()
         cursor.close()
         conn.close()
-        return jsonify({"mensaje": mensaje})
     except Exception as e:
-        return jsonify({"mensaje": f"Error: {e}"}), 500
+        return jsonify({"error": str(e)}), 500
 
+    por_dpi = {r["dpi"]: r.get("foto") for r in rows}
+    return jsonify({"fotos": {d: resolver_foto(por_dpi.get(d), size, fmt) for d in dpis}})
 
-# ---------------- Fotos: API, subida y eliminación (solo archivos en disco) ----------------
-@app.route("/api/foto/<dpi>")
-def api_foto(dpi):
+
+# ---------------- Pipeline de fotos en segundo plano ----------------
+FOTO_JOBS_DB_PATH = os.environ.get("FOTO_JOBS_DB_PATH",
+                                   os.path.join(os.path.dirname(PLANILLA_STORE_PATH), "foto_jobs.sqlite3"))
+FOTO_WORKERS = int(os.environ.get("FOTO_WORKERS", "2"))
+FOTO_UPLOAD_RETRIES = int(os.environ.get("FOTO_UPLOAD_RETRIES", "3"))
+# derivados que se suben al bucket a la vez dentro de un mismo trabajo
+FOTO_SUBIDAS_PARALELAS = int(os.environ.get("FOTO_SUBIDAS_PARALELAS", "6"))
+
+foto_jobs = JobStore(FOTO_JOBS_DB_PATH)
+foto_runner = JobRunner(max_workers=FOTO_WORKERS)
+
+
+class FotoError(Exception):
+    """Error de negocio del pipeline de fotos (mensaje apto para el usuario)."""
+
+
+# Derivados generados en cada subida: tamaño -> lado máximo en px
+FOTO_TAMANOS = {"thumb": 96, "medium": 480, "full": 1600}
+# formato -> (extensión, content-type, opciones de PIL)
+FOTO_FORMATOS = {
+    "jpeg": ("jpg", "image/jpeg", {"format": "JPEG", "quality": 85, "optimize": True}),
+    "webp": ("webp", "image/webp", {"format": "WEBP", "quality": 80, "method": 4}),
+}
+
+
+def foto_nombre(base, size, fmt):
+    return f"{base}_{size}.{FOTO_FORMATOS[fmt][0]}"
+
+
+def foto_variantes(foto_url):
+    """
+    URLs de cada derivado a partir de la URL guardada en BD (el JPEG "full").
+    Las fotos subidas antes de existir los derivados no siguen el patrón
+    *_full.jpg: para ellas todos los tamaños apuntan al original.
+    """
+    prefijo, sep, _ = foto_url.rpartition("_full.jpg")
+    if not sep:
+        return {size: {fmt: foto_url for fmt in FOTO_FORMATOS} for size in FOTO_TAMANOS}
+    return {size: {fmt: f"{prefijo}_{size}.{FOTO_FORMATOS[fmt][0]}" for fmt in FOTO_FORMATOS}
+            for size in FOTO_TAMANOS}
+
+
+# ---------------- Cache local de fotos (delante del bucket de Supabase) ----------------
+FOTO_CACHE_ENABLED = os.environ.get("FOTO_CACHE", "1") != "0"
+FOTO_CACHE_DIR = os.environ.get("FOTO_CACHE_DIR", os.path.join(UPLOAD_FOLDER, "cache"))
+FOTO_CACHE_MAX_BYTES = int(os.environ.get("FOTO_CACHE_MAX_MB", "200")) * 1024 * 1024
+FOTO_CACHE_INDEX_PATH = os.environ.get("FOTO_CACHE_INDEX_PATH",
+                                       os.path.join(os.path.dirname(PLANILLA_STORE_PATH), "foto_cache.sqlite3"))
+SUPABASE_PUBLIC_PREFIX = f"{SUPABASE_URL}/storage/v1/object/public/{SUPABASE_BUCKET}/"
+
+
+def descargar_de_supabase(key):
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT `foto` FROM empleados_info WHERE `Numero de DPI` = %s", (dpi,))
-        row = cursor.fetchone()
+        with metricas.medir("app_supabase_duration_seconds", "download"):
+            return supabase.storage.from_(SUPABASE_BUCKET).download(key)
+    except Exception as e:
+        app.logger.warning("No se pudo descargar %s del bucket: %s", key, e)
+        return None
+
+
+foto_cache = FotoCache(
+    FOTO_CACHE_DIR,
+    FOTO_CACHE_INDEX_PATH,
+    FOTO_CACHE_MAX_BYTES,
+    fetch=descargar_de_supabase,
+    # una llave que el bucket no tiene se responde 404 sin volver a pedirla por este tiempo
+    miss_ttl=int(os.environ.get("FOTO_CACHE_MISS_TTL", "30")),
+)
+
+
+def url_local_foto(url):
+    """Traduce una URL pública del bucket a la ruta local servida desde el cache."""
+    if FOTO_CACHE_ENABLED and url and url.startswith(SUPABASE_PUBLIC_PREFIX):
+        return url_for("foto_archivo", key=url[len(SUPABASE_PUBLIC_PREFIX):])
+    return url
+
+
+@app.route("/fotos/<path:key>")
+def foto_archivo(key):
+    """
+    Sirve la foto desde el cache local (la descarga del bucket la primera
+    vez). El nombre de cada derivado es único, así que se marca immutable;
+    send_file responde ETag (hash de contenido), 304 y rangos.
+    """
+    entry = foto_cache.get(key) if FotoCache.llave_valida(key) else None
+    if not entry:
+        return jsonify({"error": "Foto no encontrada"}), 404
+    path, digest, content_type = entry
+    resp = send_file(path, mimetype=content_type, conditional=True, etag=digest)
+    resp.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    return resp
+
+
+@app.route("/fotos-cache")
+def foto_cache_stats():
+    if not es_admin():
+        return jsonify({"mensaje": "Permisos insuficientes"}), 403
+    return jsonify(foto_cache.stats())
+
+
+# Fotos antiguas guardadas en static/fotos: un listado del directorio cada
+# FOTOS_LOCALES_TTL segundos en lugar de un stat por fila en cada render
+FOTOS_LOCALES_TTL = 60
+_fotos_locales = {"leido": None, "nombres": frozenset()}
+
+
+def fotos_locales():
+    ahora = time.monotonic()
+    if _fotos_locales["leido"] is None or ahora - _fotos_locales["leido"] > FOTOS_LOCALES_TTL:
+        try:
+            with os.scandir(app.config["UPLOAD_FOLDER"]) as it:
+                nombres = frozenset(e.name for e in it if e.is_file())
+        except OSError:
+            nombres = frozenset()
+        _fotos_locales.update(leido=ahora, nombres=nombres)
+    return _fotos_locales["nombres"]
+
+
+def resolver_foto(foto, size="full", fmt="jpeg"):
+    """URL pública del derivado pedido para el valor de `foto` en BD, o None."""
+    if not foto:
+        return None
+    if foto.startswith(("http://", "https://")):
+        return url_local_foto(foto_variantes(foto)[size][fmt])
+    if foto in fotos_locales():
+        return url_for("static", filename=f"fotos/{foto}")
+    return None
+
+
+# las vistas de sección incrustan la URL de la foto en cada fila (data-foto)
+app.jinja_env.globals["foto_url"] = resolver_foto
+
+
+def abrir_imagen(raw, max_lado):
+    """
+    Abre la imagen pidiendo al decodificador JPEG una escala reducida
+    (draft) cercana a max_lado, corrige orientación EXIF y pasa a RGB.
+    """
+    image = Image.open(BytesIO(raw))
+    try:
+        exif = image._getexif()
+    except Exception:
+        exif = None
+    image.draft("RGB", (max_lado, max_lado))
+    try:
+        if exif:
+            orientation_key = next((k for k, v in ExifTags.TAGS.items() if v == "Orientation"), None)
+            if orientation_key and orientation_key in exif:
+                orientation = exif[orientation_key]
+                if orientation == 3:
+                    image = image.rotate(180, expand=True)
+                elif orientation == 6:
+                    image = image.rotate(270, expand=True)
+                elif orientation == 8:
+                    image = image.rotate(90, expand=True)
+    except Exception:
+        pass
+
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    return image
+
+
+def generar_derivados(raw):
+    """Devuelve [(size, fmt, bytes)] para todos los tamaños y formatos."""
+    with metricas.medir("app_imagen_duration_seconds", "derivados"):
+        # PIL no cede el loop en modo gevent: se procesa en un hilo real
+        return en_hilo_real(_generar_derivados, raw)
+
+
+def _generar_derivados(raw):
+    tamanos = sorted(FOTO_TAMANOS.items(), key=lambda kv: kv[1], reverse=True)
+    image = abrir_imagen(raw, tamanos[0][1])
+    out = []
+    for size, lado in tamanos:
+        # cada tamaño se reduce desde el anterior (más barato que desde el original)
+        image = image.copy()
+        image.thumbnail((lado, lado), Image.Resampling.LANCZOS, reducing_gap=2.0)
+        for fmt, (_, _, opciones) in FOTO_FORMATOS.items():
+            buffer = BytesIO()
+            image.save(buffer, **opciones)
+            out.append((size, fmt, buffer.getvalue()))
+    return out
+
+
+def subir_a_supabase(path, data, content_type, on_retry=None):
+    """Sube al bucket con reintentos (backoff exponencial); x-upsert hace idempotente el reintento."""
+    intento = 0
+    while True:
+        intento += 1
+        try:
+            with metricas.medir("app_supabase_duration_seconds", "upload"):
+                supabase.storage.from_(SUPABASE_BUCKET).upload(
+                    path=path,
+                    file=data,
+                    file_options={"content-type": content_type, "x-upsert": "true"}
+                )
+            return f"{SUPABASE_URL}/storage/v1/object/public/{SUPABASE_BUCKET}/{path}"
+        except Exception:
+            if intento >= FOTO_UPLOAD_RETRIES:
+                raise
+            if on_retry:
+                on_retry(intento)
+            time.sleep(min(2 ** (intento - 1), 8))
+
+
+def empleado_existe(dpi):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT 1 FROM empleados_info WHERE `Numero de DPI`=%s LIMIT 1", (dpi,))
+        return cursor.fetchone() is not None
+    finally:
         cursor.close()
         conn.close()
 
-        if not row or not row.get("foto"):
-            return jsonify({"foto": None, "url": None})
 
-        filename = row["foto"]
-        filepath = os.path.join(app.config["UPLOAD_FOLDER"], filename)
-        if os.path.exists(filepath):
-            return jsonify({"foto": filename, "url": url_for('static', filename=f"fotos/{filename}")})
-        else:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute("UPDATE empleados_info SET `foto`=NULL WHERE `Numero de DPI`=%s", (dpi,))
-            conn.commit()
-            cursor.close()
-            conn.close()
-            return jsonify({"foto": None, "url": None})
+def quitar_fotos_del_bucket(rutas):
+    """Elimina esas llaves del bucket y del cache local (no detiene si falla)."""
+    try:
+        with metricas.medir("app_supabase_duration_seconds", "remove"):
+            supabase.storage.from_(SUPABASE_BUCKET).remove(rutas)
+    except Exception:
+        app.logger.warning("No se pudieron eliminar del bucket: %s", ", ".join(rutas))
+    try:
+        foto_cache.discard(rutas)
+    except Exception:
+        pass
+
+
+def guardar_foto_en_bd(dpi, foto_url):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        "UPDATE empleados_info SET foto=%s WHERE `Numero de DPI`=%s",
+        (foto_url, dpi)
+    )
+    conn.commit()
+    empleados_changed()
+    rows_affected = cursor.rowcount
+    cursor.close()
+    conn.close()
+    if rows_affected == 0:
+        raise FotoError("No se actualizó la fila. Verifica que el DPI exista y coincida exactamente.")
+
+
+def ejecutar_subida_foto(job_id, dpi, raw):
+    """Trabajo completo: procesar, subir a Supabase y guardar la URL en BD."""
+    etapa = "procesando"
+    try:
+        foto_jobs.update(job_id, status="procesando", progress=10)
+        try:
+            derivados = generar_derivados(raw)
+        except Exception as e:
+            raise FotoError(f"Error procesando imagen: {e}")
+
+        etapa = "subiendo"
+        foto_jobs.update(job_id, status="subiendo", progress=30, attempts=1)
+        ts = datetime.utcnow().strftime("%Y%m%d%H%M%S%f")
+        base = f"{dpi}_{ts}"
+        rutas = [f"empleados/{foto_nombre(base, size, fmt)}" for size, fmt, _ in derivados]
+        subidos = []
+
+        def subir(size, fmt, data):
+            # los derivados son independientes: se suben a la vez
+            return subir_a_supabase(
+                f"empleados/{foto_nombre(base, size, fmt)}", data, FOTO_FORMATOS[fmt][1],
+                on_retry=lambda n: foto_jobs.update(job_id, attempts=n + 1,
+                                                    message=f"Reintentando subida ({n + 1})"))
+
+        def subido(i):
+            size, fmt, data = derivados[i]
+            try:
+                foto_cache.put(f"empleados/{foto_nombre(base, size, fmt)}", data, FOTO_FORMATOS[fmt][1])
+            except Exception:
+                app.logger.warning("No se pudo guardar %s en el cache local", foto_nombre(base, size, fmt))
+            subidos.append(i)
+            foto_jobs.update(job_id, progress=30 + 50 * len(subidos) // len(derivados))
+
+        try:
+            resultado = en_paralelo([lambda d=d: subir(*d) for d in derivados],
+                                    max_workers=FOTO_SUBIDAS_PARALELAS, al_terminar=subido)
+        except Exception as e:
+            raise FotoError(f"Error subiendo a Supabase: {e}")
+        urls = {(size, fmt): url for (size, fmt, _), url in zip(derivados, resultado)}
+        foto_url = urls[("full", "jpeg")]
+
+        etapa = "guardando"
+        foto_jobs.update(job_id, status="guardando", progress=80)
+        try:
+            guardar_foto_en_bd(dpi, foto_url)
+        except FotoError:
+            raise
+        except Exception as e:
+            raise FotoError(f"Error guardando URL en BD: {e}")
+
+        # URLs del bucket tal cual: corre en un hilo sin contexto de la app,
+        # la traducción a /fotos/... la hace quien responde (resultado_foto)
+        result = {"url": foto_url, "db_foto": foto_url, "sizes": foto_variantes(foto_url)}
+        foto_jobs.update(job_id, status="listo", progress=100, message="", result=result)
+        return result
     except Exception as e:
-        return jsonify({"foto": None, "url": None, "error": str(e)}), 500
+        if not isinstance(e, FotoError):
+            app.logger.exception("Error en trabajo de foto %s (%s)", job_id, etapa)
+        if etapa != "procesando":
+            # sin la URL en BD nadie referencia los derivados: no dejarlos huérfanos
+            # (se quitan todos; una subida en curso al fallar otra pudo terminar)
+            quitar_fotos_del_bucket(rutas)
+        foto_jobs.update(job_id, status="error", message=str(e))
+        raise
+
+
+def resultado_foto(result):
+    """Resultado de un trabajo con los derivados apuntando al cache local (requiere petición)."""
+    if not result or not isinstance(result.get("sizes"), dict):
+        return result
+    sizes = {s: {f: url_local_foto(u) for f, u in formatos.items()}
+             for s, formatos in result["sizes"].items()}
+    return {**result, "sizes": sizes}
+
+
+def _ejecutar_subida_foto_bg(job_id, dpi, raw):
+    try:
+        ejecutar_subida_foto(job_id, dpi, raw)
+    except Exception:
+        pass  # el error ya quedó registrado en el trabajo
 
 
-# --- Endpoint subir foto ---
 # ---------------- Endpoint subir foto ----------------
 @app.route("/subir_foto", methods=["POST"])
 def subir_foto():
+    """
+    Acepta la imagen y responde 202 con { job_id, status_url } de inmediato;
+    el procesamiento y la subida ocurren en segundo plano. Con sync=1 (form o
+    query) se ejecuta dentro de la petición y responde { url, db_foto }.
+    """
     dpi = (request.form.get("dpi") or "").strip()
     if not dpi:
         return jsonify({"error": "Debe seleccionar un empleado (DPI)"}), 400
@@ -1138,75 +2482,37 @@ def subir_foto():
     if ext not in ALLOWED_EXT:
         return jsonify({"error": "Tipo de archivo no permitido"}), 400
 
-    # Procesar imagen (PIL) y convertir a JPEG
-    try:
-        image = Image.open(file.stream)
-        try:
-            exif = image._getexif()
-            if exif:
-                orientation_key = next((k for k, v in ExifTags.TAGS.items() if v == "Orientation"), None)
-                if orientation_key and orientation_key in exif:
-                    orientation = exif[orientation_key]
-                    if orientation == 3:
-                        image = image.rotate(180, expand=True)
-                    elif orientation == 6:
-                        image = image.rotate(270, expand=True)
-                    elif orientation == 8:
-                        image = image.rotate(90, expand=True)
-        except Exception:
-            pass
-
-        if image.mode in ("RGBA", "P", "LA"):
-            image = image.convert("RGB")
-
-        buffer = BytesIO()
-        image.save(buffer, format="JPEG", quality=85, optimize=True)
-        buffer.seek(0)
-    except Exception as e:
-        return jsonify({"error": f"Error procesando imagen: {e}"}), 500
-
-    # Nombre único
-    ts = datetime.utcnow().strftime("%Y%m%d%H%M%S%f")
-    filename = f"{dpi}_{ts}.jpg"
-
-    # Subir a Supabase
+    # antes de procesar y subir nada: un DPI inexistente solo dejaría objetos huérfanos
     try:
-        supabase.storage.from_(SUPABASE_BUCKET).upload(
-            path=f"empleados/{filename}",
-            file=buffer.getvalue(),
-            file_options={"content-type": "image/jpeg"}
-        )
-        foto_url = f"{SUPABASE_URL}/storage/v1/object/public/{SUPABASE_BUCKET}/empleados/{filename}"
+        if not empleado_existe(dpi):
+            return jsonify({"error": "Empleado no encontrado", "dpi": dpi}), 404
     except Exception as e:
-        return jsonify({"error": f"Error subiendo a Supabase: {e}"}), 500
+        return jsonify({"error": f"Error consultando el empleado: {e}", "dpi": dpi}), 500
 
-    # Guardar URL en BD y verificar
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            "UPDATE empleados_info SET foto=%s WHERE `Numero de DPI`=%s",
-            (foto_url, dpi)
-        )
-        conn.commit()
-        rows_affected = cursor.rowcount
+    raw = file.read()
+    job_id = foto_jobs.create(dpi)
 
-        cursor.execute("SELECT `Numero de DPI`, foto FROM empleados_info WHERE `Numero de DPI`=%s", (dpi,))
-        row = cursor.fetchone()
-        cursor.close()
-        conn.close()
+    if (request.form.get("sync") or request.args.get("sync")) in ("1", "true"):
+        try:
+            return jsonify(resultado_foto(ejecutar_subida_foto(job_id, dpi, raw)))
+        except Exception as e:
+            return jsonify({"error": str(e), "dpi": dpi}), 500
 
-        if rows_affected == 0:
-            return jsonify({
-                "error": "No se actualizó la fila. Verifica que el DPI exista y coincida exactamente.",
-                "dpi": dpi,
-                "db_row": row
-            }), 500
+    foto_runner.submit(_ejecutar_subida_foto_bg, job_id, dpi, raw)
+    return jsonify({
+        "job_id": job_id,
+        "status": "en_cola",
+        "status_url": url_for("api_foto_job", job_id=job_id),
+    }), 202
 
-    except Exception as e:
-        return jsonify({"error": f"Error guardando URL en BD: {e}"}), 500
 
-    return jsonify({"url": foto_url, "db_foto": row.get("foto") if isinstance(row, dict) else row[0]})
+@app.route("/api/foto/jobs/<job_id>")
+def api_foto_job(job_id):
+    job = foto_jobs.get(job_id)
+    if not job:
+        return jsonify({"error": "Trabajo no encontrado"}), 404
+    job["result"] = resultado_foto(job["result"])
+    return jsonify(job)
 
 # ---------------- Endpoint eliminar foto ----------------
 @app.route("/eliminar_foto", methods=["POST"])
@@ -1227,17 +2533,20 @@ def eliminar_foto():
             return jsonify({"ok": False, "message": "No existe foto para ese empleado"}), 200
 
         foto_url = row.get("foto")
-        filename = foto_url.split("/")[-1]
-
-        # Eliminar del bucket (no detener si falla)
+        rutas = sorted({
+            f"empleados/{url.split('/')[-1]}"
+            for formatos in foto_variantes(foto_url).values()
+            for url in formatos.values()
+        })
+
+        # el bucket corre mientras la BD se actualiza en el hilo de la petición
+        quitando = en_segundo_plano(lambda: quitar_fotos_del_bucket(rutas))
         try:
-            supabase.storage.from_(SUPABASE_BUCKET).remove([f"empleados/{filename}"])
-        except Exception:
-            pass
-
-        # Limpiar campo en BD
-        cursor.execute("UPDATE empleados_info SET foto=NULL WHERE `Numero de DPI`=%s", (dpi,))
-        conn.commit()
+            cursor.execute("UPDATE empleados_info SET foto=NULL WHERE `Numero de DPI`=%s", (dpi,))
+            conn.commit()
+        finally:
+            quitando.result()
+        empleados_changed()
         cursor.close()
         conn.close()
 
@@ -1253,39 +2562,46 @@ if __name__ == "__main__":
 
 # ------------------ NUEVOS ENDPOINTS PARA SINCRONIZAR LA PLANILLA ------------------
 
+def planilla_last_modified(saved_at):
+    try:
+        return datetime.fromisoformat(saved_at) if saved_at else None
+    except ValueError:
+        return None
+
+
 def read_planilla_store():
     try:
-        if not os.path.exists(PLANILLA_STORE_PATH):
-            return None
-        with open(PLANILLA_STORE_PATH, "r", encoding="utf-8") as f:
-            return json.load(f)
+        return planilla_store.read()
     except Exception:
+        app.logger.exception("Error leyendo la planilla")
         return None
 
 
 def write_planilla_store(obj):
     try:
-        obj_to_save = obj.copy() if isinstance(obj, dict) else {"rows": [], "meta": {}}
-        obj_to_save["meta"] = obj_to_save.get("meta", {})
-        obj_to_save["meta"]["server_saved_at"] = datetime.utcnow().isoformat()
-        with open(PLANILLA_STORE_PATH, "w", encoding="utf-8") as f:
-            json.dump(obj_to_save, f, ensure_ascii=False, indent=2)
-        return obj_to_save["meta"]["server_saved_at"]
+        obj = obj if isinstance(obj, dict) else {"rows": [], "meta": {}}
+        saved_at, _, _ = planilla_store.write(obj.get("rows") or [], obj.get("meta") or {})
+        return saved_at
     except Exception:
+        app.logger.exception("Error guardando la planilla")
         return None
 
 
 @app.route("/api/planilla", methods=["GET"])
 def api_planilla_get():
     """
-    Devuelve la última planilla guardada en el servidor (archivo JSON).
+    Devuelve la última planilla guardada en el servidor.
     Si no existe retorna 204/empty JSON {} con código 204.
     """
-    try:
+    def build():
         data = read_planilla_store()
         if not data:
             return jsonify({}), 204
         return jsonify(data)
+
+    try:
+        saved_at = planilla_store.saved_at()
+        return conditional_get(("api/planilla", saved_at), planilla_last_modified(saved_at), build)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -1314,6 +2630,53 @@ def guardar_planilla():
         return jsonify({"ok": False, "message": str(e)}), 500
 
 
+@app.route("/api/planilla/fila/<dpi>", methods=["PATCH"])
+def api_planilla_fila(dpi):
+    """
+    Actualiza una sola fila de la planilla (por DPI) con los campos enviados.
+    Si la fila no existe se agrega al final. Retorna { ok, saved_at, row }.
+    """
+    try:
+        fields = request.get_json(silent=True)
+        if not isinstance(fields, dict):
+            return jsonify({"ok": False, "message": "Se esperaba un objeto JSON"}), 400
+        fields.pop("dpi", None)
+        row, saved_at = planilla_store.patch_row(dpi, fields)
+        return jsonify({"ok": True, "saved_at": saved_at, "row": row})
+    except Exception as e:
+        return jsonify({"ok": False, "message": str(e)}), 500
+
+
+@app.route("/api/planilla/calcular", methods=["GET", "POST"])
+def api_planilla_calcular():
+    """
+    Calcula horas extra, devengado, IGSS, ISR, deducciones y líquido de
+    todas las filas en una sola pasada (ver nomina.py).
+    GET usa la planilla guardada en el servidor; POST acepta { rows }
+    para calcular sin guardar. ?solo_totales=1 omite el detalle por fila.
+    """
+    try:
+        if request.method == "POST":
+            payload = request.get_json(silent=True) or {}
+            rows = payload.get("rows") if isinstance(payload, dict) else None
+        else:
+            rows = (read_planilla_store() or {}).get("rows")
+        rows = rows if isinstance(rows, list) else []
+
+        solo_totales = request.args.get("solo_totales") in ("1", "true", "si")
+        inicio = time.perf_counter()
+        filas, totales, motor = calcular_planilla(rows, con_filas=not solo_totales)
+        elapsed_ms = round((time.perf_counter() - inicio) * 1000, 3)
+
+        return jsonify({
+            "rows": filas,
+            "totals": totales,
+            "meta": {"count": len(rows), "engine": motor, "elapsed_ms": elapsed_ms},
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 if __name__ == "__main__":
     # escucha en todas las interfaces en el puerto 7287 (http)
     app.run(host="0.0.0.0", port=7287, debug=True)
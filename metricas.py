@@ -0,0 +1,263 @@
+"""
+Métricas de la app en el formato de texto de Prometheus (/metrics).
+
+Por petición: latencia por endpoint, peticiones por código de estado,
+cantidad de consultas a MySQL y tiempo total en BD. Además, la duración de
+cada consulta, de cada llamada a Supabase y del procesamiento de imágenes.
+
+Cada observación cuesta un bisect y un lock en memoria. Como gunicorn
+reparte las peticiones entre workers, cada uno vuelca su copia cada pocos
+segundos a <directorio>/<pid>.json y /metrics suma los archivos de los
+workers vivos: cualquier worker que atienda el scrape responde por todos.
+"""
+import bisect
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+
+BUCKETS_PETICION = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_CONSULTA = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+BUCKETS_CANTIDAD = (0, 1, 2, 3, 5, 10, 25, 50, 100, 250)
+BUCKETS_EXTERNO = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# nombre -> (tipo, ayuda, etiquetas, buckets)
+FAMILIAS = {
+    "app_requests_total": (
+        "counter", "Peticiones atendidas por endpoint, método y código de estado.",
+        ("endpoint", "method", "status"), None),
+    "app_request_duration_seconds": (
+        "histogram", "Latencia de cada petición por endpoint (hasta entregar la respuesta a WSGI).",
+        ("endpoint", "method"), BUCKETS_PETICION),
+    "app_request_db_queries": (
+        "histogram", "Consultas a MySQL ejecutadas en cada petición.",
+        ("endpoint",), BUCKETS_CANTIDAD),
+    "app_request_db_seconds": (
+        "histogram", "Tiempo total en MySQL dentro de cada petición.",
+        ("endpoint",), BUCKETS_CONSULTA),
+    "app_db_query_duration_seconds": (
+        "histogram", "Duración de cada cursor.execute (dentro o fuera de una petición).",
+        (), BUCKETS_CONSULTA),
+    "app_supabase_duration_seconds": (
+        "histogram", "Latencia de las llamadas al storage de Supabase.",
+        ("operacion", "resultado"), BUCKETS_EXTERNO),
+    "app_imagen_duration_seconds": (
+        "histogram", "Tiempo de procesamiento de imágenes con PIL.",
+        ("operacion", "resultado"), BUCKETS_PETICION),
+}
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _etiquetas(nombres, valores, extra=None):
+    pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _numero(v):
+    if isinstance(v, float):
+        return repr(v) if v != int(v) or abs(v) >= 1e15 else str(int(v))
+    return str(v)
+
+
+class Metricas:
+
+    def __init__(self, directorio=None, intervalo=5.0):
+        self.directorio = directorio
+        self.intervalo = intervalo
+        self._lock = threading.Lock()
+        self._series = {nombre: {} for nombre in FAMILIAS}
+        self._colectores = []
+        self._ultimo_volcado = 0.0
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+
+    # ---------------- registro ----------------
+    def incrementar(self, nombre, *etiquetas, n=1):
+        with self._lock:
+            serie = self._series[nombre]
+            serie[etiquetas] = serie.get(etiquetas, 0) + n
+
+    def observar(self, nombre, valor, *etiquetas):
+        buckets = FAMILIAS[nombre][3]
+        i = bisect.bisect_left(buckets, valor)
+        with self._lock:
+            serie = self._series[nombre].get(etiquetas)
+            if serie is None:
+                # conteos por bucket (no acumulados), +Inf y al final la suma
+                serie = self._series[nombre][etiquetas] = [0] * (len(buckets) + 1) + [0.0]
+            serie[i] += 1
+            serie[-1] += valor
+
+    @contextmanager
+    def medir(self, nombre, operacion):
+        inicio = time.perf_counter()
+        resultado = "ok"
+        try:
+            yield
+        except BaseException:
+            resultado = "error"
+            raise
+        finally:
+            self.observar(nombre, time.perf_counter() - inicio, operacion, resultado)
+
+    def consulta(self, segundos):
+        """Llamado por el cursor después de cada execute."""
+        self.observar("app_db_query_duration_seconds", segundos)
+        if has_request_context():
+            actual = g.get("_metricas")
+            if actual is not None:
+                actual[1] += 1
+                actual[2] += segundos
+
+    def colector(self, fn):
+        """
+        fn() -> [(nombre, tipo, ayuda, {((etiqueta, valor), ...): número})],
+        leído en cada volcado; los valores de los workers se suman.
+        """
+        self._colectores.append(fn)
+        return fn
+
+    # ---------------- hooks de Flask ----------------
+    def instalar(self, app):
+        app.before_request(self._inicio)
+        app.after_request(self._estado)
+        app.teardown_request(self._fin)
+
+    def _inicio(self):
+        g._metricas = [time.perf_counter(), 0, 0.0]   # inicio, consultas, segundos en BD
+
+    def _estado(self, response):
+        g._metricas_status = response.status_code
+        return response
+
+    def _fin(self, exc):
+        actual = g.pop("_metricas", None)
+        if actual is None:
+            return
+        status = g.pop("_metricas_status", 500)
+        endpoint = request.endpoint or "sin_ruta"
+        duracion = time.perf_counter() - actual[0]
+        self.incrementar("app_requests_total", endpoint, request.method, str(status))
+        self.observar("app_request_duration_seconds", duracion, endpoint, request.method)
+        self.observar("app_request_db_queries", actual[1], endpoint)
+        self.observar("app_request_db_seconds", actual[2], endpoint)
+        if self.directorio and time.monotonic() - self._ultimo_volcado > self.intervalo:
+            self.volcar()
+
+    # ---------------- workers ----------------
+    def _copia(self):
+        with self._lock:
+            series = {nombre: [[list(k), v if isinstance(v, (int, float)) else list(v)]
+                               for k, v in datos.items()]
+                      for nombre, datos in self._series.items()}
+        extras = []
+        for fn in self._colectores:
+            try:
+                for nombre, tipo, ayuda, valores in fn():
+                    extras.append([nombre, tipo, ayuda, [[list(k), v] for k, v in valores.items()]])
+            except Exception:
+                pass
+        return {"series": series, "extras": extras}
+
+    def volcar(self):
+        self._ultimo_volcado = time.monotonic()
+        if not self.directorio:
+            return
+        pid = os.getpid()
+        ruta = os.path.join(self.directorio, f"{pid}.json")
+        tmp = f"{ruta}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._copia(), f)
+            os.replace(tmp, ruta)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _vivo(pid):
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except OSError:
+            return True
+        return True
+
+    def _copias(self):
+        if not self.directorio:
+            return [self._copia()]
+        self.volcar()
+        copias = []
+        for ruta in glob.glob(os.path.join(self.directorio, "*.json")):
+            nombre = os.path.basename(ruta)[:-5]
+            if not nombre.isdigit():
+                continue
+            if int(nombre) != os.getpid() and not self._vivo(int(nombre)):
+                try:
+                    os.remove(ruta)   # worker reiniciado: sus contadores se van con él
+                except OSError:
+                    pass
+                continue
+            try:
+                with open(ruta, "r", encoding="utf-8") as f:
+                    copias.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return copias
+
+    # ---------------- exposición ----------------
+    def exposicion(self):
+        """Texto para Prometheus con la suma de todos los workers vivos."""
+        series = {nombre: {} for nombre in FAMILIAS}
+        extras = {}
+        for copia in self._copias():
+            for nombre, datos in copia.get("series", {}).items():
+                if nombre not in series:
+                    continue
+                destino = series[nombre]
+                for k, v in datos:
+                    k = tuple(k)
+                    if isinstance(v, list):
+                        previo = destino.get(k)
+                        destino[k] = v if previo is None else [a + b for a, b in zip(previo, v)]
+                    else:
+                        destino[k] = destino.get(k, 0) + v
+            for nombre, tipo, ayuda, datos in copia.get("extras", []):
+                _, _, acumulado = extras.setdefault(nombre, (tipo, ayuda, {}))
+                for k, v in datos:
+                    k = tuple(tuple(par) for par in k)
+                    acumulado[k] = acumulado.get(k, 0) + v
+
+        lineas = []
+        for nombre, (tipo, ayuda, etiquetas, buckets) in FAMILIAS.items():
+            lineas.append(f"# HELP {nombre} {ayuda}")
+            lineas.append(f"# TYPE {nombre} {tipo}")
+            for k in sorted(series[nombre]):
+                v = series[nombre][k]
+                if tipo == "counter":
+                    lineas.append(f"{nombre}{_etiquetas(etiquetas, k)} {_numero(v)}")
+                    continue
+                acumulado = 0
+                for limite, n in zip(list(buckets) + ["+Inf"], v[:-1]):
+                    acumulado += n
+                    le = limite if limite == "+Inf" else _numero(float(limite))
+                    extra = 'le="%s"' % le
+                    lineas.append(f"{nombre}_bucket{_etiquetas(etiquetas, k, extra)} {acumulado}")
+                lineas.append(f"{nombre}_sum{_etiquetas(etiquetas, k)} {_numero(v[-1])}")
+                lineas.append(f"{nombre}_count{_etiquetas(etiquetas, k)} {acumulado}")
+        for nombre, (tipo, ayuda, datos) in extras.items():
+            lineas.append(f"# HELP {nombre} {ayuda}")
+            lineas.append(f"# TYPE {nombre} {tipo}")
+            for k in sorted(datos):
+                etiquetas = _etiquetas([p[0] for p in k], [p[1] for p in k]) if k else ""
+                lineas.append(f"{nombre}{etiquetas} {_numero(datos[k])}")
+        return "\n".join(lineas) + "\n"
@@ -0,0 +1,277 @@
+"""
+Migraciones versionadas del esquema de empleados_info.
+
+Cada migración tiene un número de versión y se registra en la tabla
+schema_migrations al terminar. En MySQL el DDL confirma implícitamente, así
+que cada paso revisa information_schema antes de actuar: si una migración
+se corta a la mitad, volver a ejecutarla retoma donde quedó.
+
+Uso:  flask --app index migrar            (aplica las pendientes)
+      flask --app index migrar --estado   (solo muestra el estado)
+"""
+from collections import namedtuple
+
+TABLA = "empleados_info"
+LOCK_NAME = "empleados_migraciones"
+
+DPI_LARGO = 20
+
+# Esquema declarado: grupo -> [(columna, tipo)]. El grupo "base" son los datos
+# generales; los demás, las columnas de cada sección de la ficha.
+ESQUEMA = {
+    "base": [
+        ("Numero de DPI", f"VARCHAR({DPI_LARGO}) NOT NULL"),
+        ("Nombre", "VARCHAR(100)"),
+        ("Apellidos", "VARCHAR(100)"),
+        ("Apellidos de casada", "VARCHAR(100)"),
+        ("Estado Civil", "VARCHAR(30)"),
+        ("Nacionalidad", "VARCHAR(60)"),
+        ("Departamento", "VARCHAR(60)"),
+        ("Fecha de nacimiento", "VARCHAR(20)"),
+        ("Lugar de nacimiento", "VARCHAR(120)"),
+        ("Numero de Afiliación del IGGS", "VARCHAR(30)"),
+        ("Dirección del Domicilio", "VARCHAR(255)"),
+        ("Numero de Telefono", "VARCHAR(30)"),
+        ("Religión", "VARCHAR(60)"),
+        ("Correo Electronico", "VARCHAR(120)"),
+        ("Puesto de trabajo", "VARCHAR(120)"),
+        ("Tipo de contrato", "VARCHAR(60)"),
+        ("Jornada laboral", "VARCHAR(60)"),
+        ("Duración del trabajo", "VARCHAR(60)"),
+        ("Fecha de inicio laboral", "VARCHAR(20)"),
+        ("Dias Laborales", "VARCHAR(60)"),
+        ("foto", "VARCHAR(512)"),
+    ],
+    "academico": [
+        ("Nivel de estudios", "VARCHAR(120)"),
+        ("Profesión u Oficio", "VARCHAR(120)"),
+        ("Colegio o establecimiento", "VARCHAR(255)"),
+        ("Cursos o titulos adicionales", "TEXT"),
+    ],
+    "conyugue": [
+        ("Nombres del conyugue", "VARCHAR(120)"),
+        ("Apellidos del conyugue", "VARCHAR(120)"),
+        ("Direccion del conyugue", "VARCHAR(255)"),
+        ("Numero de telefono del conyugue", "VARCHAR(30)"),
+        ("Correo electronico del conyugue", "VARCHAR(120)"),
+    ],
+    "emergencia": [
+        ("Nombre del contacto de emergencia", "VARCHAR(120)"),
+        ("Apellidos del contacto de emergencia", "VARCHAR(120)"),
+        ("Numero de telefono de emergencia", "VARCHAR(30)"),
+    ],
+    "laboral": [
+        ("Nombre de la Empresa (Ultimo Trabajo)", "VARCHAR(255)"),
+        ("Direccion de la empresa", "VARCHAR(255)"),
+        ("Inicio laboral en la empresa", "VARCHAR(20)"),
+        ("Fin Laboral en la empresa", "VARCHAR(20)"),
+        ("Motivo del retiro", "TEXT"),
+        ("Nombre del Jefe Imediato", "VARCHAR(120)"),
+        ("Numero del Jefe inmediato", "VARCHAR(30)"),
+    ],
+    "medica": [
+        ("Padece alguna enfermedad", "VARCHAR(10)"),
+        ("Tipo de enfermedad", "VARCHAR(255)"),
+        ("Recibe tratamiento medico", "VARCHAR(10)"),
+        ("Nombre del tratamiento", "VARCHAR(255)"),
+        ("Es alergico a algun medicamento", "VARCHAR(255)"),
+        ("Nombre del medico Tratante", "VARCHAR(120)"),
+        ("Numero del medico tratante", "VARCHAR(30)"),
+        ("Tipo de sangre", "VARCHAR(5)"),
+    ],
+}
+
+Migracion = namedtuple("Migracion", "version nombre aplicar opcional")
+
+
+class ErrorMigracion(Exception):
+    """La migración no puede continuar sin intervención (p. ej. DPI duplicados)."""
+
+
+def _q(nombre):
+    return "`" + nombre.replace("`", "``") + "`"
+
+
+# ---------------- introspección ----------------
+def columnas(cursor, tabla=TABLA):
+    """columna -> (DATA_TYPE, CHARACTER_MAXIMUM_LENGTH)"""
+    cursor.execute("""
+        SELECT COLUMN_NAME AS nombre, DATA_TYPE AS tipo, CHARACTER_MAXIMUM_LENGTH AS largo
+        FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+    """, (tabla,))
+    return {r["nombre"]: (r["tipo"].lower(), r["largo"]) for r in cursor.fetchall()}
+
+
+def indices(cursor, tabla=TABLA):
+    """nombre del índice -> (único, [columnas en orden])"""
+    cursor.execute("""
+        SELECT INDEX_NAME AS nombre, NON_UNIQUE AS no_unico, COLUMN_NAME AS columna
+        FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+        ORDER BY INDEX_NAME, SEQ_IN_INDEX
+    """, (tabla,))
+    out = {}
+    for r in cursor.fetchall():
+        unico, cols = out.setdefault(r["nombre"], (not r["no_unico"], []))
+        cols.append(r["columna"])
+    return out
+
+
+def _parte_indice(cols_info, columna, maximo):
+    """Columna para un índice; los TEXT/VARCHAR largos llevan prefijo."""
+    tipo, largo = cols_info[columna]
+    if tipo in ("text", "mediumtext", "longtext", "tinytext", "blob") or (largo and largo > maximo):
+        return f"{_q(columna)}({maximo})"
+    return _q(columna)
+
+
+def _crear_indice(cursor, nombre, cols, unico=False, maximos=None):
+    existentes = indices(cursor)
+    if nombre in existentes:
+        return False
+    # otro índice con las mismas columnas iniciales ya sirve
+    for unico_ex, cols_ex in existentes.values():
+        if cols_ex[:len(cols)] == list(cols) and (unico_ex or not unico):
+            return False
+    info = columnas(cursor)
+    # un prefijo cambiaría qué cuenta como repetido: los únicos van completos
+    partes = ", ".join(_q(c) if unico else _parte_indice(info, c, (maximos or {}).get(c, 191)) for c in cols)
+    cursor.execute(f"ALTER TABLE {_q(TABLA)} ADD {'UNIQUE ' if unico else ''}INDEX {_q(nombre)} ({partes})")
+    return True
+
+
+# ---------------- migraciones ----------------
+def m001_esquema_base(cursor):
+    """Crea la tabla si no existe y agrega las columnas que falten."""
+    defs = [f"{_q(c)} {t}" for grupo in ESQUEMA.values() for c, t in grupo]
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {_q(TABLA)} (
+            {", ".join(defs)},
+            PRIMARY KEY ({_q("Numero de DPI")})
+        ) DEFAULT CHARSET=utf8mb4
+    """)
+    existentes = columnas(cursor)
+    for grupo in ESQUEMA.values():
+        for col, tipo in grupo:
+            if col not in existentes:
+                tipo = tipo.replace(" NOT NULL", "")
+                cursor.execute(f"ALTER TABLE {_q(TABLA)} ADD COLUMN {_q(col)} {tipo}")
+
+
+def m002_dpi_unico(cursor):
+    cursor.execute(f"""
+        SELECT {_q("Numero de DPI")} AS dpi, COUNT(*) AS n FROM {_q(TABLA)}
+        WHERE {_q("Numero de DPI")} IS NOT NULL
+        GROUP BY {_q("Numero de DPI")} HAVING COUNT(*) > 1 LIMIT 20
+    """)
+    repetidos = cursor.fetchall()
+    if repetidos:
+        lista = ", ".join(f"{r['dpi']} (x{r['n']})" for r in repetidos)
+        raise ErrorMigracion(f"Hay DPI repetidos; corríjalos antes de crear el índice único: {lista}")
+    _crear_indice(cursor, "ux_empleados_dpi", ["Numero de DPI"], unico=True)
+
+
+def m003_indice_nombre(cursor):
+    # mismo orden que EMPLEADOS_ORDER_COLS: sirve al ORDER BY y a la paginación por cursor
+    _crear_indice(cursor, "ix_empleados_nombre", ["Apellidos", "Nombre", "Numero de DPI"],
+                  maximos={"Apellidos": 100, "Nombre": 100, "Numero de DPI": DPI_LARGO})
+
+
+def m004_indice_foto(cursor):
+    _crear_indice(cursor, "ix_empleados_foto", ["foto"], maximos={"foto": 191})
+
+
+# Las tablas por sección (empleados_<grupo>, versión 5) se retiraron: las
+# vistas de sección leen del modelo en memoria de index.py, así que los
+# triggers solo sumaban costo a cada escritura. Sus columnas siguen en
+# empleados_info, la tabla angosta era una copia.
+SECCIONES_RETIRADAS = [g for g in ESQUEMA if g != "base"]
+
+
+def m006_retirar_tablas_por_seccion(cursor):
+    """Quita triggers y tablas de la versión 5 donde se haya aplicado."""
+    if 5 not in aplicadas(cursor):
+        return
+    for grupo in SECCIONES_RETIRADAS:
+        tabla = f"empleados_{grupo}"
+        for evento in ("insert", "update", "delete"):
+            cursor.execute(f"DROP TRIGGER IF EXISTS {_q(f'tr_{tabla}_{evento}')}")
+        cursor.execute(f"DROP TABLE IF EXISTS {_q(tabla)}")
+    cursor.execute("DELETE FROM schema_migrations WHERE version = 5")
+
+
+MIGRACIONES = [
+    Migracion(1, "esquema base de empleados_info", m001_esquema_base, False),
+    Migracion(2, "índice único sobre Numero de DPI", m002_dpi_unico, False),
+    Migracion(3, "índice (Apellidos, Nombre, DPI)", m003_indice_nombre, False),
+    Migracion(4, "índice sobre foto", m004_indice_foto, False),
+    Migracion(6, "retira las tablas por sección de la versión 5", m006_retirar_tablas_por_seccion, False),
+]
+
+
+# ---------------- ejecución ----------------
+def _asegurar_tabla_versiones(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version    INT NOT NULL PRIMARY KEY,
+            nombre     VARCHAR(200) NOT NULL,
+            aplicada_en DATETIME NOT NULL
+        ) DEFAULT CHARSET=utf8mb4
+    """)
+
+
+def aplicadas(cursor):
+    _asegurar_tabla_versiones(cursor)
+    cursor.execute("SELECT version, aplicada_en FROM schema_migrations")
+    return {r["version"]: r["aplicada_en"] for r in cursor.fetchall()}
+
+
+def estado(conn):
+    cursor = conn.cursor()
+    try:
+        hechas = aplicadas(cursor)
+        return [{
+            "version": m.version,
+            "nombre": m.nombre,
+            "opcional": m.opcional,
+            "aplicada_en": str(hechas[m.version]) if m.version in hechas else None,
+        } for m in MIGRACIONES]
+    finally:
+        cursor.close()
+
+
+def migrar(conn, opcionales=False, hasta=None, log=print):
+    """
+    Aplica en orden las migraciones pendientes (las opcionales solo si se
+    piden). Un candado GET_LOCK evita que dos procesos migren a la vez.
+    Devuelve la lista de versiones aplicadas.
+    """
+    cursor = conn.cursor()
+    hechas_ahora = []
+    try:
+        cursor.execute("SELECT GET_LOCK(%s, 60) AS ok", (LOCK_NAME,))
+        if not (cursor.fetchone() or {}).get("ok"):
+            raise ErrorMigracion("Otra migración está en curso")
+        try:
+            hechas = aplicadas(cursor)
+            for m in MIGRACIONES:
+                if hasta is not None and m.version > hasta:
+                    break
+                if m.version in hechas or (m.opcional and not opcionales):
+                    continue
+                log(f"Aplicando {m.version:03d}: {m.nombre}")
+                m.aplicar(cursor)
+                cursor.execute(
+                    "INSERT INTO schema_migrations (version, nombre, aplicada_en) VALUES (%s, %s, NOW())",
+                    (m.version, m.nombre))
+                conn.commit()
+                hechas_ahora.append(m.version)
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (LOCK_NAME,))
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return hechas_ahora
@@ -0,0 +1,168 @@
+"""
+Motor de cálculo de la planilla (IGSS, ISR, horas extra, líquido).
+
+Replica exactamente las fórmulas de static/js/nomina.js y
+static/js/planilla.js (computeHorasMontoMensual, computeISRMonthlyFromRow,
+recalcRow y recalcTotals) pero procesa todas las filas de una vez, por columnas.
+Si numpy está instalado se usa en forma vectorizada; si no, se hace el
+mismo cálculo con listas de Python.
+"""
+import math
+import sys
+
+try:
+    import numpy as np
+except Exception:  # numpy es opcional
+    np = None
+
+# Constantes fiscales (mismos valores que en static/js/nomina.js)
+IGSS_RATE = 0.0483
+GASTOS_PERSONALES_ANUAL = 48000
+ISR_ANNUAL_RATE = 0.05
+ISR_MIN_SALARIO = 4000.00
+
+_EPS = sys.float_info.epsilon  # Number.EPSILON en JS
+_INF = float("inf")
+
+# campos numéricos de entrada: clave en la fila -> ¿es entero?
+CAMPOS_ENTRADA = {
+    "sueldo": False,
+    "bono": False,
+    "comisiones": False,
+    "dias": True,
+    "horas": True,
+    "otras": False,
+}
+
+# campos que se suman en la fila de totales
+CAMPOS_TOTALES = (
+    "sueldo", "bono", "comisiones", "horas", "hextras", "devengado",
+    "igss", "isr", "otras", "deducciones", "liquido",
+)
+
+CAMPOS_SALIDA = ("hextras", "devengado", "igss", "isr", "deducciones", "liquido")
+
+
+def round2(n):
+    """Igual que round2() del frontend: Math.round((n + EPSILON) * 100) / 100."""
+    return math.floor((n + _EPS) * 100 + 0.5) / 100
+
+
+def _num(value, entero=False):
+    """parseFloat(...) || 0 / parseInt(...) || 0 tolerante a strings y None."""
+    if value.__class__ is float or value.__class__ is int:
+        n = value
+    else:
+        try:
+            n = float(value)
+        except (TypeError, ValueError):
+            return 0
+    if n != n or n == _INF or n == -_INF:
+        return 0
+    return int(n) if entero else n
+
+
+def columnas(rows):
+    """Convierte la lista de filas de la planilla en columnas numéricas."""
+    rows = [r if isinstance(r, dict) else {} for r in rows]
+    return {k: [_num(r.get(k), entero) for r in rows] for k, entero in CAMPOS_ENTRADA.items()}
+
+
+def _calcular_numpy(cols):
+    def r2(a):
+        return np.floor((a + _EPS) * 100 + 0.5) / 100
+
+    sueldo = np.asarray(cols["sueldo"], dtype=np.float64)
+    bono = np.asarray(cols["bono"], dtype=np.float64)
+    comisiones = np.asarray(cols["comisiones"], dtype=np.float64)
+    dias = np.asarray(cols["dias"], dtype=np.float64)
+    horas = np.asarray(cols["horas"], dtype=np.float64)
+    otras = np.asarray(cols["otras"], dtype=np.float64)
+
+    # horas extra: sueldo / dias / 8 * 1.5 * horas (0 si no hay días)
+    con_dias = dias > 0
+    valor_hora = np.divide(sueldo, dias, out=np.zeros_like(sueldo), where=con_dias) / 8
+    hextras = np.where(con_dias, r2(valor_hora * 1.5 * horas), 0.0)
+
+    devengado = r2(sueldo + bono + comisiones + hextras)
+    igss = r2(sueldo * IGSS_RATE)
+
+    # ISR mensual proyectado a partir de ingresos anuales
+    ganancias_anual = r2((sueldo * 2) * 12 + (bono * 2) * 12 + hextras * 12 + comisiones * 12)
+    igss_anual = r2(ganancias_anual * IGSS_RATE)
+    base = r2(ganancias_anual - (GASTOS_PERSONALES_ANUAL + igss_anual))
+    isr = r2(r2(base * ISR_ANNUAL_RATE) / 12)
+    isr = np.where(((sueldo * 2) < ISR_MIN_SALARIO) | (base <= 0), 0.0, isr)
+
+    deducciones = r2(igss + isr + otras)
+    liquido = r2(devengado - deducciones)
+
+    out = {
+        "hextras": hextras, "devengado": devengado, "igss": igss, "isr": isr,
+        "deducciones": deducciones, "liquido": liquido,
+    }
+    totales = {
+        "sueldo": sueldo.sum(), "bono": bono.sum(), "comisiones": comisiones.sum(),
+        "horas": horas.sum(), "otras": otras.sum(),
+    }
+    for k, v in out.items():
+        totales[k] = v.sum()
+    return {k: v.tolist() for k, v in out.items()}, {k: float(v) for k, v in totales.items()}
+
+
+def _calcular_python(cols):
+    out = {k: [] for k in CAMPOS_SALIDA}
+    for sueldo, bono, comisiones, dias, horas, otras in zip(
+            cols["sueldo"], cols["bono"], cols["comisiones"],
+            cols["dias"], cols["horas"], cols["otras"]):
+        hextras = round2(sueldo / dias / 8 * 1.5 * horas) if dias > 0 else 0.0
+        devengado = round2(sueldo + bono + comisiones + hextras)
+        igss = round2(sueldo * IGSS_RATE)
+        isr = 0.0
+        if (sueldo * 2) >= ISR_MIN_SALARIO:
+            ganancias_anual = round2((sueldo * 2) * 12 + (bono * 2) * 12 + hextras * 12 + comisiones * 12)
+            igss_anual = round2(ganancias_anual * IGSS_RATE)
+            base = round2(ganancias_anual - (GASTOS_PERSONALES_ANUAL + igss_anual))
+            if base > 0:
+                isr = round2(round2(base * ISR_ANNUAL_RATE) / 12)
+        deducciones = round2(igss + isr + otras)
+        liquido = round2(devengado - deducciones)
+        for k, v in (("hextras", hextras), ("devengado", devengado), ("igss", igss),
+                     ("isr", isr), ("deducciones", deducciones), ("liquido", liquido)):
+            out[k].append(v)
+
+    totales = {k: float(sum(cols[k])) for k in ("sueldo", "bono", "comisiones", "horas", "otras")}
+    for k in CAMPOS_SALIDA:
+        totales[k] = float(sum(out[k]))
+    return out, totales
+
+
+def calcular_planilla(rows, con_filas=True):
+    """
+    Calcula todas las filas de la planilla en una sola pasada.
+    Devuelve (filas_calculadas, totales, motor) donde cada fila calculada
+    conserva dpi y nombre de la fila original. Con con_filas=False solo se
+    calculan los totales (filas_calculadas queda vacía).
+    """
+    rows = rows if isinstance(rows, list) else []
+    cols = columnas(rows)
+    if np is not None and rows:
+        salida, totales, motor = *_calcular_numpy(cols), "numpy"
+    else:
+        salida, totales, motor = *_calcular_python(cols), "python"
+
+    filas = []
+    claves = ("dpi", "nombre") + tuple(CAMPOS_ENTRADA) + CAMPOS_SALIDA
+    if con_filas:
+        filas = [
+            dict(zip(claves, valores))
+            for valores in zip(
+                (r.get("dpi", "") if isinstance(r, dict) else "" for r in rows),
+                (r.get("nombre", "") if isinstance(r, dict) else "" for r in rows),
+                *(cols[k] for k in CAMPOS_ENTRADA),
+                *(salida[k] for k in CAMPOS_SALIDA),
+            )
+        ]
+
+    totales = {k: round2(totales.get(k, 0.0)) for k in CAMPOS_TOTALES}
+    return filas, totales, motor
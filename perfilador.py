@@ -0,0 +1,220 @@
+"""
+Perfilado estadístico por petición, a pedido.
+
+Mientras una petición está marcada, un hilo de muestreo lee cada pocos
+milisegundos la pila del hilo que la atiende (sys._current_frames) y cuenta
+cuántas veces aparece cada pila. Al terminar se escribe un archivo en
+formato "collapsed stacks" (una línea por pila: marco;marco;marco N), el
+que leen flamegraph.pl, speedscope o inferno para dibujar la flamegraph.
+
+Los archivos se guardan en un directorio que funciona como buffer circular:
+al pasar el límite de tamaño o de cantidad se borran los más viejos. El
+nombre lleva los datos de la petición, así que listar no abre archivos y
+sirve entre workers.
+
+Con workers gevent cada petición es un greenlet: el muestreador corre en un
+hilo del sistema (fuera del loop) y toma la pila suspendida del greenlet
+(gr_frame) o, si es el que está corriendo, la del hilo que lo ejecuta.
+"""
+import os
+import re
+import sys
+import time
+
+from flask import g, request
+
+from concurrencia import (dormir_del_sistema, greenlet_actual, ident_del_sistema,
+                          iniciar_hilo_del_sistema, lock_del_sistema)
+
+# <ms epoch>_<pid>_<secuencia>_<método>_<endpoint>_<status>_<duración ms>.folded
+_NOMBRE = re.compile(
+    r"^(?P<ts>\d{13})_(?P<pid>\d+)_(?P<seq>\d+)_(?P<metodo>[A-Z]+)_(?P<endpoint>[A-Za-z0-9_.]+)"
+    r"_(?P<status>\d{3})_(?P<ms>\d+)\.folded$")
+EXTENSION = ".folded"
+PROFUNDIDAD_MAX = 200
+
+
+class _Muestra:
+    __slots__ = ("hilo", "greenlet", "inicio", "pilas", "muestras")
+
+    def __init__(self, hilo, greenlet):
+        self.hilo = hilo
+        self.greenlet = greenlet
+        self.inicio = time.perf_counter()
+        self.pilas = {}
+        self.muestras = 0
+
+
+class Perfilador:
+
+    def __init__(self, directorio, intervalo=0.005, max_bytes=50 * 1024 * 1024, max_archivos=500):
+        self.directorio = directorio
+        self.intervalo = intervalo
+        self.max_bytes = max_bytes
+        self.max_archivos = max_archivos
+        self._lock = lock_del_sistema()
+        self._activas = {}      # id del hilo (o del greenlet) -> _Muestra
+        self._muestreando = False
+        self._etiquetas = {}    # code object -> "funcion (archivo.py:línea)"
+        self._seq = 0
+        self._decidir = None
+        os.makedirs(directorio, exist_ok=True)
+
+    # ---------------- muestreo ----------------
+    def iniciar(self):
+        """Empieza a muestrear la petición actual; devuelve el objeto a pasar a terminar()."""
+        muestra = _Muestra(ident_del_sistema(), greenlet_actual())
+        with self._lock:
+            self._activas[self._llave(muestra)] = muestra
+            if not self._muestreando:
+                self._muestreando = True
+                iniciar_hilo_del_sistema(self._bucle)
+        return muestra
+
+    @staticmethod
+    def _llave(muestra):
+        return id(muestra.greenlet) if muestra.greenlet is not None else muestra.hilo
+
+    def _bucle(self):
+        propio = ident_del_sistema()
+        while True:
+            with self._lock:
+                if not self._activas:
+                    self._muestreando = False
+                    return
+                activas = list(self._activas.items())
+            marcos = sys._current_frames()
+            pilas = []
+            for llave, muestra in activas:
+                frame = None
+                if muestra.greenlet is not None:
+                    # suspendido: dónde espera; None si es el que corre ahora en su hilo
+                    frame = muestra.greenlet.gr_frame
+                if frame is None and muestra.hilo != propio:
+                    frame = marcos.get(muestra.hilo)
+                if frame is not None:
+                    pilas.append((llave, self._pila(frame)))
+            frame = marcos = None
+            with self._lock:
+                for llave, pila in pilas:
+                    muestra = self._activas.get(llave)
+                    if muestra is not None:
+                        muestra.pilas[pila] = muestra.pilas.get(pila, 0) + 1
+                        muestra.muestras += 1
+            dormir_del_sistema(self.intervalo)
+
+    def _etiqueta(self, code):
+        etiqueta = self._etiquetas.get(code)
+        if etiqueta is None:
+            # la línea de definición (no la actual) para no partir una función en varios marcos
+            etiqueta = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            etiqueta = etiqueta.replace(";", ",")
+            self._etiquetas[code] = etiqueta
+        return etiqueta
+
+    def _pila(self, frame):
+        marcos = []
+        while frame is not None and len(marcos) < PROFUNDIDAD_MAX:
+            marcos.append(self._etiqueta(frame.f_code))
+            frame = frame.f_back
+        marcos.reverse()
+        return ";".join(marcos)
+
+    def terminar(self, muestra, metodo, endpoint, status):
+        """Deja de muestrear y escribe el archivo; devuelve su nombre (None si no hubo muestras)."""
+        with self._lock:
+            self._activas.pop(self._llave(muestra), None)
+            self._seq += 1
+            seq = self._seq
+        duracion_ms = int((time.perf_counter() - muestra.inicio) * 1000)
+        if not muestra.pilas:
+            return None
+        endpoint = re.sub(r"[^A-Za-z0-9_.]", "_", endpoint or "sin_ruta")
+        nombre = (f"{int(time.time() * 1000):013d}_{os.getpid()}_{seq}_{metodo}_{endpoint}"
+                  f"_{status}_{duracion_ms}{EXTENSION}")
+        ruta = os.path.join(self.directorio, nombre)
+        lineas = [f"{pila} {n}\n" for pila, n in sorted(muestra.pilas.items())]
+        try:
+            with open(f"{ruta}.tmp", "w", encoding="utf-8") as f:
+                f.writelines(lineas)
+            os.replace(f"{ruta}.tmp", ruta)
+        except OSError:
+            return None
+        self._recortar()
+        return nombre
+
+    # ---------------- buffer circular en disco ----------------
+    def _recortar(self):
+        archivos = []
+        for nombre in os.listdir(self.directorio):
+            if not nombre.endswith(EXTENSION):
+                continue
+            try:
+                archivos.append((nombre, os.path.getsize(os.path.join(self.directorio, nombre))))
+            except OSError:
+                continue
+        archivos.sort()     # el nombre empieza con la marca de tiempo: los más viejos primero
+        total = sum(t for _, t in archivos)
+        while archivos and (total > self.max_bytes or len(archivos) > self.max_archivos):
+            nombre, tamano = archivos.pop(0)
+            total -= tamano
+            try:
+                os.remove(os.path.join(self.directorio, nombre))
+            except OSError:
+                pass    # otro worker ya lo borró
+
+    def listar(self):
+        """Perfiles guardados, del más reciente al más viejo."""
+        out = []
+        for nombre in sorted(os.listdir(self.directorio), reverse=True):
+            m = _NOMBRE.match(nombre)
+            if not m:
+                continue
+            try:
+                tamano = os.path.getsize(os.path.join(self.directorio, nombre))
+            except OSError:
+                continue
+            out.append({
+                "nombre": nombre,
+                "fecha": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(int(m.group("ts")) / 1000)),
+                "pid": int(m.group("pid")),
+                "metodo": m.group("metodo"),
+                "endpoint": m.group("endpoint"),
+                "status": int(m.group("status")),
+                "duracion_ms": int(m.group("ms")),
+                "bytes": tamano,
+            })
+        return out
+
+    def ruta(self, nombre):
+        """Ruta del perfil si el nombre es válido y existe; None si no."""
+        if not _NOMBRE.match(nombre or ""):
+            return None
+        ruta = os.path.join(self.directorio, nombre)
+        return ruta if os.path.isfile(ruta) else None
+
+    # ---------------- hooks de Flask ----------------
+    def instalar(self, app, decidir):
+        """decidir() -> bool se evalúa al inicio de cada petición."""
+        self._decidir = decidir
+        app.before_request(self._inicio)
+        app.after_request(self._fin)
+        app.teardown_request(self._error)
+
+    def _inicio(self):
+        if self._decidir():
+            g._perfil = self.iniciar()
+
+    def _fin(self, response):
+        muestra = g.pop("_perfil", None)
+        if muestra is not None:
+            nombre = self.terminar(muestra, request.method, request.endpoint, response.status_code)
+            if nombre:
+                response.headers["X-Perfil"] = nombre
+        return response
+
+    def _error(self, exc):
+        # una excepción no manejada se salta after_request
+        muestra = g.pop("_perfil", None)
+        if muestra is not None:
+            self.terminar(muestra, request.method, request.endpoint, 500)
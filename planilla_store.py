@@ -0,0 +1,180 @@
+"""
+Almacenamiento de la planilla por filas (SQLite embebido).
+
+Cada fila se guarda por separado con su DPI como llave, de modo que un
+guardado solo escribe las filas que cambiaron y un PATCH toca una sola
+fila. Las escrituras usan BEGIN IMMEDIATE en modo WAL: varios workers de
+gunicorn se turnan en lugar de pisarse el archivo.
+"""
+import json
+import os
+import sqlite3
+from datetime import datetime
+
+
+def row_key(row, pos):
+    """Llave de la fila: su DPI o, si no tiene, su posición."""
+    dpi = str((row or {}).get("dpi") or "").strip()
+    return dpi if dpi else f"#{pos}"
+
+
+def _dump(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+
+
+class PlanillaStore:
+
+    def __init__(self, db_path, legacy_json_path=None):
+        self.db_path = db_path
+        self.legacy_json_path = legacy_json_path
+        self._init_db()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _init_db(self):
+        conn = self._connect()
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS planilla_rows (
+                    key  TEXT PRIMARY KEY,
+                    pos  INTEGER NOT NULL,
+                    data TEXT NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS planilla_rows_pos ON planilla_rows (pos)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS planilla_meta (
+                    id   INTEGER PRIMARY KEY CHECK (id = 1),
+                    data TEXT NOT NULL
+                )
+            """)
+            self._import_legacy(conn)
+        finally:
+            conn.close()
+
+    def _import_legacy(self, conn):
+        """Primera ejecución: copia el planilla_store.json existente."""
+        if not self.legacy_json_path or not os.path.exists(self.legacy_json_path):
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("SELECT 1 FROM planilla_meta WHERE id = 1").fetchone():
+                conn.execute("COMMIT")
+                return
+            with open(self.legacy_json_path, "r", encoding="utf-8") as f:
+                legacy = json.load(f)
+            rows = legacy.get("rows") if isinstance(legacy, dict) else None
+            meta = legacy.get("meta") if isinstance(legacy, dict) else None
+            self._replace_rows(conn, rows if isinstance(rows, list) else [])
+            conn.execute("INSERT INTO planilla_meta (id, data) VALUES (1, ?)", (_dump(meta or {}),))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+
+    # ---------------- lectura ----------------
+    def read(self):
+        """Devuelve { rows, meta } o None si nunca se guardó nada."""
+        conn = self._connect()
+        try:
+            meta_row = conn.execute("SELECT data FROM planilla_meta WHERE id = 1").fetchone()
+            if meta_row is None:
+                return None
+            rows = [json.loads(d) for (d,) in conn.execute("SELECT data FROM planilla_rows ORDER BY pos")]
+            return {"rows": rows, "meta": json.loads(meta_row[0])}
+        finally:
+            conn.close()
+
+    def saved_at(self):
+        conn = self._connect()
+        try:
+            meta_row = conn.execute("SELECT data FROM planilla_meta WHERE id = 1").fetchone()
+            return json.loads(meta_row[0]).get("server_saved_at") if meta_row else None
+        finally:
+            conn.close()
+
+    # ---------------- escritura ----------------
+    def _replace_rows(self, conn, rows):
+        """Sincroniza la tabla con la lista dada escribiendo solo diferencias."""
+        existing = {k: (p, d) for k, p, d in conn.execute("SELECT key, pos, data FROM planilla_rows")}
+        wanted = {}
+        upserts = []
+        for pos, row in enumerate(rows):
+            row = row if isinstance(row, dict) else {}
+            key = row_key(row, pos)
+            if key in wanted:
+                # DPI repetido: se conserva la fila en otra llave para no perderla
+                key = f"#{pos}"
+            data = _dump(row)
+            wanted[key] = True
+            if existing.get(key) != (pos, data):
+                upserts.append((key, pos, data))
+        deletes = [(k,) for k in existing if k not in wanted]
+        if deletes:
+            conn.executemany("DELETE FROM planilla_rows WHERE key = ?", deletes)
+        if upserts:
+            conn.executemany("""
+                INSERT INTO planilla_rows (key, pos, data) VALUES (?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET pos = excluded.pos, data = excluded.data
+            """, upserts)
+        return len(upserts), len(deletes)
+
+    def _write_meta(self, conn, meta):
+        meta = dict(meta or {})
+        meta["server_saved_at"] = datetime.utcnow().isoformat()
+        conn.execute("""
+            INSERT INTO planilla_meta (id, data) VALUES (1, ?)
+            ON CONFLICT(id) DO UPDATE SET data = excluded.data
+        """, (_dump(meta),))
+        return meta["server_saved_at"]
+
+    def write(self, rows, meta):
+        """Guarda la planilla completa; devuelve (saved_at, filas_escritas, filas_borradas)."""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                written, deleted = self._replace_rows(conn, rows if isinstance(rows, list) else [])
+                saved_at = self._write_meta(conn, meta)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            return saved_at, written, deleted
+        finally:
+            conn.close()
+
+    def patch_row(self, dpi, fields):
+        """
+        Actualiza (o agrega al final) la fila con ese DPI mezclando solo los
+        campos recibidos. Devuelve (fila, saved_at).
+        """
+        dpi = str(dpi).strip()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                found = conn.execute("SELECT pos, data FROM planilla_rows WHERE key = ?", (dpi,)).fetchone()
+                if found:
+                    pos, data = found[0], json.loads(found[1])
+                else:
+                    last = conn.execute("SELECT COALESCE(MAX(pos), -1) FROM planilla_rows").fetchone()[0]
+                    pos, data = last + 1, {}
+                data.update(fields or {})
+                data["dpi"] = dpi
+                conn.execute("""
+                    INSERT INTO planilla_rows (key, pos, data) VALUES (?, ?, ?)
+                    ON CONFLICT(key) DO UPDATE SET data = excluded.data
+                """, (dpi, pos, _dump(data)))
+                meta_row = conn.execute("SELECT data FROM planilla_meta WHERE id = 1").fetchone()
+                saved_at = self._write_meta(conn, json.loads(meta_row[0]) if meta_row else {})
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            return data, saved_at
+        finally:
+            conn.close()
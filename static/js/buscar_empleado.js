@@ -0,0 +1,93 @@
+// static/js/buscar_empleado.js
+// Selector de empleado con búsqueda en el servidor. Agrega un cuadro de
+// texto antes del <select>: al escribir (con espera de BUSCAR_ESPERA_MS) se
+// piden los resultados a /api/empleados/buscar?q= y se reemplazan las
+// opciones del select, así los 'change' de cada página siguen igual. Sin
+// texto se muestra la primera página de /api/empleados.
+(function () {
+  "use strict";
+
+  const BUSCAR_ESPERA_MS = 250;
+  const BUSCAR_LIMITE = 20;
+  const PRIMERA_PAGINA = 50;
+
+  function dpiDe(e) {
+    return String((e && (e.dpi || e["Numero de DPI"])) || "").trim();
+  }
+
+  function nombreDe(e) {
+    return e.full_name || ((e.Nombre || "") + (e.Apellidos ? " " + e.Apellidos : "")).trim() || dpiDe(e) || "Empleado";
+  }
+
+  function conectar(selectEl, opciones) {
+    if (!selectEl) return null;
+    const cfg = opciones || {};
+    const apiBuscar = cfg.apiBuscar || "/api/empleados/buscar";
+    const apiLista = cfg.apiLista || "/api/empleados";
+    const textoVacio = cfg.textoVacio || "Seleccione un empleado...";
+
+    const input = document.createElement("input");
+    input.type = "search";
+    input.className = cfg.claseInput || "form-control form-control-sm mb-1";
+    input.placeholder = cfg.placeholder || "Buscar por nombre, apellido o DPI";
+    input.setAttribute("aria-label", input.placeholder);
+    input.autocomplete = "off";
+    selectEl.parentNode.insertBefore(input, selectEl);
+
+    let temporizador = null;
+    let ultima = 0;
+
+    function opcion(valor, texto) {
+      const o = document.createElement("option");
+      o.value = valor;
+      o.textContent = texto;
+      return o;
+    }
+
+    function pintar(lista, sinResultados) {
+      const actual = selectEl.value;
+      selectEl.innerHTML = "";
+      selectEl.appendChild(opcion("", textoVacio));
+      lista.forEach(e => {
+        const dpi = dpiDe(e);
+        if (dpi) selectEl.appendChild(opcion(dpi, nombreDe(e)));
+      });
+      if (!lista.length) selectEl.appendChild(opcion("", sinResultados));
+      // conservar la selección si sigue entre las opciones
+      if (actual && Array.from(selectEl.options).some(o => o.value === actual)) selectEl.value = actual;
+    }
+
+    async function cargar(q) {
+      const n = ++ultima;
+      const url = q
+        ? `${apiBuscar}?${new URLSearchParams({ q: q, limit: BUSCAR_LIMITE })}`
+        : `${apiLista}?limit=${PRIMERA_PAGINA}`;
+      try {
+        const r = await fetch(url, { cache: "no-cache", credentials: "same-origin" });
+        if (!r.ok) throw new Error("HTTP " + r.status);
+        const j = await r.json();
+        if (n !== ultima) return;   // llegó tarde: ya hay una búsqueda más nueva
+        pintar(Array.isArray(j) ? j : (j.resultados || []), q ? "Sin resultados" : "No hay empleados");
+      } catch (err) {
+        if (n !== ultima) return;
+        selectEl.innerHTML = "";
+        selectEl.appendChild(opcion("", "Error cargando empleados"));
+        console.error("buscar empleado", err);
+      }
+    }
+
+    input.addEventListener("input", () => {
+      clearTimeout(temporizador);
+      temporizador = setTimeout(() => cargar(input.value.trim()), BUSCAR_ESPERA_MS);
+    });
+
+    cargar("");
+    return {
+      input: input,
+      recargar: () => cargar(input.value.trim()),
+      limpiar: () => { input.value = ""; cargar(""); },
+    };
+  }
+
+  window.BuscarEmpleado = { conectar: conectar };
+})();
@@ -0,0 +1,332 @@
+// static/js/ficha.js
+// Ficha del empleado. La configuración (URLs) la deja la plantilla en window.__FICHA_CONFIG.
+
+(function(){
+  const btn = document.getElementById('btnPrintFicha');
+  if (!btn) return;
+  btn.addEventListener('click', function(){
+    // remove .empty class for print preview, add back after
+    const empties = Array.from(document.querySelectorAll('.form-control.empty'));
+    empties.forEach(e => e.classList.remove('empty'));
+
+    // add a body class to ensure print styles that show header photo + title apply
+    document.body.classList.add('print-photo-header');
+    // small delay to let layout reflow before print
+    setTimeout(()=>{
+      window.print();
+      // restore state after print dialog
+      setTimeout(()=>{
+        empties.forEach(e=>e.classList.add('empty'));
+        document.body.classList.remove('print-photo-header');
+      }, 300);
+    }, 90);
+  });
+})();
+
+(function(){
+  const cfg = window.__FICHA_CONFIG || {};
+  const apiList = cfg.apiEmpleados || '/api/empleados';
+  const apiBuscar = cfg.apiBuscar || '/api/empleados/buscar';
+  const apiEmpleadoBase = cfg.apiEmpleadoBase || '/api/empleado/';
+  const apiFotoBase = cfg.apiFotoBase || '/api/foto/';
+  const placeholder = cfg.placeholder || '';
+
+  const selectEl = document.getElementById('empleadoSelect');
+  const fotoEl = document.getElementById('fotoEmpleado');
+  const btnClear = document.getElementById('btnClear');
+
+  function normalizeKeyToId(key){
+    if (!key) return '';
+    const map = { 'á':'a','é':'e','í':'i','ó':'o','ú':'u','Á':'a','É':'e','Í':'i','Ó':'o','Ú':'u','ñ':'n','Ñ':'n','ü':'u','Ü':'u' };
+    let s = String(key).trim();
+    s = s.split('').map(c => map[c] || c).join('');
+    s = s.toLowerCase();
+    s = s.replace(/[^a-z0-9\s_-]/g,'');
+    s = s.replace(/\s+/g,'_');
+    return s;
+  }
+
+  function setIfExists(id, value){
+    if (!id) return;
+    const el = document.getElementById(id);
+    if (!el) return;
+    el.value = value == null ? '' : String(value);
+  }
+
+  function setCellText(id, text){
+    if (!id) return;
+    const el = document.getElementById(id);
+    if (!el) return;
+    el.innerText = text == null ? '' : String(text);
+  }
+
+  function trySetMany(emp, keys, id){
+    for (const k of keys){
+      if (!k) continue;
+      if (emp.hasOwnProperty(k) && emp[k] !== undefined && emp[k] !== null && String(emp[k]).trim() !== '') {
+        setIfExists(id, emp[k]);
+        return true;
+      }
+      const nk = normalizeKeyToId(k);
+      if (emp.hasOwnProperty(nk) && emp[nk]) { setIfExists(id, emp[nk]); return true; }
+    }
+    return false;
+  }
+
+  // New helper: convert a variety of date strings to dd/mm/yyyy
+  function formatToDDMMYYYY(raw) {
+    if (!raw && raw !== 0) return '';
+    let s = String(raw).trim();
+    if (!s) return '';
+
+    // If already in dd/mm/yyyy (digits and slashes), return normalized
+    const regexDDMMYYYY = /^(\d{1,2})[\/\-](\d{1,2})[\/\-](\d{2,4})$/;
+    const m1 = s.match(regexDDMMYYYY);
+    if (m1) {
+      const dd = m1[1].padStart(2,'0');
+      const mm = m1[2].padStart(2,'0');
+      const yy = m1[3].length === 2 ? ('20' + m1[3]) : m1[3];
+      return `${dd}/${mm}/${yy}`;
+    }
+
+    // ISO date YYYY-MM-DD or with time
+    const isoMatch = s.match(/^(\d{4})-(\d{2})-(\d{2})/);
+    if (isoMatch) {
+      return `${isoMatch[3]}/${isoMatch[2]}/${isoMatch[1]}`;
+    }
+
+    // Try common separators: YYYY/MM/DD
+    const partsSlash = s.split('/');
+    if (partsSlash.length === 3) {
+      if (partsSlash[0].length === 4) {
+        const y = partsSlash[0]; const m = partsSlash[1].padStart(2,'0'); const d = partsSlash[2].padStart(2,'0');
+        return `${d}/${m}/${y}`;
+      } else {
+        const d = partsSlash[0].padStart(2,'0'); const m = partsSlash[1].padStart(2,'0'); const y = partsSlash[2].length===2?('20'+partsSlash[2]):partsSlash[2];
+        return `${d}/${m}/${y}`;
+      }
+    }
+
+    // Try tokens with month names (English / Spanish)
+    const months = {
+      'jan':'01','feb':'02','mar':'03','apr':'04','may':'05','jun':'06','jul':'07','aug':'08','sep':'09','oct':'10','nov':'11','dec':'12',
+      'enero':'01','febrero':'02','marzo':'03','abril':'04','mayo':'05','junio':'06','julio':'07','agosto':'08','septiembre':'09','octubre':'10','noviembre':'11','diciembre':'12'
+    };
+    const cleaned = s.replace(',', ' ').replace(/\s+/g,' ').trim();
+    const tokens = cleaned.split(' ');
+    let day=null, mon=null, year=null;
+    for (const t of tokens) {
+      const tn = t.toLowerCase();
+      if (!day && /^\d{1,2}$/.test(tn)) {
+        const n = parseInt(tn,10);
+        if (n>=1 && n<=31) day = String(n).padStart(2,'0');
+      } else if (!mon) {
+        const t3 = tn.slice(0,3);
+        if (months[t3]) mon = months[t3];
+        else if (months[tn]) mon = months[tn];
+      } else if (!year && /^\d{4}$/.test(tn)) {
+        year = tn;
+      }
+    }
+    if (day && mon && year) return `${day}/${mon}/${year}`;
+
+    // As a last attempt, try Date parsing (may be locale-dependent)
+    const d = new Date(s);
+    if (!isNaN(d.getTime())) {
+      const dd = String(d.getDate()).padStart(2,'0');
+      const mm = String(d.getMonth()+1).padStart(2,'0');
+      const yyyy = d.getFullYear();
+      return `${dd}/${mm}/${yyyy}`;
+    }
+
+    // If nothing matched, return original string
+    return s;
+  }
+
+  function normalizeDateInputsById(ids){
+    ids.forEach(id=>{
+      const el = document.getElementById(id);
+      if (!el) return;
+      const raw = String(el.value || '').trim();
+      if (!raw) return;
+      const formatted = formatToDDMMYYYY(raw);
+      if (formatted) el.value = formatted;
+    });
+  }
+
+  function fillFields(emp){
+    if (!emp || typeof emp !== 'object') return;
+
+    const explicit = {
+      dpi: ['Numero de DPI','Numero_de_DPI','Numero_de_Dpi','numero_de_dpi','dpi'],
+      nombre: ['Nombre','nombre','full_name','fullName'],
+      apellidos: ['Apellidos','apellidos','surname'],
+      apellidos_casada: ['Apellidos de casada','Apellidos_de_casada','apellidos_de_casada'],
+      estado_civil: ['Estado Civil','Estado_Civil','estado_civil'],
+      nacionalidad: ['Nacionalidad','nacionalidad'],
+      departamento: ['Departamento','departamento'],
+      lugar_nacimiento: ['Lugar de nacimiento','Lugar_de_nacimiento','lugar_de_nacimiento'],
+      iggs: ['Numero de Afiliación del IGGS','Numero de Afiliacion del IGGS','Numero IGSS','numero_igg','numero_iggs'],
+      direccion: ['Dirección del Domicilio','Direccion del Domicilio','direccion','Dirección'],
+      telefono: ['Numero de Telefono','Numero de Teléfono','Telefono','telefono','numero_de_telefono'],
+      correo: ['Correo Electronico','Correo electrónico','Correo','correo','correo_electronico'],
+      religion: ['Religión','Religion','religion'],
+      puesto: ['Puesto de trabajo','puesto','puesto_de_trabajo'],
+      tipo_contrato: ['Tipo de contrato','tipo_de_contrato'],
+      jornada: ['Jornada laboral','jornada_laboral'],
+      duracion: ['Duración del trabajo','Duracion del trabajo','duracion_del_trabajo'],
+      fecha_inicio: ['Fecha de inicio laboral','fecha_inicio_laboral','fecha_inicio'],
+      dias_laborales: ['Dias Laborales','dias_laborales'],
+
+      nivel_estudios: ['Nivel de estudios','nivel_de_estudios'],
+      profesion: ['Profesión u Oficio','Profesion u Oficio','profesion_u_oficio'],
+      colegio: ['Colegio o establecimiento','colegio_o_establecimiento','colegio'],
+      cursos: ['Cursos o títulos adicionales','Cursos o titulos adicionales','Cursos','cursos','cursos_o_titulos_adicionales'],
+
+      conyuge_nombres: ['Nombres del cónyuge','Nombres del conyugue','nombres_del_conyuge','conyuge_nombres'],
+      conyuge_apellidos: ['Apellidos del cónyuge','Apellidos del conyugue','apellidos_del_conyuge','conyuge_apellidos'],
+      conyuge_direccion: ['Dirección del cónyuge','Direccion del conyugue','direccion_del_conyuge','conyuge_direccion'],
+      conyuge_telefono: ['Numero de telefono del conyugue','Telefono del conyugue','telefono_del_conyuge','conyuge_telefono','telefono_conyuge'],
+      conyuge_correo: ['Correo electronico del conyugue','Correo del conyugue','correo_del_conyuge','conyuge_correo','correo_conyuge'],
+
+      contacto_nombre: ['Nombre del contacto de emergencia','Nombre contacto de emergencia','nombre_contacto','contacto_nombre'],
+      contacto_apellidos: ['Apellidos del contacto de emergencia','Apellidos contacto de emergencia','apellidos_contacto','contacto_apellidos'],
+      contacto_telefono: ['Teléfono de emergencia','Telefono de emergencia','Numero de telefono de emergencia','telefono_de_emergencia','contacto_telefono'],
+
+      ref_nombre_empresa: ['Nombre Empresa','Nombre de la Empresa (Ultimo Trabajo)','nombre_empresa','nombre_de_la_empresa_ultimo_trabajo'],
+      ref_direccion_empresa: ['Dirección Empresa','Direccion de la empresa','direccion_empresa'],
+      ref_inicio_empresa: ['Inicio en la empresa','Inicio laboral en la empresa','inicio_en_la_empresa'],
+      ref_fin_empresa: ['Fin en la empresa','Fin Laboral en la empresa','fin_en_la_empresa'],
+      ref_motivo_retiro: ['Motivo del retiro','motivo_del_retiro'],
+      ref_nombre_jefe: ['Nombre del jefe inmediato','Nombre del Jefe Imediato','nombre_del_jefe_inmediato'],
+      ref_numero_jefe: ['Numero del Jefe inmediato','Número del Jefe Inmediato','numero_del_jede_inmediato'],
+
+      padece_enfermedad: ['Padece alguna enfermedad','padece_alguna_enfermedad'],
+      tipo_enfermedad: ['Tipo de enfermedad','tipo_de_enfermedad'],
+      recibe_tratamiento: ['Recibe tratamiento','Recibe tratamiento medico','recibe_tratamiento'],
+      nombre_tratamiento: ['Nombre del tratamiento','nombre_del_tratamiento'],
+      alergico: ['Es alergico a algun medicamento','Es alérgico a algún medicamento','es_alergico_a_algun_medicamento'],
+      medico_tratante: ['Nombre del medico Tratante','Nombre del médico tratante','nombre_del_medico_tratante'],
+      numero_medico:   ['Numero del medico tratante','Número del médico tratante','numero_del_medico_tratante'],
+      tipo_sangre: ['Tipo de sangre','tipo_de_sangre']
+    };
+
+    for (const id in explicit){
+      const keys = explicit[id];
+      trySetMany(emp, keys, id);
+    }
+
+    // refs
+    const refNombre = getFirstNonEmpty(emp, ['Nombre Empresa','Nombre de la Empresa (Ultimo Trabajo)','nombre_empresa']);
+    const refDireccion = getFirstNonEmpty(emp, ['Dirección Empresa','Direccion de la empresa','direccion_empresa']);
+    const refInicio = getFirstNonEmpty(emp, ['Inicio en la empresa','Inicio laboral en la empresa','inicio_en_la_empresa']);
+    const refFin = getFirstNonEmpty(emp, ['Fin en la empresa','Fin Laboral en la empresa','fin_en_la_empresa']);
+    const refMotivo = getFirstNonEmpty(emp, ['Motivo del retiro','motivo_del_retiro']);
+    const refJefe = getFirstNonEmpty(emp, ['Nombre del jefe inmediato','Nombre del Jefe Imediato','nombre_del_jefe_inmediato']);
+
+    setCellText('ref_nombre_empresa', refNombre);
+    setCellText('ref_direccion_empresa', refDireccion);
+    setCellText('ref_inicio_empresa', refInicio);
+    setCellText('ref_fin_empresa', refFin);
+    setCellText('ref_motivo_retiro', refMotivo);
+    setCellText('ref_nombre_jefe', refJefe);
+
+    const rawFn = emp['Fecha de nacimiento'] || emp['fecha_nacimiento'] || '';
+    if (rawFn && rawFn.indexOf('-') !== -1 && rawFn.length >= 10){
+      const d = rawFn.slice(0,10).split('-');
+      if (d.length === 3) setIfExists('fecha_nacimiento', `${d[2]}/${d[1]}/${d[0]}`);
+      else setIfExists('fecha_nacimiento', rawFn);
+    } else setIfExists('fecha_nacimiento', rawFn || '');
+
+    // Normalize date-formatted inputs to dd/mm/yyyy
+    normalizeDateInputsById(['fecha_nacimiento','fecha_inicio','ref_inicio_empresa','ref_fin_empresa']);
+
+    // Also normalize any input ids that include the word 'fecha' (generic)
+    Array.from(document.querySelectorAll('input[id]')).forEach(inp=>{
+      const id = inp.id || '';
+      if (id.toLowerCase().includes('fecha') && !['fecha_nacimiento','fecha_inicio'].includes(id)) {
+        const v = String(inp.value || '').trim();
+        if (v) inp.value = formatToDDMMYYYY(v);
+      }
+    });
+  }
+
+  function getFirstNonEmpty(obj, keys){
+    for (const k of keys){
+      if (!k) continue;
+      if (obj.hasOwnProperty(k) && obj[k] !== undefined && obj[k] !== null && String(obj[k]).trim() !== '') return obj[k];
+      const nk = normalizeKeyToId(k);
+      if (obj.hasOwnProperty(nk) && obj[nk] !== undefined && String(obj[nk]).trim() !== '') return obj[nk];
+    }
+    return '';
+  }
+
+  function clearAll(){
+    const inputs = document.querySelectorAll('#fichaForm input');
+    inputs.forEach(i => i.value = '');
+    ['ref_nombre_empresa','ref_direccion_empresa','ref_inicio_empresa','ref_fin_empresa','ref_motivo_retiro','ref_nombre_jefe'].forEach(id => {
+      const el = document.getElementById(id);
+      if (el) el.innerText = '';
+    });
+    if (fotoEl) fotoEl.src = placeholder || fotoEl.getAttribute('data-original') || fotoEl.src;
+    if (selectEl) {
+      // keep the select value itself; caller decides whether to reset it
+    }
+  }
+
+  async function loadEmpleado(dpi){
+    if (!dpi) { clearAll(); return; }
+    try {
+      const r = await fetch(apiEmpleadoBase + encodeURIComponent(dpi), { cache:'no-cache' });
+      if (!r.ok) throw new Error('empleado not found');
+      const emp = await r.json();
+      fillFields(emp);
+    } catch (err) {
+      console.error('loadEmpleado', err);
+      clearAll();
+    }
+
+    try {
+      const rp = await fetch(apiFotoBase + encodeURIComponent(dpi) + '?size=medium&format=webp', { cache: 'no-store' });
+      if (rp.ok) {
+        const jp = await rp.json();
+        if (jp && jp.url && fotoEl) fotoEl.src = jp.url;
+        else if (fotoEl) fotoEl.src = placeholder || fotoEl.getAttribute('data-original') || fotoEl.src;
+      } else if (fotoEl) {
+        fotoEl.src = placeholder || fotoEl.getAttribute('data-original') || fotoEl.src;
+      }
+    } catch (err) {
+      if (fotoEl) fotoEl.src = placeholder || fotoEl.getAttribute('data-original') || fotoEl.src;
+    }
+
+    // Ensure any date-like raw values loaded into DOM are normalized (extra safety)
+    normalizeDateInputsById(['fecha_nacimiento','fecha_inicio','ref_inicio_empresa','ref_fin_empresa']);
+  }
+
+  if (selectEl) {
+    selectEl.addEventListener('change', function(){
+      // Immediately clear all fields when user changes selection so they don't see stale data
+      clearAll();
+
+      const dpi = (this.value || '').trim();
+      if (!dpi) { return; }
+      loadEmpleado(dpi);
+    });
+  }
+
+  if (btnClear) {
+    btnClear.addEventListener('click', function(){
+      clearAll();
+      if (selectEl) selectEl.value = '';
+      if (buscador) buscador.limpiar();
+    });
+  }
+
+  if (fotoEl && !fotoEl.getAttribute('data-original')) {
+    fotoEl.setAttribute('data-original', fotoEl.src || placeholder);
+  }
+  // el select se llena con la búsqueda del servidor (js/buscar_empleado.js)
+  const buscador = window.BuscarEmpleado
+    ? window.BuscarEmpleado.conectar(selectEl, { apiBuscar: apiBuscar, apiLista: apiList })
+    : null;
+})();
@@ -212,6 +212,8 @@ function agregarFila(){
     if (be) be.disabled = true;
     if (bg) bg.disabled = true;
     if (bc) bc.disabled = true;
+    // tablas por ventana (tabla_ventana.js): recargan sus filas desde el servidor
+    row.dispatchEvent(new CustomEvent('tabla:cambio', { bubbles: true, detail: { fila: row, nueva: payload.nuevo } }));
     flash("Guardado correctamente", "success");
   } catch (err) {
     console.error("guardarFila error", err);
@@ -0,0 +1,130 @@
+// static/js/nomina.js
+// Constantes fiscales y utilidades compartidas por planilla, recibo y ficha.
+// Las fórmulas son las mismas de nomina.py (el servidor recalcula con ellas);
+// si cambia una, hay que cambiar la otra.
+(function () {
+  "use strict";
+
+  const IGSS_RATE = 0.0483;
+  const GASTOS_PERSONALES_ANUAL = 48000;
+  const ISR_ANNUAL_RATE = 0.05;
+  const ISR_MIN_SALARIO = 4000.00;
+
+  // clave de localStorage donde planilla guarda sus filas (recibo la lee)
+  const STORAGE_KEY = 'empaquetex_planilla_noviembre_v1';
+
+  function round2(n){ return Math.round((n + Number.EPSILON) * 100) / 100; }
+  function formatNum(n){ return Number(n).toLocaleString(undefined, {minimumFractionDigits:2, maximumFractionDigits:2}); }
+  function withQ(n){ return 'Q ' + formatNum(n); }
+
+  // "Q 1,234.50" / "1234.5" / 1234.5 -> 1234.5 (0 si no es número)
+  function toNumberSafe(v){
+    if(v === null || v === undefined) return 0;
+    if(typeof v === 'number') return v;
+    const s = String(v).replace(/\s+/g,'').replace(/^Q/i,'').replace(/,/g,'').trim();
+    const n = Number(s);
+    if(isFinite(n)) return n;
+    const f = parseFloat(s);
+    return isFinite(f) ? f : 0;
+  }
+
+  function computeHorasMontoMensual(sueldo, dias, horas) {
+    if (!dias || dias <= 0) return 0;
+    const valorHora = sueldo / dias / 8;
+    const monto = valorHora * 1.5 * horas;
+    return round2(monto);
+  }
+
+  function computeISRMonthlyFromRow(sueldo, bono, comisiones, hextrasMensual) {
+    if ((sueldo * 2) < ISR_MIN_SALARIO) return 0;
+    const sueldoBaseAnual = (sueldo * 2) * 12;
+    const bonoIncentivoAnual = (bono * 2) * 12;
+    const hextrasAnual = hextrasMensual * 12;
+    const comisionesAnual = comisiones * 12;
+    const sumaGananciasAnual = round2(sueldoBaseAnual + bonoIncentivoAnual + hextrasAnual + comisionesAnual);
+    const igssLaboralAnual = round2(sumaGananciasAnual * IGSS_RATE);
+    const baseCalculo = round2(sumaGananciasAnual - (GASTOS_PERSONALES_ANUAL + igssLaboralAnual));
+    if (baseCalculo <= 0) return 0;
+    const isrAnual = round2(baseCalculo * ISR_ANNUAL_RATE);
+    const isrMensual = round2(isrAnual / 12);
+    return isrMensual;
+  }
+
+  // ---------- Montos en letras (recibo) ----------
+  function numeroALetrasEnEspañol(num){
+    if (isNaN(num)) return '';
+    const negativo = num < 0;
+    const absNum = Math.abs(num);
+    const entero = Math.trunc(absNum);
+    const cent = Math.round((absNum - entero) * 100);
+
+    const enteroTexto = entero === 0 ? 'cero' : enteroALetras(entero);
+    let resultado = enteroTexto + (entero === 1 ? ' Quetzal' : ' Quetzales');
+
+    if (cent > 0){
+      const centPalabras = enteroALetras(cent);
+      resultado += ' con ' + centPalabras + ' centavo' + (cent === 1 ? '' : 's');
+    }
+
+    resultado = resultado.charAt(0).toUpperCase() + resultado.slice(1);
+    return (negativo ? 'menos ' : '') + resultado;
+  }
+
+  function enteroALetras(n){
+    if (n === 0) return 'cero';
+    const unidades = ['','uno','dos','tres','cuatro','cinco','seis','siete','ocho','nueve'];
+    const especiales = ['diez','once','doce','trece','catorce','quince','dieciseis','diecisiete','dieciocho','diecinueve'];
+    const decenas = ['','', 'veinte','treinta','cuarenta','cincuenta','sesenta','setenta','ochenta','noventa'];
+    const centenas = ['','ciento','doscientos','trescientos','cuatrocientos','quinientos','seiscientos','setecientos','ochocientos','novecientos'];
+
+    function tresCifrasToText(m){
+      let s = '';
+      const c = Math.floor(m / 100);
+      const r = m % 100;
+      if (m === 100) return 'cien';
+      if (c > 0) s += centenas[c] + (r ? ' ' : '');
+      if (r >= 10 && r <= 19){
+        s += especiales[r - 10];
+      } else if (r >= 20){
+        const d = Math.floor(r / 10);
+        const u = r % 10;
+        if (d === 2 && u > 0){
+          s += 'veinti' + unidades[u];
+        } else {
+          s += decenas[d];
+          if (u > 0) s += ' y ' + unidades[u];
+        }
+      } else if (r > 0){
+        s += unidades[r];
+      }
+      return s;
+    }
+
+    let parts = [];
+    const millones = Math.floor(n / 1000000);
+    const restoMillones = n % 1000000;
+    const miles = Math.floor(restoMillones / 1000);
+    const centenasResto = restoMillones % 1000;
+
+    if (millones > 0){
+      if (millones === 1) parts.push('un millón');
+      else parts.push(tresCifrasToText(millones) + ' millones');
+    }
+    if (miles > 0){
+      if (miles === 1) parts.push('mil');
+      else parts.push(tresCifrasToText(miles) + ' mil');
+    }
+    if (centenasResto > 0){
+      parts.push(tresCifrasToText(centenasResto));
+    }
+
+    return parts.join(' ').replace(/\s+/g,' ').trim();
+  }
+
+  window.Nomina = Object.freeze({
+    IGSS_RATE, GASTOS_PERSONALES_ANUAL, ISR_ANNUAL_RATE, ISR_MIN_SALARIO, STORAGE_KEY,
+    round2, formatNum, withQ, toNumberSafe,
+    computeHorasMontoMensual, computeISRMonthlyFromRow,
+    numeroALetrasEnEspañol, enteroALetras
+  });
+})();
@@ -0,0 +1,1208 @@
+// static/js/planilla.js
+// Página de planilla. Requiere js/nomina.js y js/sesion.js (cargarVersionado:
+// empleados y planilla se piden de nuevo solo si cambió su versión).
+
+/* ------------------ Fiscal constants and helpers (static/js/nomina.js) ------------------ */
+const {
+  IGSS_RATE, STORAGE_KEY, round2, withQ,
+  computeHorasMontoMensual, computeISRMonthlyFromRow
+} = window.Nomina;
+const SERVER_SYNC_KEY = STORAGE_KEY + '_server_meta';
+
+  // Helpers para bloquear/desbloquear inputs sueldo
+function lockSueldoInput(inp) {
+  if (!inp) return;
+  inp.classList.add('sueldo-locked');
+  inp.setAttribute('readonly', 'readonly');
+  inp.setAttribute('tabindex', '-1');
+  inp.setAttribute('aria-disabled', 'true');
+  const tr = inp.closest('tr');
+  if (tr) tr.dataset.sueldoLocked = '1';
+}
+function unlockSueldoInput(inp) {
+  if (!inp) return;
+  inp.classList.remove('sueldo-locked');
+  inp.removeAttribute('readonly');
+  inp.removeAttribute('tabindex');
+  inp.removeAttribute('aria-disabled');
+  const tr = inp.closest('tr');
+  if (tr) tr.dataset.sueldoLocked = '0';
+}
+
+/* ------------------ Row calculations (unchanged) ------------------ */
+function recalcRow(tr) {
+  if (!tr) return;
+  const sueldo = parseFloat(tr.querySelector('input.sueldo')?.value) || 0;
+  const bono = parseFloat(tr.querySelector('input.bono')?.value) || 0;
+  const comisiones = parseFloat(tr.querySelector('input.comisiones')?.value) || 0;
+  const dias = parseInt(tr.querySelector('input.dias')?.value) || 0;
+  const horas = parseInt(tr.querySelector('input.horas')?.value) || 0;
+  const otras = parseFloat(tr.querySelector('input.otras')?.value) || 0;
+
+  const hextrasMonto = computeHorasMontoMensual(sueldo, dias, horas);
+  const totalDevengado = round2(sueldo + bono + comisiones + hextrasMonto);
+  const igss = round2(sueldo * IGSS_RATE);
+
+  const isrMensual = computeISRMonthlyFromRow(sueldo, bono, comisiones, hextrasMonto);
+
+  const totalDeducciones = round2(igss + isrMensual + otras);
+  const liquido = round2(totalDevengado - totalDeducciones);
+
+  const hextrasCell = tr.querySelector('.hextras'); if (hextrasCell) hextrasCell.textContent = withQ(hextrasMonto);
+  const devCell = tr.querySelector('.total-devengado'); if (devCell) devCell.textContent = withQ(totalDevengado);
+  const igssCell = tr.querySelector('.igss'); if (igssCell) igssCell.textContent = withQ(igss);
+
+  const isrCell = tr.querySelector('.isr-cell');
+  if (isrCell) {
+    if (isrMensual > 0) isrCell.textContent = withQ(isrMensual);
+    else isrCell.textContent = '';
+  }
+
+  tr.dataset._isrValue = isrMensual;
+  tr.dataset._hextras = hextrasMonto;
+
+  const totDedCell = tr.querySelector('.total-deducciones'); if (totDedCell) totDedCell.textContent = withQ(totalDeducciones);
+  const liquiCell = tr.querySelector('.liquido'); if (liquiCell) liquiCell.textContent = withQ(liquido);
+}
+
+function recalcTotals() {
+  const rows = document.querySelectorAll('#planillaTable tbody tr');
+  let totals = {sueldo:0, bono:0, comisiones:0, horas:0, hextras:0, devengado:0, igss:0, isr:0, otras:0, deducciones:0, liquido:0};
+  rows.forEach(tr => {
+    const sueldo = parseFloat(tr.querySelector('input.sueldo')?.value) || 0;
+    const bono = parseFloat(tr.querySelector('input.bono')?.value) || 0;
+    const comisiones = parseFloat(tr.querySelector('input.comisiones')?.value) || 0;
+    const horas = parseInt(tr.querySelector('input.horas')?.value) || 0;
+    const otras = parseFloat(tr.querySelector('input.otras')?.value) || 0;
+
+    const dias = parseInt(tr.querySelector('input.dias')?.value) || 0;
+    const hextrasMonto = parseFloat(tr.dataset._hextras) || computeHorasMontoMensual(sueldo, dias, horas);
+    const totalDevengado = round2(sueldo + bono + comisiones + hextrasMonto);
+    const igss = round2(sueldo * IGSS_RATE);
+    const isrMensual = parseFloat(tr.dataset._isrValue) || 0;
+    const totalDeducciones = round2(igss + isrMensual + otras);
+    const liquido = round2(totalDevengado - totalDeducciones);
+
+    totals.sueldo += sueldo;
+    totals.bono += bono;
+    totals.comisiones += comisiones;
+    totals.horas += horas;
+    totals.hextras += hextrasMonto;
+    totals.devengado += totalDevengado;
+    totals.igss += igss;
+    totals.isr += isrMensual;
+    totals.otras += otras;
+    totals.deducciones += totalDeducciones;
+    totals.liquido += liquido;
+  });
+
+  if (document.getElementById('total-sueldo')) document.getElementById('total-sueldo').textContent = withQ(totals.sueldo);
+  if (document.getElementById('total-bono')) document.getElementById('total-bono').textContent = withQ(totals.bono);
+  if (document.getElementById('total-dias')) document.getElementById('total-dias').textContent = '';
+  if (document.getElementById('total-comisiones')) document.getElementById('total-comisiones').textContent = withQ(totals.comisiones);
+  if (document.getElementById('total-horas')) document.getElementById('total-horas').textContent = totals.horas.toString();
+  if (document.getElementById('total-hextras')) document.getElementById('total-hextras').textContent = withQ(totals.hextras);
+  if (document.getElementById('total-devengado')) document.getElementById('total-devengado').textContent = withQ(totals.devengado);
+  if (document.getElementById('total-igss')) document.getElementById('total-igss').textContent = withQ(totals.igss);
+  if (document.getElementById('total-isr')) document.getElementById('total-isr').textContent = withQ(totals.isr);
+  if (document.getElementById('total-otras')) document.getElementById('total-otras').textContent = withQ(totals.otras);
+  if (document.getElementById('total-deducciones')) document.getElementById('total-deducciones').textContent = withQ(totals.deducciones);
+  if (document.getElementById('total-liquido')) document.getElementById('total-liquido').textContent = withQ(totals.liquido);
+}
+
+/* ------------------ Serialization (unchanged) ------------------ */
+function serializeTable() {
+  const rows = [];
+  document.querySelectorAll('#planillaTable tbody tr').forEach(tr => {
+    const nombre = (tr.querySelector('input.nombre')?.value ?? tr.cells[1].textContent ?? '').trim();
+    const sueldo = parseFloat(tr.querySelector('input.sueldo')?.value ?? 0) || 0;
+    const bono = parseFloat(tr.querySelector('input.bono')?.value ?? 0) || 0;
+    const dias = parseInt(tr.querySelector('input.dias')?.value ?? 0) || 0;
+    const comisiones = parseFloat(tr.querySelector('input.comisiones')?.value ?? 0) || 0;
+    const horas = parseInt(tr.querySelector('input.horas')?.value ?? 0) || 0;
+    const otras = parseFloat(tr.querySelector('input.otras')?.value ?? 0) || 0;
+    const medioPago = tr.querySelector('input.medio-pago')?.value ?? '';
+    const observ = tr.querySelector('input.observaciones')?.value ?? '';
+    const hextras = parseFloat(tr.dataset._hextras) || 0;
+    const isr = parseFloat(tr.dataset._isrValue) || 0;
+    const dpi = tr.dataset.dpi || '';
+    rows.push({ nombre, sueldo, bono, dias, comisiones, horas, otras, medioPago, observ, hextras, isr, dpi });
+  });
+  const meta = { saved_at: new Date().toISOString(), planillaName: document.getElementById('planillaName')?.value ?? '', emisionDate: document.getElementById('emisionDate')?.value ?? '' };
+  return { rows, meta };
+}
+
+function restoreTable(data) {
+  if (!data || !Array.isArray(data.rows)) return;
+  const tbody = document.querySelector('#planillaTable tbody');
+  if (!tbody) return;
+  tbody.innerHTML = '';
+  data.rows.forEach((r, i) => {
+    const idx = i + 1;
+    const tr = document.createElement('tr');
+    tr.dataset.row = idx;
+    if (r.dpi) tr.dataset.dpi = r.dpi;
+    tr.innerHTML = `
+      <td>${idx}</td>
+      <td class="align-middle"><input class="form-control form-control-sm nombre" type="text" value="${escapeHtml(r.nombre || '')}"></td>
+      <td><div class="money-inline"><span class="money-prefix">Q</span><input class="form-control num-cell sueldo" type="number" step="0.01" value="${Number(r.sueldo||0).toFixed(2)}"></div></td>
+      <td><div class="money-inline"><span class="money-prefix">Q</span><input class="form-control bono" type="number" step="0.01" value="${Number(r.bono||125).toFixed(2)}" readonly></div></td>
+      <td><input class="form-control form-control-sm num-cell dias" type="number" step="1" min="0" value="${Number(r.dias||15)}"></td>
+      <td><div class="money-inline"><span class="money-prefix">Q</span><input class="form-control num-cell comisiones" type="number" step="0.01" value="${Number(r.comisiones||0).toFixed(2)}"></div></td>
+      <td><input class="form-control form-control-sm num-cell horas" type="number" step="1" min="0" value="${Number(r.horas||0)}"></td>
+      <td class="text-end hextras">Q ${Number(r.hextras||0).toFixed(2)}</td>
+      <td class="text-end total-devengado">Q 0.00</td>
+      <td class="text-end igss">Q 0.00</td>
+      <td class="text-end isr-cell">${r.isr && r.isr>0 ? 'Q ' + Number(r.isr).toFixed(2) : ''}</td>
+      <td><div class="money-inline"><span class="money-prefix">Q</span><input class="form-control num-cell otras" type="number" step="0.01" value="${Number(r.otras||0).toFixed(2)}"></div></td>
+      <td class="text-end total-deducciones">Q 0.00</td>
+      <td class="text-end liquido">Q 0.00</td>
+      <td><input class="form-control medio-pago" type="text" value="${escapeHtml(r.medioPago||'')}"></td>
+      <td><input class="form-control observaciones" type="text" value="${escapeHtml(r.observ||'')}"></td>
+    `;
+  
+    // If sueldo > 0, lock it (require admin to unlock)
+const sueldoInput = tr.querySelector('input.sueldo');
+const sueldoNum = Number(r.sueldo || 0);
+if (sueldoInput) {
+  if (sueldoNum > 0) {
+    // bloquear completamente (sin selección ni foco)
+    lockSueldoInput(sueldoInput);
+    sueldoInput.setAttribute('data-prev', sueldoNum.toFixed(2));
+  } else {
+    // desbloqueado por defecto
+    unlockSueldoInput(sueldoInput);
+    sueldoInput.setAttribute('data-prev', (0).toFixed(2));
+  }
+}
+
+    tr.dataset._hextras = Number(r.hextras||0);
+    tr.dataset._isrValue = Number(r.isr||0);
+    tbody.appendChild(tr);
+  });
+  document.querySelectorAll('#planillaTable tbody tr').forEach(tr => recalcRow(tr));
+  recalcTotals();
+}
+// Normalizar bloqueo/desbloqueo según valores actuales y reaplicar guardInput si existe
+document.querySelectorAll('input.sueldo').forEach(inp => {
+  const n = parseFloat(inp.value) || 0;
+  // Asegurarse que no quede modo admin por defecto
+  inp.classList.remove('sueldo-admin-edit');
+
+  if (n > 0) {
+    lockSueldoInput(inp);
+    inp.setAttribute('data-prev', Number(n).toFixed(2));
+  } else {
+    unlockSueldoInput(inp);
+    inp.setAttribute('data-prev', Number(0).toFixed(2));
+  }
+
+  // reaplicar listeners de guardInput si existe esa función
+  if (typeof guardInput === 'function') guardInput(inp);
+});
+
+
+/* ------------------ Utilities and UI handlers (unchanged behavior) ------------------ */
+function escapeHtml(str) {
+  return String(str || '').replace(/&/g,'&amp;').replace(/"/g,'&quot;').replace(/</g,'&lt;').replace(/>/g,'&gt;');
+}
+
+/* ------------------ SUELDO locking rules and admin-edit control ------------------ */
+/*
+  Behavior implemented:
+  - When a sueldo input receives a non-zero (or non-empty) value and loses focus, it becomes readonly and is flagged data.sueldoLocked=1.
+  - Only users with role 'admin' can enable "Editar sueldos" button. When admin clicks it, sueldo fields flagged as locked become editable for the admin session.
+  - After admin edits and blurs, the sueldo cells will re-lock (same logic).
+  - Non-admin users never see the Edit button and cannot change locked sueldo cells.
+*/
+
+async function whoamiRole() {
+  return rolActual();
+}
+
+async function initSueldoEditControl() {
+  const btn = document.getElementById('btnEditarSueldo');
+  if (!btn) return;
+
+  // Estado inicial: no en modo edición
+  btn.dataset.editing = '0';
+  btn.textContent = 'Editar sueldos';
+  btn.classList.remove('btn-danger');
+  btn.classList.add('btn-warning');
+  btn.style.display = ''; // visible para todos
+
+  // marcar flag admin informativo (no activa edición)
+  btn.dataset.admin = (await rolActual()) === 'admin' ? '1' : '0';
+
+  // Click handler: visible para todos, pero solo admin puede activar edición
+  btn.addEventListener('click', async () => {
+    const roleNow = await rolActual();
+
+    if (roleNow !== 'admin') {
+      alert('Permisos insuficientes. Solo administradores pueden editar sueldos.');
+      return;
+    }
+
+    const editing = btn.dataset.editing === '1';
+    if (!editing) {
+      document.querySelectorAll('#planillaTable tbody tr').forEach(tr => {
+        if (tr.dataset.sueldoLocked === '1') {
+          const inp = tr.querySelector('input.sueldo');
+          if (inp) {
+            inp.classList.add('sueldo-admin-edit');
+            unlockSueldoInput(inp);
+          }
+        }
+      });
+      btn.textContent = 'Finalizar edición sueldos';
+      btn.dataset.editing = '1';
+      btn.classList.remove('btn-warning');
+      btn.classList.add('btn-danger');
+    } else {
+      document.querySelectorAll('#planillaTable tbody tr').forEach(tr => {
+        const inp = tr.querySelector('input.sueldo');
+        if (inp && inp.classList.contains('sueldo-admin-edit')) {
+          inp.classList.remove('sueldo-admin-edit');
+          const n = parseFloat(inp.value) || 0;
+          if (n > 0) lockSueldoInput(inp);
+          else unlockSueldoInput(inp);
+          inp.setAttribute('data-prev', Number(n).toFixed(2));
+        }
+      });
+      btn.textContent = 'Editar sueldos';
+      btn.dataset.editing = '0';
+      btn.classList.remove('btn-danger');
+      btn.classList.add('btn-warning');
+      recalcTotals();
+      try { saveToLocalAndServer(); } catch (e) { console.warn('save error', e); }
+    }
+  });
+}
+
+
+
+/* ------------------ IMPORTANT: autosave enabled so edits sync to server for all devices
+   Input handler recalculates rows and totals and calls saveToLocalAndServer() so changes persist to server.
+*/
+document.addEventListener('input', (e) => {
+  if (!e.target.classList) return;
+
+  // Prevent non-admin edits to sueldo when locked
+  if (e.target.classList.contains('sueldo')) {
+    const tr = e.target.closest('tr');
+    const locked = tr && tr.dataset.sueldoLocked === '1';
+    // allow if user is admin editing (we mark with sueldo-admin-edit), otherwise revert
+    if (locked && !e.target.classList.contains('sueldo-admin-edit')) {
+      // revert the change (reload previously stored value)
+      const prev = e.target.getAttribute('data-prev');
+      e.target.value = Number(prev !== null ? prev : e.target.value || 0).toFixed(2);
+      return;
+    }
+  }
+
+  if (e.target.classList.contains('num-cell') || e.target.classList.contains('nombre') || e.target.classList.contains('medio-pago') || e.target.classList.contains('observaciones')) {
+    const tr = e.target.closest('tr');
+    if (tr) recalcRow(tr);
+    recalcTotals();
+    // Autosave on every edit so other devices receive it via server
+    try { saveToLocalAndServer(); } catch (err) { console.warn('save error', err); }
+  }
+});
+
+// When sueldo input loses focus, apply half-sueldo behavior once and if value > 0, lock the cell (non-admin cannot re-edit)
+document.addEventListener('blur', (e) => {
+  if (!e.target.classList) return;
+  if (e.target.classList.contains('sueldo')) {
+    // aplicar mitad si corresponde
+    try { applyHalfToSueldoInput(e.target); } catch (err) { /* ignore if not present */ }
+
+    const tr = e.target.closest('tr');
+    const n = parseFloat(e.target.value) || 0;
+    e.target.setAttribute('data-prev', Number(n).toFixed(2));
+
+    if (n > 0) {
+      // bloquear completamente (sin selección ni foco)
+      lockSueldoInput(e.target);
+      e.target.classList.remove('sueldo-admin-edit');
+    } else {
+      // desbloquear para edición
+      unlockSueldoInput(e.target);
+    }
+
+    if (tr) recalcRow(tr);
+    recalcTotals();
+    try { saveToLocalAndServer(); } catch (err) { console.warn('save error', err); }
+  }
+}, true);
+
+
+function initBonosYDias() {
+  document.querySelectorAll('#planillaTable tbody tr').forEach(tr => {
+    const bonoInp = tr.querySelector('input.bono');
+    if (bonoInp) {
+      bonoInp.value = 125.00;
+      bonoInp.setAttribute('readonly', 'readonly');
+      bonoInp.classList.remove('num-cell');
+    }
+    const diasInp = tr.querySelector('input.dias');
+    if (diasInp) {
+      const val = parseInt(diasInp.value);
+      if (!isFinite(val) || val <= 0) diasInp.value = 15;
+    }
+    recalcRow(tr);
+  });
+  recalcTotals();
+}
+
+function createRowHtml(index) {
+  return `
+    <td>${index}</td>
+    <td class="align-middle"><input class="form-control form-control-sm nombre" type="text" value=""></td>
+    <td>
+      <div class="money-inline">
+        <span class="money-prefix">Q</span>
+        <input class="form-control num-cell sueldo" type="number" step="0.01" value="0.00">
+      </div>
+    </td>
+    <td>
+      <div class="money-inline">
+        <span class="money-prefix">Q</span>
+        <input class="form-control bono" type="number" step="0.01" value="125.00" readonly>
+      </div>
+    </td>
+    <td><input class="form-control form-control-sm num-cell dias" type="number" step="1" min="0" value="15"></td>
+    <td>
+      <div class="money-inline">
+        <span class="money-prefix">Q</span>
+        <input class="form-control num-cell comisiones" type="number" step="0.01" value="0.00">
+      </div>
+    </td>
+    <td><input class="form-control form-control-sm num-cell horas" type="number" step="1" min="0" value="0"></td>
+    <td class="text-end hextras">Q 0.00</td>
+    <td class="text-end total-devengado">Q 0.00</td>
+    <td class="text-end igss">Q 0.00</td>
+    <td class="text-end isr-cell"></td>
+    <td>
+      <div class="money-inline">
+        <span class="money-prefix">Q</span>
+        <input class="form-control num-cell otras" type="number" step="0.01" value="0.00">
+      </div>
+    </td>
+    <td class="text-end total-deducciones">Q 0.00</td>
+    <td class="text-end liquido">Q 0.00</td>
+    <td><input class="form-control medio-pago" type="text" value=""></td>
+    <td><input class="form-control observaciones" type="text" value=""></td>
+  `;
+}
+
+document.addEventListener('blur', (e) => {
+  if (!e.target.classList) return;
+  if (e.target.classList.contains('nombre')) {
+    const val = (e.target.value || '').trim();
+    if (val !== '') {
+      e.target.setAttribute('readonly', 'readonly');
+    }
+  }
+}, true);
+
+function enforceFixedFieldsOnAllRows() {
+  document.querySelectorAll('#planillaTable tbody tr').forEach(tr => {
+    const bonoInp = tr.querySelector('input.bono');
+    if (bonoInp) {
+      bonoInp.value = 125.00;
+      bonoInp.setAttribute('readonly', 'readonly');
+    }
+    const diasInp = tr.querySelector('input.dias');
+    if (diasInp) diasInp.value = 15;
+  });
+}
+
+/* Row add/delete handlers with accidental-deletion protection
+   Now they autosave (so changes propagate to server), but still ask confirmations for imported rows.
+*/
+document.getElementById('addRow').addEventListener('click', () => {
+  const tbody = document.querySelector('#planillaTable tbody');
+  const newIndex = tbody.querySelectorAll('tr').length + 1;
+  const tr = document.createElement('tr');
+  tr.dataset.row = newIndex;
+  tr.dataset.new = "true"; // mark as user-created
+  tr.innerHTML = createRowHtml(newIndex);
+  tbody.appendChild(tr);
+  // Ensure new row sueldo is unlocked explicitly
+const sueldoInp = tr.querySelector('input.sueldo');
+if (sueldoInp) {
+  // nueva fila: desbloqueada por defecto
+  unlockSueldoInput(sueldoInp);
+  sueldoInp.setAttribute('data-prev', Number(0).toFixed(2));
+}
+
+
+
+  const nombreInp = tr.querySelector('input.nombre');
+  if (nombreInp) nombreInp.removeAttribute('readonly');
+
+  const bonoInp = tr.querySelector('input.bono');
+  if (bonoInp) {
+    bonoInp.value = 125.00;
+    bonoInp.setAttribute('readonly', 'readonly');
+  }
+  const diasInp = tr.querySelector('input.dias');
+  if (diasInp) diasInp.value = 15;
+
+  // New rows: sueldo default 0 and unlocked
+  tr.dataset.sueldoLocked = '0';
+
+  recalcRow(tr);
+  recalcTotals();
+  // autosave for everyone
+  saveToLocalAndServer();
+});
+async function cargarEmpleadosDesdeServidor() {
+  try {
+    const empleados = (await empleadosVersionados()).data || [];
+    if (!empleados.length) return;
+
+    const tbody = document.querySelector('#planillaTable tbody');
+    if (!tbody) return;
+
+    tbody.innerHTML = '';
+
+    empleados.forEach((emp, i) => {
+      const idx = i + 1;
+      const tr = document.createElement('tr');
+      tr.dataset.row = idx;
+      tr.dataset.dpi = emp.dpi || '';
+
+      tr.innerHTML = `
+        <td>${idx}</td>
+        <td class="align-middle"><input class="form-control form-control-sm nombre" type="text" value="${emp.full_name || ''}" readonly></td>
+        <td><div class="money-inline"><span class="money-prefix">Q</span><input class="form-control num-cell sueldo" type="number" step="0.01" value="0.00"></div></td>
+        <td><div class="money-inline"><span class="money-prefix">Q</span><input class="form-control bono" type="number" step="0.01" value="125.00" readonly></div></td>
+        <td><input class="form-control form-control-sm num-cell dias" type="number" step="1" min="0" value="15"></td>
+        <td><div class="money-inline"><span class="money-prefix">Q</span><input class="form-control num-cell comisiones" type="number" step="0.01" value="0.00"></div></td>
+        <td><input class="form-control form-control-sm num-cell horas" type="number" step="1" min="0" value="0"></td>
+        <td class="text-end hextras">Q 0.00</td>
+        <td class="text-end total-devengado">Q 0.00</td>
+        <td class="text-end igss">Q 0.00</td>
+        <td class="text-end isr-cell"></td>
+        <td><div class="money-inline"><span class="money-prefix">Q</span><input class="form-control num-cell otras" type="number" step="0.01" value="0.00"></div></td>
+        <td class="text-end total-deducciones">Q 0.00</td>
+        <td class="text-end liquido">Q 0.00</td>
+        <td><input class="form-control medio-pago" type="text" value=""></td>
+        <td><input class="form-control observaciones" type="text" value=""></td>
+      `;
+
+      tbody.appendChild(tr);
+    });
+
+    document.querySelectorAll('#planillaTable tbody tr').forEach(tr => recalcRow(tr));
+    recalcTotals();
+
+  } catch (err) {
+    console.warn('Error al cargar empleados desde el servidor:', err);
+  }
+}
+document.addEventListener('DOMContentLoaded', async () => {
+  try {
+    const data = (await planillaVersionada()).data;
+
+    // Si la planilla guardada está vacía, cargar empleados desde BD
+    if (!data || !data.rows || data.rows.length === 0) {
+      console.warn("Planilla vacía, cargando empleados desde BD...");
+      cargarEmpleadosDesdeServidor();
+      return;
+    }
+
+    // Si tiene datos, restaurar
+    restoreTable(data);
+
+  } catch (e) {
+    console.warn("Error cargando planilla, cargando empleados desde BD...", e);
+    cargarEmpleadosDesdeServidor();
+  }
+});
+
+
+
+
+async function canCurrentUserDelete() {
+  return (await rolActual()) === 'admin';
+}
+
+document.getElementById('deleteRow').addEventListener('click', async () => {
+  const tbody = document.querySelector('#planillaTable tbody');
+  const rows = Array.from(tbody.querySelectorAll('tr'));
+  if (rows.length === 0) return;
+
+  const last = rows[rows.length - 1];
+
+  // If the row was imported from server (has data-dpi) or name is readonly, require admin + confirmation
+  const isServerRow = !!last.dataset.dpi;
+  const nameInput = last.querySelector('input.nombre');
+  const nameReadonly = nameInput && nameInput.hasAttribute('readonly');
+
+  if (isServerRow || nameReadonly) {
+    const ok = await canCurrentUserDelete();
+    if (!ok) {
+      alert('Permisos insuficientes para eliminar filas importadas. Solo administradores pueden eliminarlas.');
+      return;
+    }
+    const dpi = last.dataset.dpi || '';
+    const confirmMsg = dpi ? `Confirma eliminar la fila importada con DPI ${dpi}?` : 'Confirma eliminar la última fila importada?';
+    if (!confirm(confirmMsg)) return;
+  } else {
+    // For user-created rows ask light confirmation
+    if (!confirm('¿Eliminar la última fila añadida?')) return;
+  }
+
+  tbody.removeChild(last);
+  recalcTotals();
+  // autosave after delete
+  saveToLocalAndServer();
+});
+
+/* Export to Excel (unchanged) */
+document.getElementById('exportExcel').addEventListener('click', () => {
+  const dateInput = document.getElementById('emisionDate').value;
+  const planillaName = document.getElementById('planillaName').value.trim() || 'Planilla';
+  const exportHint = document.getElementById('exportHint');
+  if (!dateInput) {
+    if (exportHint) exportHint.style.display = 'inline';
+    return;
+  }
+  if (exportHint) exportHint.style.display = 'none';
+
+  const table = document.getElementById('planillaTable');
+  const clone = table.cloneNode(true);
+  clone.querySelectorAll('input').forEach(inp => {
+    const parent = inp.parentElement || inp;
+    parent.replaceChild(document.createTextNode(inp.value), inp);
+  });
+
+  clone.querySelectorAll('td, th').forEach(cell => {
+    let txt = (cell.textContent || '').replace(/\u00A0/g, ' ').trim();
+    if (txt === '') return;
+    const removed = txt.replace(/^Q\s*/i, '').replace(/,/g, '');
+    const n = Number(removed);
+    if (removed !== '' && isFinite(n)) cell.textContent = n;
+    else cell.textContent = txt;
+  });
+
+  const ws = XLSX.utils.table_to_sheet(clone, {raw:true});
+  ws['!cols'] = [
+    { wch: 6 }, { wch: 40 }, { wch: 20 }, { wch: 14 }, { wch: 12 }, { wch: 14 },
+    { wch: 10 }, { wch: 18 }, { wch: 18 }, { wch: 16 }, { wch: 16 }, { wch: 16 },
+    { wch: 20 }, { wch: 20 }, { wch: 20 }, { wch: 24 }
+  ];
+
+  const range = XLSX.utils.decode_range(ws['!ref']);
+  const headerRowIndex = range.s.r;
+  const maxCol = range.e.c;
+
+  for (let c = range.s.c; c <= maxCol; c++) {
+    const cellAddr = XLSX.utils.encode_cell({ c: c, r: headerRowIndex });
+    if (!ws[cellAddr]) continue;
+    ws[cellAddr].s = ws[cellAddr].s || {};
+    ws[cellAddr].s.fill = { patternType: "solid", fgColor: { rgb: "0EA5A4" } };
+    ws[cellAddr].s.font = { name: "Calibri", sz: 11, bold: true, color: { rgb: "FFFFFF" } };
+    ws[cellAddr].s.alignment = { vertical: "center", horizontal: "center" };
+    ws[cellAddr].s.border = {
+      top: { style: "thin", color: { rgb: "BFDCE3" } },
+      bottom: { style: "thin", color: { rgb: "BFDCE3" } },
+      left: { style: "thin", color: { rgb: "BFDCE3" } },
+      right: { style: "thin", color: { rgb: "BFDCE3" } }
+    };
+  }
+
+  let totalsRow = null;
+  for (let r = headerRowIndex + 1; r <= range.e.r; r++) {
+    const cellB = XLSX.utils.encode_cell({r, c: 1});
+    if (ws[cellB] && String(ws[cellB].v).toUpperCase().includes('TOTALES')) {
+      totalsRow = r;
+      break;
+    }
+  }
+  if (totalsRow === null) totalsRow = range.e.r;
+
+  for (let c = range.s.c; c <= maxCol; c++) {
+    const addr = XLSX.utils.encode_cell({r: totalsRow, c});
+    if (!ws[addr]) continue;
+    ws[addr].s = ws[addr].s || {};
+    ws[addr].s.fill = { patternType: "solid", fgColor: { rgb: "035E59" } };
+    ws[addr].s.font = { name: "Calibri", sz: 11, bold: true, color: { rgb: "FFFFFF" } };
+    ws[addr].s.alignment = { vertical: "center", horizontal: (c < 2 ? "left" : "right") };
+    ws[addr].s.border = {
+      top: { style: "medium", color: { rgb: "0B7285" } },
+      bottom: { style: "medium", color: { rgb: "0B7285" } },
+      left: { style: "thin", color: { rgb: "BFDCE3" } },
+      right: { style: "thin", color: { rgb: "BFDCE3" } }
+    };
+  }
+
+  for (let R = headerRowIndex; R <= range.e.r; ++R) {
+    for (let C = range.s.c; C <= maxCol; ++C) {
+      const addr = XLSX.utils.encode_cell({r:R,c:C});
+      if (!ws[addr]) continue;
+      ws[addr].s = ws[addr].s || {};
+      ws[addr].s.border = ws[addr].s.border || {
+        top: { style: "thin", color: { rgb: "E6EEF6" } },
+        bottom: { style: "thin", color: { rgb: "E6EEF6" } },
+        left: { style: "thin", color: { rgb: "E6EEF6" } },
+        right: { style: "thin", color: { rgb: "E6EEF6" } }
+      };
+    }
+  }
+
+  const wb = XLSX.utils.book_new();
+  XLSX.utils.book_append_sheet(wb, ws, "Planilla");
+  wb.Workbook = wb.Workbook || {};
+  wb.Workbook.Views = wb.Workbook.Views || [{ RTL: false }];
+
+  const safeName = planillaName.replace(/[^a-z0-9_\- ]/gi,'').replace(/\s+/g,'_');
+  const filename = `${safeName}_${dateInput}.xlsx`;
+  XLSX.writeFile(wb, filename);
+});
+
+/* ------------------ Auto half-sueldo behavior (fixed: ensure applied only once) ------------------ */
+(function(){
+  function parseNumberSafe(v){
+    if (v == null) return 0;
+    try {
+      const s = String(v).replace(/\s+/g,'').replace(/,/g,'').trim();
+      const n = Number(s);
+      return isFinite(n) ? n : 0;
+    } catch {
+      return 0;
+    }
+  }
+
+  // Expose applyHalfToSueldoInput globally and ensure it's called exactly once per blur/paste action.
+  window.applyHalfToSueldoInput = function(inp){
+    if (!inp) return;
+    const raw = inp.value;
+    const n = parseNumberSafe(raw);
+    if (n === 0) {
+      inp.value = n.toFixed(2);
+    } else {
+      const half = Math.round((n / 2 + Number.EPSILON) * 100) / 100;
+      if (inp.type === 'number') inp.value = half;
+      else inp.value = half.toFixed(2);
+    }
+    try {
+      const tr = inp.closest('tr');
+      if (typeof recalcRow === 'function' && tr) recalcRow(tr);
+      if (typeof recalcTotals === 'function') recalcTotals();
+      if (typeof saveToLocal === 'function') saveToLocal();
+    } catch (e) { console.error('Error aplicando mitad al sueldo:', e); }
+  }
+
+  // Keep paste handler so pasted numbers are normalized and halved once
+  document.addEventListener('paste', function(e){
+    const t = e.target;
+    if (!t || !t.classList) return;
+    if (t.classList.contains('sueldo')) {
+      setTimeout(() => applyHalfToSueldoInput(t), 20);
+    }
+  });
+
+  // Important: only one blur listener calls applyHalfToSueldoInput (the central one above).
+  // No additional blur listeners here to avoid double division.
+})();
+
+/* ------------------ Sync with server: /api/empleados, /api/planilla, /guardar_planilla ------------------ */
+
+/*
+ Notes for server:
+ - This client expects these endpoints (your Flask provides them):
+    GET  /api/planilla        -> returns { rows: [...], meta: { server_saved_at: ISO, planillaName, emisionDate } } OR 204/empty
+    POST /guardar_planilla    -> accepts { rows, meta } and returns { ok:true, saved_at: ISO }
+ - Client now autosaves on edit/add/delete so changes propagate to server and are visible on other machines.
+*/
+
+const POLL_INTERVAL_MS = 20000; // 20s
+let pollHandle = null;
+let lastKnownServerSavedAt = null;
+let pendingServerSave = null;
+
+// /api/empleados pagina siempre: la planilla necesita a todos, así que
+// sigue X-Next-Cursor con páginas grandes (cada respuesta tiene tamaño acotado)
+const EMPLEADOS_PAGINA = 1000;
+
+async function fetchAllEmployeePages() {
+  const all = [];
+  let after = null;
+  do {
+    const params = new URLSearchParams({ limit: EMPLEADOS_PAGINA });
+    if (after) params.set('after', after);
+    const res = await fetch('/api/empleados?' + params, { cache: 'no-cache' });
+    if (!res.ok) throw new Error(`HTTP ${res.status}`);
+    const page = await res.json();
+    if (!Array.isArray(page)) break;
+    all.push(...page);
+    after = res.headers.get('X-Next-Cursor');
+  } while (after);
+  return all;
+}
+
+function empleadosVersionados(forzar) {
+  return cargarVersionado('empleados', 'planilla:empleados', fetchAllEmployeePages, forzar);
+}
+
+// GET /api/planilla (204 si no hay); el mismo contenido que /planilla.json
+function planillaVersionada(forzar) {
+  return cargarVersionado('planilla', 'planilla:datos', async () => {
+    const res = await fetch('/api/planilla', { cache: 'no-cache' });
+    if (res.status === 204) return null;
+    if (!res.ok) throw new Error(`HTTP ${res.status}`);
+    return res.json();
+  }, forzar);
+}
+
+async function fetchEmployeesList() {
+  try {
+    return (await empleadosVersionados()).data || [];
+  } catch (e) {
+    console.warn('Error fetching /api/empleados:', e);
+    return [];
+  }
+}
+
+function addEmployeeRowIfMissing(emp) {
+  if (!emp) return false;
+  const dpi = String(emp.dpi || '').trim();
+  const full = (emp.full_name || emp.fullName || emp.fullname || emp.Nombre || '').trim();
+  if (!dpi || !full) return false;
+
+  const tbody = document.querySelector('#planillaTable tbody');
+  if (!tbody) return false;
+
+  // If a row with same dpi exists, skip
+  const existing = tbody.querySelector(`tr[data-dpi="${dpi}"]`);
+  if (existing) return false;
+
+  // Also check names to avoid duplicate when DPI missing
+  const nameExists = Array.from(tbody.querySelectorAll('input.nombre')).some(inp => (inp.value||'').trim() === full);
+  if (nameExists) return false;
+
+  const idx = tbody.querySelectorAll('tr').length + 1;
+  const tr = document.createElement('tr');
+  tr.dataset.row = idx;
+  tr.dataset.dpi = dpi; // mark row with dpi
+  tr.innerHTML = createRowHtml(idx);
+
+  // fill name (readonly) and default sueldo 0
+  const nameInput = tr.querySelector('input.nombre');
+  if (nameInput) {
+    nameInput.value = full;
+    nameInput.setAttribute('readonly', 'readonly');
+  }
+  const sueldoInput = tr.querySelector('input.sueldo');
+  if (sueldoInput) sueldoInput.value = (0).toFixed(2);
+
+  // ensure fixed fields
+  const bonoInp = tr.querySelector('input.bono');
+  if (bonoInp) { bonoInp.value = 125.00; bonoInp.setAttribute('readonly','readonly'); }
+  const diasInp = tr.querySelector('input.dias');
+  if (diasInp) diasInp.value = 15;
+
+  // mark sueldo unlocked initially for imported rows with 0
+  tr.dataset.sueldoLocked = '0';
+
+  tbody.appendChild(tr);
+  recalcRow(tr);
+  recalcTotals();
+  return true;
+}
+
+let empleadosVersionVista = null;
+
+async function syncEmployeesOnce() {
+  let list;
+  try {
+    // revalida /api/bootstrap; la lista solo se vuelve a pedir si cambió su versión
+    const r = await empleadosVersionados(true);
+    if (r.version != null && r.version === empleadosVersionVista) return;
+    empleadosVersionVista = r.version;
+    list = r.data;
+  } catch (e) {
+    console.warn('Error fetching /api/empleados:', e);
+    return;
+  }
+  if (!list || !list.length) return;
+  let added = 0;
+  for (const emp of list) {
+    const ok = addEmployeeRowIfMissing(emp);
+    if (ok) added++;
+  }
+  if (added > 0) {
+    saveToLocalAndServer();
+  }
+}
+
+function startEmployeesPolling() {
+  syncEmployeesOnce();
+  if (pollHandle) clearInterval(pollHandle);
+  pollHandle = setInterval(syncEmployeesOnce, POLL_INTERVAL_MS);
+}
+
+/* ------------------ LocalStorage helpers + server sync (unchanged) ------------------ */
+
+function saveToLocal() {
+  try {
+    const data = serializeTable();
+    localStorage.setItem(STORAGE_KEY, JSON.stringify(data));
+  } catch (e) {
+    console.error('Error saving planilla to localStorage', e);
+  }
+}
+
+function loadFromLocal() {
+  try {
+    const raw = localStorage.getItem(STORAGE_KEY);
+    if (!raw) return false;
+    const obj = JSON.parse(raw);
+    if (obj && Array.isArray(obj.rows) && obj.rows.length) {
+      restoreTable(obj);
+      if (obj.meta) {
+        if (obj.meta.planillaName) document.getElementById('planillaName').value = obj.meta.planillaName;
+        if (obj.meta.emisionDate) document.getElementById('emisionDate').value = obj.meta.emisionDate;
+      }
+      // load last known server meta if present
+      const serverMetaRaw = localStorage.getItem(SERVER_SYNC_KEY);
+      if (serverMetaRaw) {
+        try { const m = JSON.parse(serverMetaRaw); lastKnownServerSavedAt = m.server_saved_at || null; } catch {}
+      }
+      return true;
+    }
+    return false;
+  } catch (e) {
+    console.error('Error loading planilla from localStorage', e);
+    return false;
+  }
+}
+
+function saveServerMeta(meta) {
+  try {
+    localStorage.setItem(SERVER_SYNC_KEY, JSON.stringify(meta || {}));
+    lastKnownServerSavedAt = meta && meta.server_saved_at ? meta.server_saved_at : lastKnownServerSavedAt;
+  } catch (e) { console.warn('saveServerMeta error', e); }
+}
+
+function safeFetchJson(url, opts = {}) {
+  return fetch(url, opts).then(r => {
+    if (!r.ok) throw new Error('HTTP ' + r.status);
+    return r.json().catch(() => ({}));
+  });
+}
+
+function saveToServerOnce(payload) {
+  return safeFetchJson('/guardar_planilla', {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify(payload)
+  });
+}
+
+async function saveToLocalAndServer() {
+  // always save locally
+  try { saveToLocal(); } catch (e) { console.error('local save error', e); }
+
+  // queue server save (if another save pending, let it finish first)
+  if (pendingServerSave) {
+    // schedule one later to reduce contention
+    setTimeout(saveToLocalAndServer, 800);
+    return;
+  }
+
+  const payload = serializeTable();
+  payload.meta = payload.meta || {};
+  payload.meta.client_saved_at = new Date().toISOString();
+
+  pendingServerSave = payload;
+  try {
+    const res = await saveToServerOnce(payload);
+    if (res && (res.saved_at || res.server_saved_at)) {
+      const meta = { server_saved_at: res.saved_at || res.server_saved_at, planillaName: payload.meta.planillaName || '', emisionDate: payload.meta.emisionDate || '' };
+      saveServerMeta(meta);
+      console.info('Planilla synced to server at', meta.server_saved_at);
+    } else {
+      if (res && res.ok) {
+        const now = new Date().toISOString();
+        saveServerMeta({ server_saved_at: now, planillaName: payload.meta.planillaName || '', emisionDate: payload.meta.emisionDate || '' });
+      }
+    }
+    // show success toast with timestamp
+    showSavedToast(true);
+  } catch (err) {
+    console.warn('server save failed, will retry once', err);
+    // local saved already; show local-saved toast with failure flag
+    showSavedToast(false);
+    setTimeout(async () => {
+      try {
+        await saveToServerOnce(payload);
+        const now = new Date().toISOString();
+        saveServerMeta({ server_saved_at: now, planillaName: payload.meta.planillaName || '', emisionDate: payload.meta.emisionDate || '' });
+        console.info('Retry server save succeeded');
+        showSavedToast(true);
+      } catch (e) {
+        console.warn('server save retry failed', e);
+        showSavedToast(false);
+      } finally {
+        pendingServerSave = null;
+      }
+    }, 1400);
+    pendingServerSave = null;
+    return;
+  }
+  pendingServerSave = null;
+}
+
+/* ------------------ Server planilla load + polling for remote changes ------------------ */
+
+async function tryLoadServerPlanillaOnce() {
+  try {
+    const data = (await planillaVersionada()).data;
+    if (data && Array.isArray(data.rows) && data.rows.length) return data;
+    return null;
+  } catch (e) {
+    console.warn('Error fetching /api/planilla', e);
+    return null;
+  }
+}
+
+let planillaVersionVista = null;
+
+async function pollServerPlanilla() {
+  try {
+    // sin cambio de versión no hay nada nuevo que comparar
+    const r = await planillaVersionada(true);
+    if (r.version != null && r.version === planillaVersionVista) return;
+    planillaVersionVista = r.version;
+    const data = r.data;
+    if (!data || !Array.isArray(data.rows) || !data.rows.length) return;
+    const serverMeta = data.meta || {};
+    const serverSavedAt = serverMeta.server_saved_at || serverMeta.saved_at || null;
+
+    const localRaw = localStorage.getItem(STORAGE_KEY);
+    if (!localRaw) {
+      console.info('No local planilla, restoring server version');
+      restoreTable(data);
+      if (data.meta) {
+        if (data.meta.planillaName) document.getElementById('planillaName').value = data.meta.planillaName;
+        if (data.meta.emisionDate) document.getElementById('emisionDate').value = data.meta.emisionDate;
+      }
+      saveToLocal();
+      saveServerMeta(serverMeta);
+      return;
+    }
+
+    if (serverSavedAt && (!lastKnownServerSavedAt || new Date(serverSavedAt) > new Date(lastKnownServerSavedAt))) {
+      const localObj = JSON.parse(localRaw);
+      const localMeta = localObj.meta || {};
+      const localClientSavedAt = localMeta.client_saved_at || localMeta.saved_at || null;
+
+      if (localClientSavedAt && new Date(localClientSavedAt) > new Date(serverSavedAt)) {
+        console.info('Server has older data than local edits; keeping local');
+        saveServerMeta(serverMeta);
+        return;
+      }
+
+      console.info('Server planilla newer, restoring from server');
+      restoreTable(data);
+      if (data.meta) {
+        if (data.meta.planillaName) document.getElementById('planillaName').value = data.meta.planillaName;
+        if (data.meta.emisionDate) document.getElementById('emisionDate').value = data.meta.emisionDate;
+      }
+      saveToLocal();
+      saveServerMeta(serverMeta);
+    }
+  } catch (e) {
+    console.warn('Error in pollServerPlanilla', e);
+  }
+}
+
+function startServerPolling() {
+  if (pollHandle) clearInterval(pollHandle);
+  pollServerPlanilla();
+  pollHandle = setInterval(pollServerPlanilla, POLL_INTERVAL_MS);
+}
+
+/* ------------------ populate behavior on load (unchanged) ------------------ */
+
+async function populateFromEmployeesIfEmpty() {
+  const restored = loadFromLocal();
+  if (restored) {
+    startEmployeesPolling();
+    startServerPolling();
+    return;
+  }
+
+  const serverPlanilla = await tryLoadServerPlanillaOnce();
+  if (serverPlanilla) {
+    restoreTable(serverPlanilla);
+    if (serverPlanilla.meta) {
+      if (serverPlanilla.meta.planillaName) document.getElementById('planillaName').value = serverPlanilla.meta.planillaName;
+      if (serverPlanilla.meta.emisionDate) document.getElementById('emisionDate').value = serverPlanilla.meta.emisionDate;
+      saveServerMeta(serverPlanilla.meta);
+    }
+    saveToLocal();
+    startEmployeesPolling();
+    startServerPolling();
+    return;
+  }
+
+  const employees = await fetchEmployeesList();
+  if (employees && employees.length) {
+    const tbody = document.querySelector('#planillaTable tbody');
+    if (!tbody) return;
+    tbody.innerHTML = '';
+    employees.forEach((emp, i) => {
+      const dpi = String(emp.dpi || '').trim();
+      const full = (emp.full_name || emp.fullName || emp.fullname || emp.Nombre || '').trim();
+      const idx = i + 1;
+      const tr = document.createElement('tr');
+      tr.dataset.row = idx;
+      if (dpi) tr.dataset.dpi = dpi;
+      tr.innerHTML = createRowHtml(idx);
+      const nameInput = tr.querySelector('input.nombre');
+      if (nameInput) {
+        nameInput.value = full;
+        nameInput.setAttribute('readonly', 'readonly');
+      }
+      const sueldoInput = tr.querySelector('input.sueldo');
+      if (sueldoInput) sueldoInput.value = (0).toFixed(2);
+      const bonoInp = tr.querySelector('input.bono');
+      if (bonoInp) { bonoInp.value = 125.00; bonoInp.setAttribute('readonly','readonly'); }
+      const diasInp = tr.querySelector('input.dias');
+      if (diasInp) diasInp.value = 15;
+      // mark sueldo unlocked initially for imported employees
+      tr.dataset.sueldoLocked = '0';
+      tbody.appendChild(tr);
+    });
+    document.querySelectorAll('#planillaTable tbody tr').forEach(tr => recalcRow(tr));
+    recalcTotals();
+    saveToLocalAndServer();
+  }
+  startEmployeesPolling();
+  startServerPolling();
+}
+
+/* ------------------ Guardar button hookup + toast ------------------
+   The button triggers saveToLocalAndServer(); toast shows timestamp and success/local-only status */
+function showSavedToast(serverOk) {
+  const id = '__planilla_saved_toast';
+  const prev = document.getElementById(id);
+  if (prev) prev.remove();
+
+  const d = document.createElement('div');
+  d.id = id;
+  d.className = 'alert py-1 px-2 small position-fixed';
+  d.style.top = '12px';
+  d.style.right = '12px';
+  d.style.zIndex = 99999;
+  d.style.borderRadius = '6px';
+  d.style.boxShadow = '0 6px 20px rgba(11,114,133,0.08)';
+  d.style.background = serverOk ? '#D1FAE5' : '#FFF3CD';
+  d.style.color = serverOk ? '#065F46' : '#7A4F01';
+
+  const ts = new Date();
+  const hh = String(ts.getHours()).padStart(2,'0');
+  const mm = String(ts.getMinutes()).padStart(2,'0');
+  const ss = String(ts.getSeconds()).padStart(2,'0');
+  const timeStr = `${hh}:${mm}:${ss}`;
+
+  d.innerText = serverOk ? `Planilla guardada - ${timeStr}` : `Planilla guardada localmente - ${timeStr}`;
+  document.body.appendChild(d);
+  setTimeout(() => {
+    const el = document.getElementById(id);
+    if (el) el.remove();
+  }, 3500);
+}
+
+document.getElementById('btnGuardarPlanilla')?.addEventListener('click', async () => {
+  try {
+    const data = serializeTable();
+    const res = await fetch('/guardar_planilla', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify(data)
+    });
+    if (res.ok) {
+      alert('Planilla guardada correctamente');
+    } else {
+      alert('Error al guardar en el servidor');
+    }
+  } catch (err) {
+    alert('Error al guardar: ' + (err.message || err));
+  }
+});
+
+
+/* ------------------ Initialization ------------------ */
+document.addEventListener('DOMContentLoaded', async () => {
+
+  const restored = loadFromLocal();
+
+  initBonosYDias();
+  enforceFixedFieldsOnAllRows();
+
+  // Initialize sueldo locking UI and button based on user role
+  await initSueldoEditControl();
+// --- Activar edición admin: desbloquear temporalmente los sueldos bloqueados ---
+document.querySelectorAll('#planillaTable tbody tr').forEach(tr => {
+  if (tr.dataset.sueldoLocked === '1') {
+    const inp = tr.querySelector('input.sueldo');
+    if (inp) {
+      // marcar como edición admin y permitir interacción temporalmente
+      inp.classList.add('sueldo-admin-edit');
+      unlockSueldoInput(inp); // permite selección y foco temporalmente
+    }
+  }
+});
+
+document.addEventListener('DOMContentLoaded', () => {
+const btn = document.getElementById('btnEditarSueldo');
+if (btn) {
+  btn.textContent = 'Finalizar edición sueldos';
+  btn.dataset.editing = '1';
+  btn.classList.remove('btn-warning');
+  btn.classList.add('btn-danger');
+} else {
+  console.warn('btnEditarSueldo no encontrado en el DOM en este momento');
+}
+});
+
+// finalizar edición admin: volver a bloquear según valor
+document.querySelectorAll('#planillaTable tbody tr').forEach(tr => {
+  const inp = tr.querySelector('input.sueldo');
+  if (inp && inp.classList.contains('sueldo-admin-edit')) {
+    inp.classList.remove('sueldo-admin-edit');
+    const n = parseFloat(inp.value) || 0;
+    if (n > 0) {
+      lockSueldoInput(inp);
+      inp.setAttribute('data-prev', Number(n).toFixed(2));
+    } else {
+      unlockSueldoInput(inp);
+      inp.setAttribute('data-prev', Number(n).toFixed(2));
+    }
+  }
+});
+btn.textContent = 'Editar sueldos';
+btn.dataset.editing = '0';
+btn.classList.remove('btn-danger');
+btn.classList.add('btn-warning');
+recalcTotals();
+try { saveToLocalAndServer(); } catch (e) { console.warn('save error', e); }
+
+
+  populateFromEmployeesIfEmpty();
+
+  // do not force extra save here; autosave runs on edits/add/delete
+});
+// Normalizar bloqueo/desbloqueo según valores actuales y reaplicar guardInput
+document.querySelectorAll('input.sueldo').forEach(inp => {
+  const n = parseFloat(inp.value) || 0;
+  if (n > 0) lockSueldoInput(inp);
+  else unlockSueldoInput(inp);
+  if (typeof guardInput === 'function') guardInput(inp);
+});
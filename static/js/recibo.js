@@ -0,0 +1,303 @@
+// static/js/recibo.js
+// Recibo de pago. Requiere js/nomina.js.
+
+(function(){
+  const { IGSS_RATE, round2, withQ, toNumberSafe, numeroALetrasEnEspañol } = window.Nomina;
+  const PLANILLA_STORAGE_KEY = window.Nomina.STORAGE_KEY;
+
+  function fmt(n){ return withQ(n || 0); }
+
+  function loadPlanillaFromLocal(){
+    try {
+      const raw = localStorage.getItem(PLANILLA_STORAGE_KEY);
+      if(!raw) return null;
+      const obj = JSON.parse(raw);
+      return obj && Array.isArray(obj.rows) ? obj : null;
+    } catch(e){
+      return null;
+    }
+  }
+
+  function findPlanillaRowByDpi(dpi){
+    if(dpi === undefined || dpi === null) return null;
+    const plan = loadPlanillaFromLocal();
+    if(!plan) return null;
+    const rows = plan.rows || [];
+    const needle = String(dpi).trim();
+    for(const r of rows){
+      const candidates = [
+        r && r.dpi, r && r.DPI, r && r.Dpi,
+        r && r.numero, r && r.numero_identificacion, r && r.numeroDPI, r && r.numero_dpi,
+        r && r.id, r && r.ID, r && r.identificacion,
+        r && r.Nombre, r && r.nombre,
+        r && r.full_name, r && r.fullName
+      ];
+      for(const c of candidates){
+        if(c === undefined || c === null) continue;
+        if(String(c).trim() === needle) return r;
+      }
+    }
+    return null;
+  }
+
+  function parseDateInputAsLocal(dateStr){
+    if(!dateStr || typeof dateStr !== 'string') return null;
+    const parts = dateStr.split('-');
+    if(parts.length !== 3) return null;
+    const y = parseInt(parts[0],10);
+    const m = parseInt(parts[1],10);
+    const d = parseInt(parts[2],10);
+    if(!isFinite(y) || !isFinite(m) || !isFinite(d)) return null;
+    return new Date(y, m - 1, d);
+  }
+
+  function syncPrintableComprobante(){
+    const fecha = document.getElementById('comprobanteFecha')?.value || '';
+    const printFecha = document.getElementById('print_comprobanteFecha');
+    if(printFecha) {
+      let text = fecha;
+      if(fecha){
+        try{
+          const d = parseDateInputAsLocal(fecha);
+          if(d && !isNaN(d.getTime())) {
+            const dd = String(d.getDate()).padStart(2,'0');
+            const mm = String(d.getMonth()+1).padStart(2,'0');
+            const yyyy = d.getFullYear();
+            text = 'Fecha: ' + dd + '/' + mm + '/' + yyyy;
+          } else {
+            text = 'Fecha: ' + fecha;
+          }
+        }catch(e){
+          text = 'Fecha: ' + fecha;
+        }
+      }
+      printFecha.textContent = fecha ? text : '';
+    }
+  }
+
+  // Previously removed Q for print. To preserve Q in printed output, these functions are no-op.
+  function stripQForPrint(){
+    // intentionally left blank to keep "Q " prefix visible in print
+  }
+
+  function restoreAmountsAfterPrint(){
+    // intentionally left blank (no changes were made in stripQForPrint)
+  }
+
+  // Helper that writes a formatted Q value into an input
+  function writeMoneyInput(id, value){
+    const el = document.getElementById(id);
+    if(!el) return;
+    el.value = fmt(toNumberSafe(value));
+  }
+
+  // Helper that clears a money input (leave visually empty)
+  function clearMoneyInput(id){
+    const el = document.getElementById(id);
+    if(!el) return;
+    el.value = '';
+  }
+
+  document.getElementById('empleadoSelect')?.addEventListener('change', function(){
+    const rawVal = this.value || '';
+    if(!rawVal){
+      ['nombre','dpi'].forEach(id=>{ const el = document.getElementById(id); if(el) el.value = ''; });
+      // Clear money fields so they show empty when no employee selected
+      ['sueldoBase','comisiones','bonificacion','hextrasMonto','igss','isr','otrasDeducciones'].forEach(id=> clearMoneyInput(id));
+      // Also clear computed outputs
+      const liqEl = document.getElementById('liquidoTotal'); if(liqEl) liqEl.value = '';
+      const letraEl = document.getElementById('totalEnLetras'); if(letraEl) letraEl.value = '';
+      return;
+    }
+
+    const planRow = findPlanillaRowByDpi(rawVal);
+
+    if(planRow){
+      const nombre = planRow.nombre || planRow.Nombre || planRow.full_name || '';
+      const dpiVal = planRow.dpi || planRow.DPI || planRow.numero || planRow.id || rawVal;
+
+      const pn = document.getElementById('print_nombre'); if(pn) pn.value = nombre;
+      const pd = document.getElementById('print_dpi'); if(pd) pd.value = dpiVal;
+
+      writeMoneyInput('sueldoBase', planRow.sueldo ?? planRow.Sueldo ?? 0);
+      writeMoneyInput('bonificacion', planRow.bono ?? planRow.bon ?? 0);
+      writeMoneyInput('comisiones', planRow.comisiones ?? planRow.Comisiones ?? 0);
+      writeMoneyInput('hextrasMonto', planRow.hextras ?? planRow.hextras_monto ?? 0);
+
+      const igssVal = toNumberSafe(planRow.igss ?? planRow.IGSS ?? ((planRow.sueldo||planRow.Sueldo||0) * IGSS_RATE));
+      writeMoneyInput('igss', igssVal);
+
+      writeMoneyInput('isr', planRow.isr ?? planRow._isrValue ?? 0);
+      writeMoneyInput('otrasDeducciones', planRow.otras ?? planRow.otras_deducciones ?? 0);
+
+      recalcLiquido();
+      return;
+    }
+
+    fetch('/api/empleado/' + encodeURIComponent(rawVal)).then(r => r.json()).then(data => {
+      const nombre = data.Nombre || data.nombre || data.full_name || '';
+      const dpiVal = data['Numero de DPI'] || data.dpi || data.numero || rawVal;
+
+      const pn = document.getElementById('print_nombre'); if(pn) pn.value = nombre;
+      const pd = document.getElementById('print_dpi'); if(pd) pd.value = dpiVal;
+
+      if(data.Sueldo !== undefined) writeMoneyInput('sueldoBase', data.Sueldo);
+      if(data.bono !== undefined) writeMoneyInput('bonificacion', data.bono);
+      if(data.comisiones !== undefined) writeMoneyInput('comisiones', data.comisiones);
+      if(data.hextras_monto !== undefined) writeMoneyInput('hextrasMonto', data.hextras_monto);
+
+      if(data.igss !== undefined){
+        const ig = toNumberSafe(data.igss);
+        writeMoneyInput('igss', ig);
+      }
+
+      if(data._isrValue !== undefined) writeMoneyInput('isr', data._isrValue);
+      if(data.otras_deducciones !== undefined) writeMoneyInput('otrasDeducciones', data.otras_deducciones);
+
+      recalcLiquido();
+    }).catch(()=>{
+      // On fetch error leave fields empty (do not show Q 0.00)
+      ['sueldoBase','bonificacion','comisiones','hextrasMonto','igss','isr','otrasDeducciones'].forEach(id=> clearMoneyInput(id));
+      const liqEl = document.getElementById('liquidoTotal'); if(liqEl) liqEl.value = '';
+      const letraEl = document.getElementById('totalEnLetras'); if(letraEl) letraEl.value = '';
+      recalcLiquido();
+    });
+  });
+
+  function recalcLiquido(){
+    const toNum = id => {
+      const el = document.getElementById(id);
+      if(!el) return 0;
+      const raw = String(el.value || '').trim();
+      if(raw === '') return 0; // treat empty as 0 for arithmetic, but we will decide output emptiness below
+      const v = raw.replace(/^Q\s*/i,'').replace(/,/g,'').trim();
+      const n = Number(v);
+      return isFinite(n) ? n : 0;
+    };
+
+    // If all source fields are empty, leave outputs empty
+    const sourceIds = ['sueldoBase','hextrasMonto','bonificacion','comisiones','igss','isr','otrasDeducciones'];
+    const allEmpty = sourceIds.every(id => {
+      const el = document.getElementById(id);
+      return !el || String(el.value || '').trim() === '';
+    });
+    if(allEmpty){
+      const liqEl = document.getElementById('liquidoTotal'); if(liqEl) liqEl.value = '';
+      const letraEl = document.getElementById('totalEnLetras'); if(letraEl) letraEl.value = '';
+      return;
+    }
+
+    const ganancias = toNum('sueldoBase') + toNum('hextrasMonto') + toNum('bonificacion') + toNum('comisiones');
+    const deducciones = toNum('igss') + toNum('isr') + toNum('otrasDeducciones');
+    const liquido = round2(ganancias - deducciones);
+    const liqEl = document.getElementById('liquidoTotal'); if(liqEl) liqEl.value = fmt(liquido);
+    const letraEl = document.getElementById('totalEnLetras'); if(letraEl) letraEl.value = numeroALetrasEnEspañol(liquido);
+  }
+
+  // ---------- Control de medios de pago (pantalla + impresión) ----------
+  function updateMediosOnScreen(){
+    const val = document.querySelector('input[name="medioPago"]:checked')?.value || '';
+
+    document.querySelectorAll('.transferencia-fields').forEach(el => {
+      el.style.display = (val === 'TRANSFERENCIA') ? 'flex' : 'none';
+      el.setAttribute('aria-hidden', (val === 'TRANSFERENCIA') ? 'false' : 'true');
+    });
+    document.querySelectorAll('.cheque-fields').forEach(el => {
+      el.style.display = (val === 'CHEQUE') ? 'flex' : 'none';
+      el.setAttribute('aria-hidden', (val === 'CHEQUE') ? 'false' : 'true');
+    });
+
+    document.body.classList.remove('print-medio-EFECTIVO','print-medio-TRANSFERENCIA','print-medio-CHEQUE');
+    if(val) document.body.classList.add('print-medio-' + val);
+  }
+  document.querySelectorAll('input[name="medioPago"]').forEach(radio => {
+    radio.addEventListener('change', updateMediosOnScreen);
+  });
+  updateMediosOnScreen();
+
+  // Validación de fecha antes de imprimir
+  function hasFechaValid(){
+    const fecha = document.getElementById('comprobanteFecha')?.value || '';
+    return String(fecha).trim() !== '';
+  }
+
+  // ---------- Print handlers ----------
+  function beforePrintSetup(){
+    updateMediosOnScreen();
+    syncPrintableComprobante();
+    const p = document.getElementById('print_comprobanteFecha');
+    if(p){
+      p.setAttribute('aria-hidden','false');
+    }
+    stripQForPrint();
+  }
+  function afterPrintCleanup(){
+    document.body.classList.remove('print-medio-EFECTIVO','print-medio-TRANSFERENCIA','print-medio-CHEQUE');
+    restoreAmountsAfterPrint();
+    const p = document.getElementById('print_comprobanteFecha');
+    if(p){
+      p.setAttribute('aria-hidden','true');
+    }
+  }
+
+  if (window.matchMedia) {
+    const mql = window.matchMedia('print');
+    if (mql.addEventListener) mql.addEventListener('change', (m) => { if(m.matches) {
+        if(!hasFechaValid()){
+          alert('Por favor ingrese una fecha antes de imprimir.');
+        } else {
+          beforePrintSetup();
+        }
+      } else afterPrintCleanup(); });
+    else mql.addListener((m) => { if(m.matches) {
+        if(!hasFechaValid()){
+          alert('Por favor ingrese una fecha antes de imprimir.');
+        } else {
+          beforePrintSetup();
+        }
+      } else afterPrintCleanup(); });
+  }
+  window.addEventListener('beforeprint', beforePrintSetup);
+  window.addEventListener('afterprint', afterPrintCleanup);
+
+  const imprimirBtn = document.getElementById('imprimirBtn');
+  if(imprimirBtn) imprimirBtn.addEventListener('click', function(){
+    if(!hasFechaValid()){
+      alert('No se puede imprimir. Debe de ingresar primero la fecha de emisión del recibo.');
+      return;
+    }
+    beforePrintSetup();
+    setTimeout(()=> window.print(), 120);
+  });
+
+  // Keep recalc hooked whenever amount inputs change (user edits not expected, but safe)
+  ['sueldoBase','hextrasMonto','bonificacion','comisiones','igss','isr','otrasDeducciones'].forEach(id=>{
+    const el = document.getElementById(id);
+    if(el) el.addEventListener('input', recalcLiquido);
+  });
+
+  // keep mirrored date updated live when user changes it
+  document.getElementById('comprobanteFecha')?.addEventListener('input', syncPrintableComprobante);
+
+  document.addEventListener('DOMContentLoaded', function(){
+    // el select se llena con la búsqueda del servidor (js/buscar_empleado.js)
+    window.BuscarEmpleado?.conectar(document.getElementById('empleadoSelect'), { textoVacio: '-- Seleccione empleado --' });
+    // If template initialized with raw numeric values (without Q), convert them to Q-formatted on load
+    ['sueldoBase','hextrasMonto','bonificacion','comisiones','igss','isr','otrasDeducciones'].forEach(id=>{
+      const el = document.getElementById(id);
+      if(!el) return;
+      const v = el.value || '';
+      if(String(v).trim() !== ''){
+        if(!/^Q\s*/i.test(String(v).trim())){
+          el.value = fmt(toNumberSafe(v));
+        }
+      } else {
+        // Leave empty when there's no initial value so the fields appear blank until an employee is selected
+        el.value = '';
+      }
+    });
+    recalcLiquido();
+    syncPrintableComprobante();
+    updateMediosOnScreen();
+  });
+})();
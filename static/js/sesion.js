@@ -0,0 +1,55 @@
+// static/js/sesion.js
+// Una sola petición a /api/bootstrap por página: usuario, rol y versiones de
+// empleados/planilla. Todas las funciones que antes pedían /whoami por su
+// cuenta comparten la misma promesa. Con esas versiones, cargarVersionado()
+// guarda en sessionStorage los recursos grandes y no los vuelve a pedir
+// mientras la versión no cambie.
+(function () {
+  "use strict";
+
+  let pendiente = null;
+
+  function sesionActual(forzar) {
+    if (!pendiente || forzar) {
+      // no-cache: el navegador guarda la copia pero revalida con ETag (304 si no cambió)
+      pendiente = fetch("/api/bootstrap", { cache: "no-cache", credentials: "same-origin" })
+        .then(r => (r.ok ? r.json() : null))
+        .catch(() => null)
+        .then(j => j || { autenticado: false, usuario: null, rol: null, versiones: {} });
+    }
+    return pendiente;
+  }
+
+  async function rolActual() {
+    const s = await sesionActual();
+    return s && s.rol ? String(s.rol).toLowerCase() : "";
+  }
+
+  // cargar() se llama solo si la copia guardada es de otra versión (o no
+  // hay). Devuelve { data, version, desdeCache }. Con forzar se revalida
+  // /api/bootstrap (un 304 si nada cambió) para notar cambios de otros.
+  async function cargarVersionado(recurso, clave, cargar, forzar) {
+    const s = await sesionActual(forzar);
+    const version = (s.versiones || {})[recurso];
+    const llave = "versionado:" + clave;
+    if (version != null) {
+      try {
+        const guardado = JSON.parse(sessionStorage.getItem(llave) || "null");
+        if (guardado && guardado.v === version) return { data: guardado.data, version: version, desdeCache: true };
+      } catch (e) { /* copia ilegible: se vuelve a pedir */ }
+    }
+    const data = await cargar();
+    try {
+      if (version != null) sessionStorage.setItem(llave, JSON.stringify({ v: version, data: data }));
+      else sessionStorage.removeItem(llave);
+    } catch (e) {
+      // sin espacio: solo se pierde la copia
+      try { sessionStorage.removeItem(llave); } catch (e2) { /* ignorar */ }
+    }
+    return { data: data, version: version, desdeCache: false };
+  }
+
+  window.sesionActual = sesionActual;
+  window.rolActual = rolActual;
+  window.cargarVersionado = cargarVersionado;
+})();
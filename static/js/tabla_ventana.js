@@ -0,0 +1,242 @@
+// static/js/tabla_ventana.js
+// Render por ventana de las tablas de sección (empleados, about, conyugue, ...).
+// El servidor entrega ya renderizadas solo las primeras filas; el resto se pide
+// por páginas a /api/secciones/<seccion>/filas y en el DOM existen únicamente
+// las filas visibles más un margen. Dos divs de relleno (arriba y abajo de la
+// tabla) conservan el alto total para que la barra de desplazamiento sea real.
+//
+// Las tablas participantes llevan data-seccion, data-total, data-columnas,
+// data-orden y data-dir. main.js y las plantillas avisan guardados y
+// eliminaciones con el evento 'tabla:cambio' para recargar la ventana.
+(function () {
+  "use strict";
+
+  const PAGINA = 100;         // filas por petición
+  const MARGEN = 40;          // filas extra sobre y bajo lo visible
+  const ALTO_DEFAULT = 31;    // px, hasta poder medir una fila real
+  // encabezados que ordenan (solo órdenes con índice en el servidor)
+  const ORDEN_POR_COLUMNA = { 'Numero de DPI': 'dpi', 'Apellidos': 'apellidos' };
+
+  class TablaVentana {
+    constructor(tabla) {
+      this.tabla = tabla;
+      this.tbody = tabla.tBodies[0];
+      this.seccion = tabla.dataset.seccion;
+      this.columnas = JSON.parse(tabla.dataset.columnas || '[]');
+      this.total = parseInt(tabla.dataset.total, 10) || 0;
+      this.orden = tabla.dataset.orden || 'apellidos';
+      this.dir = tabla.dataset.dir || 'asc';
+      this.filas = new Map();       // posición -> { celdas, foto }
+      this.nodos = new Map();       // posición -> <tr> actualmente en el DOM
+      this.pedidas = new Set();     // páginas en vuelo
+      this.generacion = 0;          // descarta respuestas de un orden/versión anterior
+      this.desde = 0;
+      this.hasta = 0;
+      this.alto = 0;
+      this.sucio = false;
+
+      this.contenedor = tabla.closest('.table-responsive') || tabla.parentElement;
+      this.contenedor.classList.add('tabla-ventana');
+      this.rellenoArriba = this._relleno();
+      this.rellenoAbajo = this._relleno();
+      this.contenedor.insertBefore(this.rellenoArriba, tabla);
+      this.contenedor.insertBefore(this.rellenoAbajo, tabla.nextSibling);
+
+      this._adoptarFilasIniciales();
+      this._instalarOrden();
+
+      let programado = false;
+      const programar = () => {
+        if (programado) return;
+        programado = true;
+        requestAnimationFrame(() => { programado = false; this.render(); });
+      };
+      this.contenedor.addEventListener('scroll', programar, { passive: true });
+      window.addEventListener('resize', programar);
+      tabla.addEventListener('tabla:cambio', (e) => this._cambio(e));
+      this.render();
+    }
+
+    _relleno() {
+      const d = document.createElement('div');
+      d.className = 'ventana-relleno';
+      d.setAttribute('aria-hidden', 'true');
+      return d;
+    }
+
+    _adoptarFilasIniciales() {
+      Array.from(this.tbody.rows).forEach((tr, i) => {
+        if (i >= this.total) return;
+        this.filas.set(i, { celdas: Array.from(tr.cells, td => td.textContent.trim()), foto: tr.dataset.foto });
+        this.nodos.set(i, tr);
+        tr.__gen = this.generacion;
+      });
+      this.hasta = this.nodos.size;
+    }
+
+    _instalarOrden() {
+      const ths = this.tabla.tHead ? this.tabla.tHead.rows[0].cells : [];
+      this.columnas.forEach((col, i) => {
+        const orden = ORDEN_POR_COLUMNA[col];
+        const th = ths[i];
+        if (!orden || !th) return;
+        th.classList.add('ventana-ordenable');
+        th.dataset.orden = orden;
+        th.title = 'Ordenar';
+        th.addEventListener('click', () => {
+          if (this._editando()) return;
+          this.dir = (this.orden === orden && this.dir === 'asc') ? 'desc' : 'asc';
+          this.orden = orden;
+          this.recargar(true);
+        });
+      });
+      this._marcarOrden();
+    }
+
+    _marcarOrden() {
+      this.tabla.querySelectorAll('th.ventana-ordenable').forEach(th => {
+        if (th.dataset.orden === this.orden) th.setAttribute('aria-sort', this.dir === 'asc' ? 'ascending' : 'descending');
+        else th.removeAttribute('aria-sort');
+      });
+    }
+
+    // una fila en edición o recién agregada no se puede quitar del DOM
+    _editando() {
+      return !!this.tbody.querySelector('tr[data-editing="1"], tr[data-new="1"]');
+    }
+
+    _altoFila() {
+      if (!this.alto) {
+        for (const tr of this.nodos.values()) {
+          if (tr.dataset.ventanaCargando) continue;
+          const h = tr.getBoundingClientRect().height;
+          if (h > 0) { this.alto = h; break; }
+        }
+      }
+      return this.alto || ALTO_DEFAULT;
+    }
+
+    render() {
+      if (this._editando()) return;
+      const alto = this._altoFila();
+      const cabecera = this.tabla.tHead ? this.tabla.tHead.offsetHeight : 0;
+      const primera = Math.floor(Math.max(0, this.contenedor.scrollTop - cabecera) / alto);
+      const visibles = Math.ceil(this.contenedor.clientHeight / alto) + 1;
+      const desde = Math.max(0, Math.min(primera, this.total) - MARGEN);
+      const hasta = Math.min(this.total, primera + visibles + MARGEN);
+      this._pedirFaltantes(desde, hasta);
+      if (desde === this.desde && hasta === this.hasta && !this.sucio) return;
+
+      const frag = document.createDocumentFragment();
+      const nodos = new Map();
+      for (let p = desde; p < hasta; p++) {
+        const fila = this.filas.get(p);
+        let tr = this.nodos.get(p);
+        // se reutiliza el <tr> existente (conserva selección y referencias de main.js)
+        // salvo que llegaron datos nuevos para esa posición
+        if (!tr || (fila && (tr.dataset.ventanaCargando || tr.__gen !== this.generacion))) {
+          const nuevo = this._fila(fila);
+          if (tr && fila && tr.classList.contains('selected') && tr.cells[0] &&
+              tr.cells[0].textContent.trim() === fila.celdas[0]) {
+            nuevo.classList.add('selected');
+          }
+          tr = nuevo;
+        }
+        nodos.set(p, tr);
+        frag.appendChild(tr);
+      }
+      this.tbody.replaceChildren(frag);
+      this.nodos = nodos;
+      this.desde = desde;
+      this.hasta = hasta;
+      this.sucio = false;
+      this.rellenoArriba.style.height = (desde * alto) + 'px';
+      this.rellenoAbajo.style.height = ((this.total - hasta) * alto) + 'px';
+    }
+
+    _fila(fila) {
+      const tr = document.createElement('tr');
+      tr.__gen = this.generacion;
+      if (!fila) {
+        tr.dataset.ventanaCargando = '1';
+        tr.className = 'ventana-cargando';
+        this.columnas.forEach(() => tr.appendChild(document.createElement('td')));
+        return tr;
+      }
+      if (fila.foto !== undefined) tr.dataset.foto = fila.foto;
+      fila.celdas.forEach(v => {
+        const td = document.createElement('td');
+        td.textContent = v;
+        tr.appendChild(td);
+      });
+      return tr;
+    }
+
+    _pedirFaltantes(desde, hasta) {
+      if (hasta <= desde) return;
+      for (let pag = Math.floor(desde / PAGINA); pag <= Math.floor((hasta - 1) / PAGINA); pag++) {
+        const ini = pag * PAGINA;
+        const fin = Math.min(this.total, ini + PAGINA);
+        if (this.pedidas.has(pag) || (this.filas.has(ini) && this.filas.has(fin - 1))) continue;
+        this._cargar(pag);
+      }
+    }
+
+    _cargar(pag) {
+      const gen = this.generacion;
+      this.pedidas.add(pag);
+      const params = new URLSearchParams({ offset: pag * PAGINA, limit: PAGINA, sort: this.orden, dir: this.dir });
+      // no-cache: el navegador revalida con ETag y recibe 304 si la versión no cambió
+      fetch(`/api/secciones/${encodeURIComponent(this.seccion)}/filas?${params}`,
+            { cache: 'no-cache', credentials: 'same-origin' })
+        .then(r => (r.ok ? r.json() : Promise.reject(new Error(`HTTP ${r.status}`))))
+        .then(j => {
+          if (gen !== this.generacion) return;
+          this.total = j.total;
+          j.filas.forEach((celdas, i) => {
+            this.filas.set(j.offset + i, { celdas, foto: j.fotos ? j.fotos[i] : undefined });
+          });
+          this.sucio = true;
+          this.render();
+        })
+        .catch(err => console.warn('tabla_ventana: no se pudo cargar la página', pag, err))
+        .finally(() => { if (gen === this.generacion) this.pedidas.delete(pag); });
+    }
+
+    _cambio(e) {
+      const d = e.detail || {};
+      if (d.eliminada) {
+        // la plantilla quita el <tr>; que no vuelva a aparecer mientras llega la recarga
+        for (const [p, tr] of this.nodos) {
+          if (tr === e.target) { this.nodos.delete(p); break; }
+        }
+      }
+      this.recargar(false);
+    }
+
+    // Vuelve a pedir las filas (otro orden o cambió la versión en el servidor).
+    // Las filas ya dibujadas se mantienen hasta que llegan las nuevas.
+    recargar(irArriba) {
+      this.generacion++;
+      this.filas = new Map();
+      this.pedidas = new Set();
+      this.sucio = true;
+      this._marcarOrden();
+      if (irArriba) this.contenedor.scrollTop = 0;
+      // las filas nuevas se agregan arriba fuera de la ventana: se esperan
+      // a que main.js termine de limpiar el estado de edición
+      setTimeout(() => this.render(), 0);
+    }
+  }
+
+  function iniciar() {
+    document.querySelectorAll('table[data-seccion]').forEach(tabla => {
+      if (tabla.__ventana || !tabla.tBodies[0]) return;
+      if (!(parseInt(tabla.dataset.total, 10) > 0)) return;
+      tabla.__ventana = new TablaVentana(tabla);
+    });
+  }
+
+  if (document.readyState === 'loading') document.addEventListener('DOMContentLoaded', iniciar);
+  else iniciar();
+})();
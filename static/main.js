@@ -73,11 +73,11 @@
       return;
     }
     if (foto && formSubir && formEliminar) {
-      fetch(`${API_FOTO_BASE}${encodeURIComponent(dpi)}`, { cache: "no-store" })
+      fetch(`${API_FOTO_BASE}${encodeURIComponent(dpi)}?size=medium&format=webp`, { cache: "no-store" })
         .then(r => r.json())
         .then(j => {
           if (j && j.url) {
-            foto.src = `${j.url}?t=${Date.now()}`;
+            foto.src = j.url;
             formEliminar.style.display = "block";
             formSubir.style.display = "none";
           } else {
@@ -202,7 +202,7 @@
       // comprobar existencia: si GET /api/empleado/:dpi devuelve 200 -> existe
       let exists = false;
       try {
-        const r = await fetch(API_EMPLEADO_BASE + encodeURIComponent(dpi), { cache: 'no-store' });
+        const r = await fetch(API_EMPLEADO_BASE + encodeURIComponent(dpi), { cache: 'no-cache' });
         exists = r.ok;
       } catch (e) {
         exists = false;
@@ -0,0 +1,26 @@
+"""
+App de pruebas compartida: index se importa una sola vez por proceso y lee
+sus rutas de disco al importarse, así que todos los módulos de prueba usan
+los mismos dobles de benchmark.py sobre un directorio temporal.
+"""
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import benchmark  # noqa: E402
+
+FILAS = 20
+_preparada = {}
+
+
+def app_de_prueba():
+    """(app, dpis, imagen) sembrada con FILAS empleados."""
+    if not _preparada:
+        directorio = tempfile.mkdtemp(prefix="test-app-")
+        atexit.register(shutil.rmtree, directorio, ignore_errors=True)
+        _preparada["app"] = benchmark.preparar_app(directorio, FILAS, 1, 0.0, 0.0)
+    return _preparada["app"]
@@ -0,0 +1,34 @@
+"""
+Índice de búsqueda de empleados: el DPI se encuentra aunque se escriba en
+grupos separados por espacios, como aparece impreso en el documento.
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from buscador import IndiceNombres  # noqa: E402
+
+
+class BuscarPorDpi(unittest.TestCase):
+
+    def setUp(self):
+        self.indice = IndiceNombres([
+            {"Numero de DPI": "2622105760101", "Nombre": "Ana", "Apellidos": "Pérez"},
+            {"Numero de DPI": "2622 99010 0101", "Nombre": "Luis", "Apellidos": "López"},
+        ])
+
+    def dpis(self, q):
+        return [r[1] for r in self.indice.buscar(q)]
+
+    def test_grupos_con_espacios(self):
+        self.assertEqual(self.dpis("2622 105"), ["2622105760101"])
+        self.assertEqual(self.dpis("2622 9901"), ["2622 99010 0101"])
+
+    def test_nombre_y_dpi(self):
+        self.assertEqual(self.dpis("lopez 2622 99"), ["2622 99010 0101"])
+
+
+if __name__ == "__main__":
+    unittest.main()
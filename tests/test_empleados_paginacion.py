@@ -0,0 +1,52 @@
+"""
+Paginación por keyset de /api/empleados (?limit / ?after) contra el doble
+de MySQL de benchmark.py: recorrer todas las páginas siguiendo
+X-Next-Cursor debe dar cada empleado una sola vez. Sin ?limit la
+respuesta también va acotada a una página.
+"""
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from entorno import app_de_prueba  # noqa: E402
+
+
+class PaginacionEmpleados(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app, cls.dpis, _ = app_de_prueba()
+
+    def test_recorre_todas_las_paginas(self):
+        c = self.app.test_client()
+        vistos = []
+        ruta = "/api/empleados?limit=6"
+        paginas = 0
+        while ruta:
+            r = c.get(ruta)
+            self.assertEqual(r.status_code, 200, r.get_data(as_text=True))
+            vistos.extend(e["dpi"] for e in r.get_json())
+            if paginas == 0:
+                self.assertEqual(r.headers.get("X-Total-Count"), str(len(self.dpis)))
+            paginas += 1
+            cursor = r.headers.get("X-Next-Cursor")
+            ruta = f"/api/empleados?limit=6&after={cursor}" if cursor else None
+        self.assertEqual(paginas, -(-len(self.dpis) // 6))
+        self.assertEqual(sorted(vistos), sorted(self.dpis))
+        self.assertEqual(len(vistos), len(set(vistos)))
+
+    def test_sin_limit_devuelve_una_pagina(self):
+        import index
+        with mock.patch.object(index, "EMPLEADOS_PAGE_DEFAULT", 7):
+            r = self.app.test_client().get("/api/empleados")
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(len(r.get_json()), 7)
+        self.assertTrue(r.headers.get("X-Next-Cursor"))
+        self.assertEqual(r.headers.get("X-Total-Count"), str(len(self.dpis)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+"""
+Subida de foto en segundo plano (POST /subir_foto sin sync) contra los
+dobles de MySQL y Supabase de benchmark.py: el trabajo debe terminar en
+"listo" con los derivados servidos desde /fotos/. Una subida que no llega
+a guardarse en BD no debe dejar derivados en el bucket.
+"""
+import os
+import sys
+import time
+import unittest
+from io import BytesIO
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from entorno import app_de_prueba  # noqa: E402
+
+
+class SubidaFotoEnSegundoPlano(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app, cls.dpis, cls.imagen = app_de_prueba()
+
+    def test_trabajo_llega_a_listo(self):
+        c = self.app.test_client()
+        dpi = self.dpis[0]
+        r = c.post("/subir_foto", data={"dpi": dpi, "foto": (BytesIO(self.imagen), "foto.jpg")},
+                   content_type="multipart/form-data")
+        self.assertEqual(r.status_code, 202)
+        status_url = r.get_json()["status_url"]
+
+        limite = time.monotonic() + 60
+        while True:
+            job = c.get(status_url).get_json()
+            if job["status"] in ("listo", "error") or time.monotonic() > limite:
+                break
+            time.sleep(0.05)
+
+        self.assertEqual(job["status"], "listo", job.get("message"))
+        self.assertTrue(job["result"]["sizes"]["medium"]["webp"].startswith("/fotos/empleados/"))
+        foto = c.get(f"/api/foto/{dpi}").get_json()
+        self.assertEqual(foto["foto"], job["result"]["db_foto"])
+
+    def _subir(self, dpi, sync=False):
+        data = {"dpi": dpi, "foto": (BytesIO(self.imagen), "foto.jpg")}
+        if sync:
+            data["sync"] = "1"
+        return self.app.test_client().post("/subir_foto", data=data, content_type="multipart/form-data")
+
+    def _objetos(self, dpi):
+        import index
+        return [k for k in index.supabase.objetos if k.startswith(f"empleados/{dpi}_")]
+
+    def test_dpi_inexistente_no_sube_nada(self):
+        r = self._subir("0000000000000")
+        self.assertEqual(r.status_code, 404)
+        self.assertEqual(self._objetos("0000000000000"), [])
+
+    def test_error_al_guardar_quita_los_derivados(self):
+        import index
+        # el empleado desaparece entre la verificación y el UPDATE
+        with mock.patch.object(index, "empleado_existe", return_value=True):
+            r = self._subir("0000000000001", sync=True)
+        self.assertEqual(r.status_code, 500)
+        self.assertIn("DPI", r.get_json()["error"])
+        self.assertEqual(self._objetos("0000000000001"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()